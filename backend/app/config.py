@@ -3,9 +3,141 @@ from functools import lru_cache
 
 
 class Settings(BaseSettings):
-    supabase_url: str
-    supabase_key: str
-    supabase_service_role_key: str
+    # "supabase" or "sqlite" (embedded, single node; sqlite_path=":memory:"
+    # keeps everything in memory). The Supabase keys are only needed for
+    # the supabase backend.
+    storage_backend: str = "supabase"
+    sqlite_path: str = "gateway.db"
+
+    supabase_url: str = ""
+    supabase_key: str = ""
+    supabase_service_role_key: str = ""
+
+    # HTTP connection pool shared by the Supabase clients. Idempotent reads
+    # (GET/HEAD) are retried on connection errors and timeouts.
+    db_http_max_connections: int = 100
+    db_http_max_keepalive_connections: int = 50
+    db_http_keepalive_expiry_seconds: float = 30.0
+    db_http_http2: bool = True
+    db_http_connect_timeout_seconds: float = 5.0
+    db_http_read_timeout_seconds: float = 30.0
+    db_http_pool_timeout_seconds: float = 10.0
+    db_http_read_retries: int = 2
+    db_http_retry_backoff_seconds: float = 0.1
+
+    # Seconds a cached ruleset is trusted before it is re-read from the DB.
+    # Keeps other workers converging after a rule change made elsewhere.
+    ruleset_cache_ttl_seconds: float = 5.0
+
+    # Leave rules fully shadowed by a higher-priority rule out of matching
+    ruleset_skip_shadowed_rules: bool = True
+
+    # Command text -> matched rule cache, per ruleset version (0 disables).
+    # Longer commands are matched without caching. normalize: strip
+    # trailing whitespace from the key when no active rule can tell the
+    # difference (checked per ruleset).
+    rule_decision_cache_max_entries: int = 10000
+    rule_decision_cache_max_command_length: int = 512
+    rule_decision_cache_normalize: bool = False
+
+    # Highest backtracking risk a new rule pattern may have ("none",
+    # "polynomial" or "exponential"); riskier patterns are rejected. A
+    # polynomial pattern can still take minutes on a command_max_length
+    # command, and a running search can't be interrupted.
+    rule_backtracking_max_risk: str = "none"
+
+    # Time budget for matching one command against the ruleset (0 disables).
+    # A rule whose search alone overruns it is skipped for commands at least
+    # as long from then on; once the budget is spent the remaining rules are
+    # skipped and the command is left unmatched (rejected).
+    rule_match_budget_ms: float = 50.0
+
+    # Longest command text accepted by the command endpoints (0 disables)
+    command_max_length: int = 4096
+
+    # Pattern pairs kept by the rule overlap analyzer
+    rule_analysis_max_pairs: int = 100000
+
+    # Seconds before the conflict-detection match matrix re-syncs rules and
+    # the registered test-command corpus from the DB
+    conflict_matrix_ttl_seconds: float = 30.0
+
+    # API-key identity cache used by get_current_user
+    auth_cache_max_entries: int = 10000
+    auth_cache_ttl_seconds: float = 30.0
+    auth_cache_negative_ttl_seconds: float = 5.0
+
+    # Token buckets per API key (by role) checked before authentication
+    # touches the DB; 0 disables a limit. The *_role_* buckets cap all keys
+    # of a role together (keys not yet verified share their own one, with
+    # the member role limits). rate_limit_shared_path: SQLite file that
+    # makes the limits hold across the workers on one host.
+    rate_limit_enabled: bool = True
+    rate_limit_member_per_second: float = 10.0
+    rate_limit_member_burst: int = 20
+    rate_limit_admin_per_second: float = 50.0
+    rate_limit_admin_burst: int = 100
+    rate_limit_member_role_per_second: float = 0.0
+    rate_limit_member_role_burst: int = 0
+    rate_limit_admin_role_per_second: float = 0.0
+    rate_limit_admin_role_burst: int = 0
+    rate_limit_shared_path: str = ""
+
+    # Maximum commands accepted by POST /api/commands/batch
+    command_batch_max_size: int = 100
+
+    # POST /api/rules/test-pattern bulk evaluation. Inputs of at least
+    # pool_threshold commands are spread over a process pool
+    # (workers=0 means one per CPU).
+    pattern_test_max_commands: int = 50000
+    pattern_test_chunk_size: int = 500
+    pattern_test_pool_threshold: int = 2000
+    pattern_test_workers: int = 0
+
+    # Notification stream: how often each worker checks for notifications
+    # created elsewhere (only while admins are connected), and the
+    # keep-alive interval for idle connections
+    notification_poll_interval_seconds: float = 2.0
+    notification_stream_heartbeat_seconds: float = 15.0
+
+    # Write-behind audit sink
+    audit_sink_enabled: bool = True
+    audit_queue_max_size: int = 10000
+    audit_batch_size: int = 100
+    audit_flush_interval_seconds: float = 1.0
+    audit_flush_max_retries: int = 3
+    audit_retry_backoff_seconds: float = 0.5
+    audit_spill_path: str = "audit_spill.jsonl"
+
+    # Monthly history partitions (010_partition_history.sql). Every
+    # history_retention_interval_seconds (0 disables the job) partitions are
+    # created history_partitions_ahead months ahead, and with
+    # history_retention_months > 0 every older month of audit_logs and
+    # commands (beyond the current one) is moved to gzip blocks of
+    # history_archive_block_rows rows under history_archive_dir and its
+    # partition dropped. Reads reaching past the hot months use the archive,
+    # keeping the last history_archive_cached_blocks blocks decoded.
+    history_retention_months: int = 0
+    history_retention_interval_seconds: float = 3600.0
+    history_partitions_ahead: int = 2
+    history_archive_dir: str = "history_archive"
+    history_archive_block_rows: int = 1000
+    history_archive_cached_blocks: int = 32
+
+    # Prometheus /metrics. With several uvicorn workers, point
+    # metrics_multiproc_dir at a directory shared by the workers of the
+    # host so every scrape returns the sum over all of them.
+    metrics_enabled: bool = True
+    metrics_multiproc_dir: str = ""
+    metrics_flush_interval_seconds: float = 5.0
+
+    # Per-request DB call tracing: Server-Timing response header, and a
+    # "gateway.slow_requests" log record for requests slower than the
+    # threshold or making more than max_db_calls storage calls
+    db_trace_enabled: bool = True
+    db_trace_server_timing: bool = True
+    slow_request_threshold_ms: float = 500.0
+    slow_request_max_db_calls: int = 10
     
     class Config:
         env_file = ".env"
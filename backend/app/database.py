@@ -1,10 +1,57 @@
-from supabase import create_client, Client
+import httpx
+from postgrest import AsyncPostgrestClient
+from supabase import AsyncClient, AsyncClientOptions
 from app.config import get_settings
+from app.transport import PooledTransport
 
 settings = get_settings()
 
+# One connection pool for both clients; pool statistics via transport.stats()
+transport = PooledTransport(
+    max_connections=settings.db_http_max_connections,
+    max_keepalive_connections=settings.db_http_max_keepalive_connections,
+    keepalive_expiry=settings.db_http_keepalive_expiry_seconds,
+    http2=settings.db_http_http2,
+    read_retries=settings.db_http_read_retries,
+    retry_backoff=settings.db_http_retry_backoff_seconds
+)
+
+timeout = httpx.Timeout(
+    connect=settings.db_http_connect_timeout_seconds,
+    read=settings.db_http_read_timeout_seconds,
+    write=settings.db_http_read_timeout_seconds,
+    pool=settings.db_http_pool_timeout_seconds
+)
+
+
+class PooledPostgrestClient(AsyncPostgrestClient):
+    def create_session(self, base_url, headers, timeout, verify=True, proxy=None) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            transport=transport,
+            follow_redirects=True
+        )
+
+
+class PooledClient(AsyncClient):
+    """Supabase client whose PostgREST calls go through the shared transport"""
+
+    @staticmethod
+    def _init_postgrest_client(rest_url, headers, schema, timeout=timeout, verify=True, proxy=None) -> AsyncPostgrestClient:
+        return PooledPostgrestClient(rest_url, headers=headers, schema=schema, timeout=timeout)
+
+
+def client_options() -> AsyncClientOptions:
+    # Each client needs its own options: it writes its auth headers into them
+    return AsyncClientOptions(postgrest_client_timeout=timeout)
+
+
+# Async clients: every PostgREST call is awaited so it never blocks the event loop
+
 # Client for regular operations (respects RLS)
-supabase: Client = create_client(settings.supabase_url, settings.supabase_key)
+supabase: AsyncClient = PooledClient(settings.supabase_url, settings.supabase_key, client_options())
 
 # Service role client for admin operations (bypasses RLS)
-supabase_admin: Client = create_client(settings.supabase_url, settings.supabase_service_role_key)
+supabase_admin: AsyncClient = PooledClient(settings.supabase_url, settings.supabase_service_role_key, client_options())
@@ -0,0 +1,9 @@
+# Pure-Python rule evaluation engines (no DB access)
+from .rule_matcher import RuleMatcher, extract_literals
+from .automaton import Automaton, UnsupportedPattern, compile_automaton
+from .overlap import OverlapAnalyzer
+from .normalize import rstrip_safe
+from .backtracking import BacktrackingRisk, RISK_LEVELS, backtracking_risk
+
+__all__ = ["RuleMatcher", "extract_literals", "Automaton", "UnsupportedPattern", "compile_automaton", "OverlapAnalyzer", "rstrip_safe",
+           "BacktrackingRisk", "RISK_LEVELS", "backtracking_risk"]
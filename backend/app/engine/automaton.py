@@ -0,0 +1,424 @@
+import re
+from bisect import bisect_right
+from collections import deque
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+
+MAX_CHAR = 0x10FFFF
+
+# Sorted, disjoint, inclusive code point intervals
+CharSet = Tuple[Tuple[int, int], ...]
+
+ALL_CHARS: CharSet = ((0, MAX_CHAR),)
+NEWLINE = ord("\n")
+
+# Guards against patterns whose automata would be too large to analyze
+MAX_STATES = 5000
+MAX_SEARCH_NODES = 50000
+
+_SUPPORTED_FLAGS = (
+    sre_constants.SRE_FLAG_UNICODE
+    | sre_constants.SRE_FLAG_DOTALL
+    | sre_constants.SRE_FLAG_VERBOSE
+    | sre_constants.SRE_FLAG_ASCII
+)
+_START_ANCHORS = {sre_constants.AT_BEGINNING, sre_constants.AT_BEGINNING_STRING}
+
+
+class UnsupportedPattern(ValueError):
+    """The pattern uses constructs outside the analyzable subset"""
+
+
+class AnalysisLimitExceeded(Exception):
+    """An automaton operation needed more states than MAX_SEARCH_NODES"""
+
+
+def _normalize(intervals) -> CharSet:
+    merged: List[List[int]] = []
+    for lo, hi in sorted(intervals):
+        if merged and lo <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    return tuple((lo, hi) for lo, hi in merged)
+
+
+def _negate(charset: CharSet) -> CharSet:
+    result = []
+    next_lo = 0
+    for lo, hi in charset:
+        if lo > next_lo:
+            result.append((next_lo, lo - 1))
+        next_lo = hi + 1
+    if next_lo <= MAX_CHAR:
+        result.append((next_lo, MAX_CHAR))
+    return tuple(result)
+
+
+def _intersect(a: CharSet, b: CharSet) -> CharSet:
+    result = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        lo = max(a[i][0], b[j][0])
+        hi = min(a[i][1], b[j][1])
+        if lo <= hi:
+            result.append((lo, hi))
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return tuple(result)
+
+
+def _contains(charset: CharSet, code: int) -> bool:
+    index = bisect_right(charset, (code, MAX_CHAR)) - 1
+    return index >= 0 and charset[index][0] <= code <= charset[index][1]
+
+
+def _pick(charset: CharSet) -> str:
+    """A representative character, preferring readable ones for witnesses"""
+    for preferred in (ord("a"), ord("0"), ord(" ")):
+        if _contains(charset, preferred):
+            return chr(preferred)
+    for lo, hi in charset:
+        if hi >= 0x21 and lo <= 0x7E:
+            return chr(max(lo, 0x21))
+    return chr(charset[0][0])
+
+
+@lru_cache(maxsize=None)
+def _category(escape: str, ascii_only: bool) -> CharSet:
+    """Character set of \\d, \\s or \\w exactly as the re module defines it"""
+    if ascii_only:
+        text = "".join(map(chr, range(128)))
+        regex = re.compile(escape + "+", re.ASCII)
+    else:
+        text = "".join(map(chr, range(MAX_CHAR + 1)))
+        regex = re.compile(escape + "+")
+    return tuple((m.start(), m.end() - 1) for m in regex.finditer(text))
+
+
+_CATEGORIES = {
+    sre_constants.CATEGORY_DIGIT: ("\\d", False),
+    sre_constants.CATEGORY_NOT_DIGIT: ("\\d", True),
+    sre_constants.CATEGORY_SPACE: ("\\s", False),
+    sre_constants.CATEGORY_NOT_SPACE: ("\\s", True),
+    sre_constants.CATEGORY_WORD: ("\\w", False),
+    sre_constants.CATEGORY_NOT_WORD: ("\\w", True),
+}
+
+
+class Automaton:
+    """
+    Nondeterministic finite automaton accepting exactly the strings that
+    re.search(pattern, s) matches.
+
+    Only the regular subset of Python regex syntax is supported: literals,
+    classes, categories, '.', groups, alternation and (lazy or greedy)
+    repetition, with '^'/'\\A' at the start and '$'/'\\Z' at the end of the
+    pattern. Case-insensitive and multiline patterns, backreferences,
+    lookarounds, word boundaries, atomic groups and possessive repeats raise
+    UnsupportedPattern.
+    """
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self.edges: List[List[Tuple[CharSet, int]]] = []
+        self.eps: List[List[int]] = []
+
+        try:
+            parsed = sre_parse.parse(pattern)
+        except Exception as e:
+            raise UnsupportedPattern(f"Invalid pattern: {e}")
+
+        flags = parsed.state.flags
+        if flags & ~_SUPPORTED_FLAGS:
+            raise UnsupportedPattern("Unsupported flags")
+        self._dotall = bool(flags & sre_constants.SRE_FLAG_DOTALL)
+        self._ascii = bool(flags & sre_constants.SRE_FLAG_ASCII)
+
+        items = list(parsed.data)
+        anchored_start = False
+        end_anchor = None
+        if items and items[0][0] is sre_constants.AT and items[0][1] in _START_ANCHORS:
+            anchored_start = True
+            items = items[1:]
+        if items and items[-1][0] is sre_constants.AT:
+            if items[-1][1] is sre_constants.AT_END:
+                end_anchor = "$"
+            elif items[-1][1] is sre_constants.AT_END_STRING:
+                end_anchor = "\\Z"
+            if end_anchor:
+                items = items[:-1]
+
+        body_start, body_end = self._sequence(items)
+
+        if anchored_start:
+            self.start = body_start
+        else:
+            # Σ* prefix: the match may begin anywhere
+            self.start = self._state()
+            self.edges[self.start].append((ALL_CHARS, self.start))
+            self.eps[self.start].append(body_start)
+
+        if end_anchor == "\\Z":
+            self.accept = body_end
+        else:
+            self.accept = self._state()
+            self.eps[body_end].append(self.accept)
+            if end_anchor == "$":
+                # '$' also matches just before a trailing newline
+                self.edges[body_end].append((((NEWLINE, NEWLINE),), self.accept))
+            else:
+                # Σ* suffix: the match may end anywhere
+                self.edges[self.accept].append((ALL_CHARS, self.accept))
+
+        self._closures: Dict[int, FrozenSet[int]] = {}
+
+    @classmethod
+    def exact(cls, items, flags: int = 0) -> "Automaton":
+        """Automaton accepting exactly the strings a parsed item sequence
+        matches as a whole (no search prefix or suffix)"""
+        if flags & ~_SUPPORTED_FLAGS:
+            raise UnsupportedPattern("Unsupported flags")
+        automaton = cls.__new__(cls)
+        automaton.pattern = None
+        automaton.edges = []
+        automaton.eps = []
+        automaton._dotall = bool(flags & sre_constants.SRE_FLAG_DOTALL)
+        automaton._ascii = bool(flags & sre_constants.SRE_FLAG_ASCII)
+        automaton.start, automaton.accept = automaton._sequence(list(items))
+        automaton._closures = {}
+        return automaton
+
+    def __len__(self) -> int:
+        return len(self.edges)
+
+    def _state(self) -> int:
+        if len(self.edges) >= MAX_STATES:
+            raise UnsupportedPattern("Pattern too large to analyze")
+        self.edges.append([])
+        self.eps.append([])
+        return len(self.edges) - 1
+
+    def _charset(self, op, av) -> CharSet:
+        if op is sre_constants.LITERAL:
+            return ((av, av),)
+        if op is sre_constants.NOT_LITERAL:
+            return _negate(((av, av),))
+        if op is sre_constants.ANY:
+            return ALL_CHARS if self._dotall else _negate(((NEWLINE, NEWLINE),))
+        if op is sre_constants.RANGE:
+            return ((av[0], av[1]),)
+        if op is sre_constants.CATEGORY:
+            if av not in _CATEGORIES:
+                raise UnsupportedPattern(f"Unsupported category {av}")
+            name, negated = _CATEGORIES[av]
+            charset = _category(name, self._ascii)
+            return _negate(charset) if negated else charset
+        if op is sre_constants.IN:
+            negated = bool(av) and av[0][0] is sre_constants.NEGATE
+            intervals = []
+            for item_op, item_av in (av[1:] if negated else av):
+                intervals.extend(self._charset(item_op, item_av))
+            charset = _normalize(intervals)
+            return _negate(charset) if negated else charset
+        raise UnsupportedPattern(f"Unsupported construct {op}")
+
+    def _sequence(self, items) -> Tuple[int, int]:
+        start = end = self._state()
+        for op, av in items:
+            item_start, item_end = self._item(op, av)
+            self.eps[end].append(item_start)
+            end = item_end
+        return start, end
+
+    def _item(self, op, av) -> Tuple[int, int]:
+        if op in (sre_constants.LITERAL, sre_constants.NOT_LITERAL, sre_constants.ANY, sre_constants.IN):
+            start, end = self._state(), self._state()
+            self.edges[start].append((self._charset(op, av), end))
+            return start, end
+
+        if op is sre_constants.SUBPATTERN:
+            _group, add_flags, del_flags, sub = av
+            if (add_flags | del_flags) & ~sre_constants.SRE_FLAG_VERBOSE:
+                raise UnsupportedPattern("Inline flags are not supported")
+            return self._sequence(sub)
+
+        if op is sre_constants.BRANCH:
+            start, end = self._state(), self._state()
+            for alternative in av[1]:
+                alt_start, alt_end = self._sequence(alternative)
+                self.eps[start].append(alt_start)
+                self.eps[alt_end].append(end)
+            return start, end
+
+        if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            # Lazy and greedy repeats accept the same strings
+            min_count, max_count, sub = av
+            start = end = self._state()
+            for _ in range(min_count):
+                sub_start, sub_end = self._sequence(sub)
+                self.eps[end].append(sub_start)
+                end = sub_end
+            if max_count == sre_constants.MAXREPEAT:
+                loop = self._state()
+                sub_start, sub_end = self._sequence(sub)
+                self.eps[end].append(loop)
+                self.eps[loop].append(sub_start)
+                self.eps[sub_end].append(loop)
+                end = loop
+            else:
+                final = self._state()
+                for _ in range(max_count - min_count):
+                    sub_start, sub_end = self._sequence(sub)
+                    self.eps[end].append(final)
+                    self.eps[end].append(sub_start)
+                    end = sub_end
+                self.eps[end].append(final)
+                end = final
+            return start, end
+
+        raise UnsupportedPattern(f"Unsupported construct {op}")
+
+    def closure(self, state: int) -> FrozenSet[int]:
+        cached = self._closures.get(state)
+        if cached is not None:
+            return cached
+        seen = {state}
+        stack = [state]
+        while stack:
+            for target in self.eps[stack.pop()]:
+                if target not in seen:
+                    seen.add(target)
+                    stack.append(target)
+        result = self._closures[state] = frozenset(seen)
+        return result
+
+    def closure_of(self, states) -> FrozenSet[int]:
+        result = set()
+        for state in states:
+            result |= self.closure(state)
+        return frozenset(result)
+
+    def sample(self) -> str:
+        """A shortest string the pattern matches"""
+        start = self.closure(self.start)
+        parents: Dict[FrozenSet[int], Tuple[Optional[FrozenSet[int]], str]] = {start: (None, "")}
+        queue = deque([start])
+        while queue:
+            current = queue.popleft()
+            if self.accept in current:
+                return _path(parents, current)
+            for charset, target in (edge for state in current for edge in self.edges[state]):
+                nxt = self.closure(target)
+                if nxt not in parents:
+                    parents[nxt] = (current, _pick(charset))
+                    queue.append(nxt)
+        raise UnsupportedPattern("Pattern matches nothing")
+
+
+def _path(parents, node) -> str:
+    chars = []
+    while True:
+        parent, ch = parents[node]
+        if parent is None:
+            return "".join(reversed(chars))
+        chars.append(ch)
+        node = parent
+
+
+@lru_cache(maxsize=4096)
+def compile_automaton(pattern: str) -> Automaton:
+    """Build (and cache) the automaton for a pattern. Raises UnsupportedPattern."""
+    return Automaton(pattern)
+
+
+def intersection_witness(a: Automaton, b: Automaton) -> Optional[str]:
+    """A string both patterns match, or None if their languages are disjoint"""
+    start = (a.closure(a.start), b.closure(b.start))
+    parents: Dict = {start: (None, "")}
+    queue = deque([start])
+    while queue:
+        node = queue.popleft()
+        states_a, states_b = node
+        if a.accept in states_a and b.accept in states_b:
+            return _path(parents, node)
+
+        for charset_a, target_a in (edge for state in states_a for edge in a.edges[state]):
+            for charset_b, target_b in (edge for state in states_b for edge in b.edges[state]):
+                common = _intersect(charset_a, charset_b)
+                if not common:
+                    continue
+                nxt = (a.closure(target_a), b.closure(target_b))
+                if nxt not in parents:
+                    if len(parents) >= MAX_SEARCH_NODES:
+                        raise AnalysisLimitExceeded()
+                    parents[nxt] = (node, _pick(common))
+                    queue.append(nxt)
+    return None
+
+
+def _moves(charset: CharSet, automaton: Automaton, states: FrozenSet[int]) -> List[Tuple[CharSet, FrozenSet[int]]]:
+    """
+    Split charset into pieces on which the automaton's state set moves to one
+    successor set. Returns (piece, successor closure) pairs, pieces with the
+    same successor merged.
+    """
+    edges = []
+    points = set()
+    for lo, hi in charset:
+        points.add(lo)
+        points.add(hi + 1)
+    for state in states:
+        for edge_charset, target in automaton.edges[state]:
+            overlap = _intersect(charset, edge_charset)
+            if overlap:
+                edges.append((overlap, target))
+                for lo, hi in overlap:
+                    points.add(lo)
+                    points.add(hi + 1)
+
+    by_successor: Dict[FrozenSet[int], List[Tuple[int, int]]] = {}
+    ordered = sorted(points)
+    for lo, nxt in zip(ordered, ordered[1:]):
+        if not _contains(charset, lo):
+            continue
+        targets = [target for overlap, target in edges if _contains(overlap, lo)]
+        by_successor.setdefault(automaton.closure_of(targets), []).append((lo, nxt - 1))
+    return [(_normalize(intervals), successor) for successor, intervals in by_successor.items()]
+
+
+def difference_witness(a: Automaton, b: Automaton) -> Optional[str]:
+    """A string pattern a matches but pattern b does not, or None if a's matches are a subset of b's"""
+    start = (a.closure(a.start), b.closure(b.start))
+    parents: Dict = {start: (None, "")}
+    queue = deque([start])
+    while queue:
+        node = queue.popleft()
+        states_a, states_b = node
+        if a.accept in states_a and b.accept not in states_b:
+            return _path(parents, node)
+
+        for charset_a, target_a in (edge for state in states_a for edge in a.edges[state]):
+            for piece, successor_b in _moves(charset_a, b, states_b):
+                nxt = (a.closure(target_a), successor_b)
+                if nxt not in parents:
+                    if len(parents) >= MAX_SEARCH_NODES:
+                        raise AnalysisLimitExceeded()
+                    parents[nxt] = (node, _pick(piece))
+                    queue.append(nxt)
+    return None
+
+
+def is_subset(a: Automaton, b: Automaton) -> bool:
+    """True if every string pattern a matches is also matched by pattern b"""
+    return difference_witness(a, b) is None
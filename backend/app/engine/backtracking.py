@@ -0,0 +1,242 @@
+from functools import lru_cache
+from typing import List, NamedTuple, Optional
+from .automaton import (
+    ALL_CHARS, NEWLINE, AnalysisLimitExceeded, Automaton, CharSet, UnsupportedPattern,
+    _CATEGORIES, _START_ANCHORS, _category, _intersect, _negate, _normalize, intersection_witness,
+    sre_constants, sre_parse
+)
+
+# Risk levels, lowest first
+RISK_LEVELS = ("none", "polynomial", "exponential")
+
+# Repeats allowing at least this many iterations count as unbounded
+LARGE_REPEAT = 16
+
+_REPEATS = (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT)
+
+
+class BacktrackingRisk(NamedTuple):
+    level: str
+    reason: str
+
+
+def _is_unbounded_repeat(op, av) -> bool:
+    return op in _REPEATS and (av[1] == sre_constants.MAXREPEAT or av[1] >= LARGE_REPEAT)
+
+
+class _Analyzer:
+    """
+    Walks the parse tree looking for the classic backtracking shapes:
+
+    - exponential: a repeat whose body can be split between iterations in
+      many ways - an inner unbounded repeat with no mandatory separator the
+      inner repeat can't consume (``(a+)+``, ``(\\w+\\s?)*``), or
+      alternatives that can match the same text (``(a|a?b?)*``)
+    - polynomial: two unbounded repeats over overlapping characters with
+      only optional items between them (``\\d+\\d*``, ``.*.*x``), or an
+      unanchored pattern starting with an unbounded repeat (re.search
+      retries it from every position)
+
+    Character sets are approximated upwards (unknown constructs count as
+    any character), so the result errs towards reporting a risk.
+    Possessive repeats and atomic groups don't backtrack and are skipped.
+    """
+
+    def __init__(self, flags: int):
+        self.flags = flags
+        self.dotall = bool(flags & sre_constants.SRE_FLAG_DOTALL)
+        self.ascii = bool(flags & sre_constants.SRE_FLAG_ASCII)
+        self.ignorecase = bool(flags & sre_constants.SRE_FLAG_IGNORECASE)
+        self.risk: Optional[BacktrackingRisk] = None
+
+    def report(self, level: str, reason: str) -> None:
+        if self.risk is None or RISK_LEVELS.index(level) > RISK_LEVELS.index(self.risk.level):
+            self.risk = BacktrackingRisk(level, reason)
+
+    # Character sets
+
+    def _literal(self, code: int) -> CharSet:
+        if not self.ignorecase:
+            return ((code, code),)
+        ch = chr(code)
+        return _normalize([(ord(c), ord(c)) for c in {ch, ch.lower(), ch.upper()} if len(c) == 1])
+
+    def chars(self, op, av) -> CharSet:
+        """Characters the item can consume"""
+        if op is sre_constants.LITERAL:
+            return self._literal(av)
+        if op is sre_constants.NOT_LITERAL:
+            return _negate(self._literal(av))
+        if op is sre_constants.ANY:
+            return ALL_CHARS if self.dotall else _negate(((NEWLINE, NEWLINE),))
+        if op is sre_constants.RANGE:
+            return ALL_CHARS if self.ignorecase else ((av[0], av[1]),)
+        if op is sre_constants.CATEGORY:
+            if av not in _CATEGORIES:
+                return ALL_CHARS
+            name, negated = _CATEGORIES[av]
+            charset = _category(name, self.ascii)
+            return _negate(charset) if negated else charset
+        if op is sre_constants.IN:
+            negated = bool(av) and av[0][0] is sre_constants.NEGATE
+            intervals = []
+            for item_op, item_av in (av[1:] if negated else av):
+                intervals.extend(self.chars(item_op, item_av))
+            charset = _normalize(intervals)
+            return _negate(charset) if negated else charset
+        if op is sre_constants.SUBPATTERN:
+            return self.sequence_chars(av[3])
+        if op in _REPEATS or op is getattr(sre_constants, "POSSESSIVE_REPEAT", None):
+            return self.sequence_chars(av[2])
+        if op is sre_constants.BRANCH:
+            return _normalize([interval for alt in av[1] for interval in self.sequence_chars(alt)])
+        if op is getattr(sre_constants, "ATOMIC_GROUP", None):
+            return self.sequence_chars(av)
+        if op in (sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            return ()
+        # Backreferences, conditionals, ...
+        return ALL_CHARS
+
+    def sequence_chars(self, items) -> CharSet:
+        return _normalize([interval for op, av in items for interval in self.chars(op, av)])
+
+    def nullable(self, op, av) -> bool:
+        """Whether the item can match the empty string"""
+        if op in _REPEATS or op is getattr(sre_constants, "POSSESSIVE_REPEAT", None):
+            return av[0] == 0 or all(self.nullable(*item) for item in av[2])
+        if op is sre_constants.SUBPATTERN:
+            return all(self.nullable(*item) for item in av[3])
+        if op is sre_constants.BRANCH:
+            return any(all(self.nullable(*item) for item in alt) for alt in av[1])
+        if op is getattr(sre_constants, "ATOMIC_GROUP", None):
+            return all(self.nullable(*item) for item in av)
+        return op in (sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT, sre_constants.GROUPREF)
+
+    # Shapes
+
+    def _unbounded_edge(self, op, av, last: bool) -> Optional[CharSet]:
+        """Characters of the unbounded repeat the item starts (or ends) with, if any"""
+        if _is_unbounded_repeat(op, av):
+            return self.sequence_chars(av[2])
+        if op is sre_constants.SUBPATTERN and av[3]:
+            return self._unbounded_edge(*av[3][-1 if last else 0], last)
+        return None
+
+    def _contains_unbounded(self, op, av) -> bool:
+        if _is_unbounded_repeat(op, av):
+            return True
+        if op is sre_constants.SUBPATTERN:
+            return any(self._contains_unbounded(*item) for item in av[3])
+        if op is sre_constants.BRANCH:
+            return any(self._contains_unbounded(*item) for alt in av[1] for item in alt)
+        if op in _REPEATS:
+            return any(self._contains_unbounded(*item) for item in av[2])
+        return False
+
+    def _flatten(self, items) -> List:
+        """Items of a sequence with groups spliced in"""
+        flat = []
+        for op, av in items:
+            if op is sre_constants.SUBPATTERN:
+                flat.extend(self._flatten(av[3]))
+            else:
+                flat.append((op, av))
+        return flat
+
+    def _check_repeat(self, av) -> None:
+        low, high, body = av[0], av[1], self._flatten(av[2])
+
+        # Nested unbounded repeat without a separator it can't consume
+        for index, (op, av_) in enumerate(body):
+            if not self._contains_unbounded(op, av_):
+                continue
+            inner = self.chars(op, av_)
+            separated = any(
+                not self.nullable(other_op, other_av) and not _intersect(inner, self.chars(other_op, other_av))
+                for other_index, (other_op, other_av) in enumerate(body) if other_index != index
+            )
+            if not separated:
+                self.report("exponential", "nested quantifier: an unbounded repeat inside a repeated group")
+                return
+
+        # Optional body repeated a large fixed number of times, like (a?){25}
+        if low > 1 and high >= LARGE_REPEAT and all(self.nullable(*item) for item in body):
+            self.report("exponential", "optional group repeated many times")
+            return
+
+        # A repeated alternation where one string splits into iterations in
+        # more than one way, like (a|aa)+ (which re parses as (a(|a))+)
+        for index, (op, av_) in enumerate(body):
+            if op is sre_constants.BRANCH:
+                variants = [body[:index] + list(alt) + body[index + 1:] for alt in av_[1]]
+                if self._ambiguous(variants, av):
+                    self.report("exponential", "repeated alternation with overlapping alternatives")
+                return
+
+    def _ambiguous(self, variants, repeat) -> bool:
+        """Whether two variants of a repeat body, each followed by further
+        iterations, can match the same string"""
+        rest = (sre_constants.MAX_REPEAT, (0, repeat[1], repeat[2]))
+        try:
+            automata = [Automaton.exact(variant + [rest], self.flags) for variant in variants]
+            return any(
+                intersection_witness(a, b) is not None
+                for i, a in enumerate(automata) for b in automata[i + 1:]
+            )
+        except (UnsupportedPattern, AnalysisLimitExceeded):
+            # Fall back to comparing first characters
+            firsts = [self.sequence_chars(variant[:1]) for variant in variants]
+            return any(_intersect(a, b) for i, a in enumerate(firsts) for b in firsts[i + 1:])
+
+    def _check_sequence(self, items: List) -> None:
+        for i, (op, av) in enumerate(items):
+            tail = self._unbounded_edge(op, av, last=True)
+            if not tail:
+                continue
+            for j in range(i + 1, len(items)):
+                head = self._unbounded_edge(*items[j], last=False)
+                if head and _intersect(tail, head) and self._can_fail(items[j + 1:]):
+                    self.report("polynomial", "adjacent quantifiers over overlapping characters")
+                    return
+                if not self.nullable(*items[j]):
+                    break
+
+    def _can_fail(self, items) -> bool:
+        """Whether matching can still fail after a position (and so make
+        the repeats before it backtrack)"""
+        return any(op is sre_constants.AT or not self.nullable(op, av) for op, av in items)
+
+    def walk(self, items) -> None:
+        items = list(items)
+        self._check_sequence(items)
+        for op, av in items:
+            if op in _REPEATS:
+                if av[1] > 1:
+                    self._check_repeat(av)
+                self.walk(av[2])
+            elif op is sre_constants.SUBPATTERN:
+                self.walk(av[3])
+            elif op is sre_constants.BRANCH:
+                for alt in av[1]:
+                    self.walk(alt)
+            elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+                self.walk(av[1])
+
+    def analyze(self, items) -> Optional[BacktrackingRisk]:
+        items = list(items)
+        self.walk(items)
+        anchored = bool(items) and items[0][0] is sre_constants.AT and items[0][1] in _START_ANCHORS
+        if not anchored and items and self._unbounded_edge(*items[0], last=False):
+            self.report("polynomial", "unanchored pattern starting with a quantifier is retried at every position")
+        return self.risk
+
+
+@lru_cache(maxsize=4096)
+def backtracking_risk(pattern: str) -> Optional[BacktrackingRisk]:
+    """
+    Static estimate of how badly re.search(pattern, ...) can backtrack:
+    None, or a risk with level "polynomial" or "exponential" and the shape
+    that caused it. Raises re.error for invalid patterns.
+    """
+    parsed = sre_parse.parse(pattern)
+    return _Analyzer(parsed.state.flags).analyze(parsed.data)
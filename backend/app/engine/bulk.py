@@ -0,0 +1,78 @@
+import asyncio
+import re
+from collections import deque
+from concurrent.futures import Executor
+from typing import AsyncIterator, Dict, Hashable, List, Optional, Pattern, Sequence, Tuple
+
+from .rule_matcher import RuleMatcher
+
+# (matches the candidate pattern, index of the first matching rule or None)
+Evaluation = Tuple[bool, Optional[int]]
+
+# Compiled state reused across chunks inside a worker process
+_worker_state: Dict[Hashable, Tuple[Pattern, RuleMatcher]] = {}
+
+
+def evaluate(regex: Pattern, matcher: RuleMatcher, commands: Sequence[str]) -> List[Evaluation]:
+    search, match = regex.search, matcher.match
+    return [(search(command) is not None, match(command)) for command in commands]
+
+
+def evaluate_chunk(key: Hashable, pattern: str, rule_patterns: Sequence[str], commands: Sequence[str]) -> List[Evaluation]:
+    """Process-pool entry point; compiles the pattern and rules once per key per worker"""
+    state = _worker_state.get(key)
+    if state is None:
+        _worker_state.clear()
+        state = (re.compile(pattern), RuleMatcher([re.compile(p) for p in rule_patterns]))
+        _worker_state[key] = state
+    return evaluate(state[0], state[1], commands)
+
+
+async def evaluate_commands(
+    pattern: str,
+    rule_patterns: Sequence[str],
+    commands: Sequence[str],
+    chunk_size: int,
+    key: Hashable = None,
+    matcher: Optional[RuleMatcher] = None,
+    executor: Optional[Executor] = None,
+    max_in_flight: int = 4
+) -> AsyncIterator[List[Evaluation]]:
+    """
+    Evaluate commands against a candidate pattern and a ruleset (in match
+    order), yielding one list of evaluations per chunk, in input order.
+
+    Without an executor chunks run in-process, yielding to the event loop
+    between chunks. With one, up to max_in_flight chunks run in the pool
+    while earlier results are being consumed.
+    """
+    chunks = [commands[i:i + chunk_size] for i in range(0, len(commands), chunk_size)]
+
+    if executor is None:
+        regex = re.compile(pattern)
+        if matcher is None:
+            matcher = RuleMatcher([re.compile(p) for p in rule_patterns])
+        for chunk in chunks:
+            yield evaluate(regex, matcher, chunk)
+            await asyncio.sleep(0)
+        return
+
+    loop = asyncio.get_running_loop()
+    key = (key, pattern)
+    rule_patterns = list(rule_patterns)
+    pending = deque()
+    remaining = iter(chunks)
+    try:
+        for chunk in remaining:
+            pending.append(loop.run_in_executor(executor, evaluate_chunk, key, pattern, rule_patterns, chunk))
+            if len(pending) >= max_in_flight:
+                break
+        while pending:
+            result = await pending.popleft()
+            chunk = next(remaining, None)
+            if chunk is not None:
+                pending.append(loop.run_in_executor(executor, evaluate_chunk, key, pattern, rule_patterns, chunk))
+            yield result
+    finally:
+        for future in pending:
+            future.cancel()
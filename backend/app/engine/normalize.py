@@ -0,0 +1,59 @@
+from functools import lru_cache
+from typing import FrozenSet, Set
+from .automaton import (
+    MAX_CHAR, MAX_SEARCH_NODES, ALL_CHARS, AnalysisLimitExceeded, Automaton, CharSet,
+    UnsupportedPattern, _moves, _normalize, compile_automaton
+)
+
+
+@lru_cache(maxsize=1)
+def whitespace() -> CharSet:
+    """The characters str.rstrip() removes"""
+    return _normalize([(code, code) for code in range(MAX_CHAR + 1) if chr(code).isspace()])
+
+
+def _rstrip_invariant(automaton: Automaton) -> bool:
+    """
+    True if appending whitespace never changes whether the pattern matches:
+    for every reachable state set, every state set reachable from it on
+    whitespace alone agrees with it on acceptance. Then s and s.rstrip()
+    match alike for any s.
+    """
+    spaces = whitespace()
+    start = automaton.closure(automaton.start)
+    seen: Set[FrozenSet[int]] = {start}
+    queue = [start]
+    while queue:
+        states = queue.pop()
+        accepting = automaton.accept in states
+
+        reached = {states}
+        stack = [states]
+        while stack:
+            for _piece, successor in _moves(spaces, automaton, stack.pop()):
+                if (automaton.accept in successor) != accepting:
+                    return False
+                if successor not in reached:
+                    reached.add(successor)
+                    stack.append(successor)
+
+        for _piece, successor in _moves(ALL_CHARS, automaton, states):
+            if successor not in seen:
+                if len(seen) >= MAX_SEARCH_NODES:
+                    raise AnalysisLimitExceeded()
+                seen.add(successor)
+                queue.append(successor)
+    return True
+
+
+@lru_cache(maxsize=4096)
+def rstrip_safe(pattern: str) -> bool:
+    """
+    Whether re.search(pattern, s) and re.search(pattern, s.rstrip()) agree
+    for every s. False when that can't be proven (unsupported constructs or
+    too large to analyze).
+    """
+    try:
+        return _rstrip_invariant(compile_automaton(pattern))
+    except (UnsupportedPattern, AnalysisLimitExceeded):
+        return False
@@ -0,0 +1,178 @@
+import re
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Pattern, Sequence, Tuple
+
+from .automaton import (
+    AnalysisLimitExceeded,
+    Automaton,
+    UnsupportedPattern,
+    compile_automaton,
+    difference_witness,
+    intersection_witness,
+)
+from .rule_matcher import RuleMatcher
+
+AUTOMATON = "automaton"
+CORPUS = "corpus"
+
+
+class Overlap(NamedTuple):
+    overlaps: bool
+    witness: Optional[str]
+    method: str  # AUTOMATON (exact) or CORPUS (only as good as the corpus)
+
+
+class Shadowing(NamedTuple):
+    index: int
+    by_index: int
+    witness: str
+
+
+class _BoundedCache(OrderedDict):
+    """Small LRU used for per-pattern-pair results"""
+
+    def __init__(self, max_entries: int):
+        super().__init__()
+        self.max_entries = max_entries
+
+    def lookup(self, key):
+        if key in self:
+            self.move_to_end(key)
+            return self[key]
+        return None
+
+    def store(self, key, value) -> None:
+        self[key] = value
+        self.move_to_end(key)
+        while len(self) > self.max_entries:
+            self.popitem(last=False)
+
+
+class OverlapAnalyzer:
+    """
+    Static overlap and shadowing analysis for search-semantics rule patterns.
+
+    Pairs are decided on the automata of both patterns: an intersection
+    witness means the rules overlap, and an empty difference means every
+    command one rule matches is also matched by the other. Results are cached
+    per pattern pair, so re-analyzing after adding a rule only computes the
+    new rule's pairs. Patterns outside the analyzable subset (or too large)
+    fall back to testing a command corpus; corpus results can show an
+    overlap but never prove containment.
+    """
+
+    def __init__(self, max_pairs: int = 100000):
+        self._overlaps = _BoundedCache(max_pairs)
+        self._subsets = _BoundedCache(max_pairs)
+        self._regexes: Dict[str, Optional[Pattern]] = {}
+
+    @staticmethod
+    def automaton(pattern: str) -> Optional[Automaton]:
+        try:
+            return compile_automaton(pattern)
+        except UnsupportedPattern:
+            return None
+
+    def _regex(self, pattern: str) -> Optional[Pattern]:
+        if pattern not in self._regexes:
+            try:
+                self._regexes[pattern] = re.compile(pattern)
+            except re.error:
+                self._regexes[pattern] = None
+        return self._regexes[pattern]
+
+    def _corpus_overlap(self, a: str, b: str, corpus: Iterable[str]) -> Overlap:
+        regex_a, regex_b = self._regex(a), self._regex(b)
+        if regex_a is not None and regex_b is not None:
+            for command in corpus:
+                if regex_a.search(command) and regex_b.search(command):
+                    return Overlap(True, command, CORPUS)
+        return Overlap(False, None, CORPUS)
+
+    def overlap(self, a: str, b: str, corpus: Sequence[str] = ()) -> Overlap:
+        """Whether some command is matched by both patterns, with an example"""
+        key = (a, b) if a <= b else (b, a)
+        cached = self._overlaps.lookup(key)
+        if cached is not None:
+            return cached
+
+        automaton_a, automaton_b = self.automaton(a), self.automaton(b)
+        result = None
+        if automaton_a is not None and automaton_b is not None:
+            try:
+                witness = intersection_witness(automaton_a, automaton_b)
+                result = Overlap(witness is not None, witness, AUTOMATON)
+            except AnalysisLimitExceeded:
+                pass
+        if result is None:
+            # Corpus results depend on the corpus passed in, so don't cache them
+            return self._corpus_overlap(a, b, corpus)
+
+        self._overlaps.store(key, result)
+        return result
+
+    def is_subset(self, a: str, b: str) -> Optional[bool]:
+        """True if every command pattern a matches is matched by pattern b; None if undecidable here"""
+        key = (a, b)
+        cached = self._subsets.lookup(key)
+        if cached is not None:
+            return cached
+
+        automaton_a, automaton_b = self.automaton(a), self.automaton(b)
+        if automaton_a is None or automaton_b is None:
+            return None
+        try:
+            result = difference_witness(automaton_a, automaton_b) is None
+        except AnalysisLimitExceeded:
+            return None
+
+        self._subsets.store(key, result)
+        return result
+
+    def shadowed(self, patterns: Sequence[str], matcher: Optional[RuleMatcher] = None) -> List[Shadowing]:
+        """
+        Patterns (in match order) that can never be the first match because an
+        earlier pattern matches everything they match.
+
+        Each pattern's shortest sample is run through the matcher first; only
+        earlier patterns that match the sample are checked for containment.
+        Removing every reported pattern from the match order never changes
+        which pattern matches first.
+        """
+        regexes = [self._regex(pattern) for pattern in patterns]
+        if matcher is None:
+            matcher = RuleMatcher([regex for regex in regexes if regex is not None])
+            positions = [index for index, regex in enumerate(regexes) if regex is not None]
+        else:
+            positions = list(range(len(patterns)))
+
+        results = []
+        for index, pattern in enumerate(patterns):
+            automaton = self.automaton(pattern)
+            if automaton is None or regexes[index] is None:
+                continue
+            try:
+                sample = automaton.sample()
+            except UnsupportedPattern:
+                continue
+
+            for candidate in matcher.candidates(sample):
+                earlier = positions[candidate]
+                if earlier >= index:
+                    break
+                if not regexes[earlier].search(sample):
+                    continue
+                if self.is_subset(pattern, patterns[earlier]):
+                    results.append(Shadowing(index, earlier, sample))
+                    break
+        return results
+
+    def pairs(self, patterns: Sequence[str], corpus: Sequence[str] = ()) -> List[Tuple[int, int, Overlap]]:
+        """Every overlapping pair (i < j) among the patterns"""
+        results = []
+        for j, later in enumerate(patterns):
+            for i in range(j):
+                result = self.overlap(patterns[i], later, corpus)
+                if result.overlaps:
+                    results.append((i, j, result))
+        return results
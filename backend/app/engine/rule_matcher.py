@@ -0,0 +1,217 @@
+import time
+from collections import deque
+from typing import Collection, Dict, FrozenSet, Iterable, List, Optional, Pattern, Sequence, Set, Tuple
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+
+_REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT}
+if hasattr(sre_constants, "POSSESSIVE_REPEAT"):
+    _REPEATS.add(sre_constants.POSSESSIVE_REPEAT)
+
+
+def _best(options: List[FrozenSet[str]]) -> Optional[FrozenSet[str]]:
+    """Prefer the alternative set whose shortest literal is longest, then the smallest set"""
+    if not options:
+        return None
+    return max(options, key=lambda s: (min(len(lit) for lit in s), -len(s)))
+
+
+def _required(items) -> Optional[FrozenSet[str]]:
+    """
+    Return a set of literals such that every match of the sequence contains
+    at least one of them, or None if no such set can be derived.
+    """
+    options: List[FrozenSet[str]] = []
+    run: List[str] = []
+
+    def close_run():
+        if run:
+            options.append(frozenset(["".join(run)]))
+            run.clear()
+
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            run.append(chr(av))
+            continue
+
+        close_run()
+
+        if op is sre_constants.SUBPATTERN:
+            _group, add_flags, _del_flags, sub = av
+            if add_flags & sre_constants.SRE_FLAG_IGNORECASE:
+                continue
+            found = _required(sub)
+        elif op in _REPEATS:
+            min_count, _max_count, sub = av
+            found = _required(sub) if min_count >= 1 else None
+        elif op is sre_constants.BRANCH:
+            alternatives = [_required(alt) for alt in av[1]]
+            if any(alt is None for alt in alternatives):
+                found = None
+            else:
+                found = frozenset().union(*alternatives)
+        elif op is getattr(sre_constants, "ATOMIC_GROUP", None):
+            found = _required(av)
+        else:
+            found = None
+
+        if found:
+            options.append(found)
+
+    close_run()
+    return _best(options)
+
+
+def extract_literals(pattern: str) -> Optional[FrozenSet[str]]:
+    """
+    Extract the literals a pattern requires: any string the pattern matches
+    contains at least one of the returned literals. Returns None for patterns
+    with no extractable literal (or case-insensitive ones).
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except Exception:
+        return None
+
+    if parsed.state.flags & sre_constants.SRE_FLAG_IGNORECASE:
+        return None
+
+    return _required(parsed.data)
+
+
+class AhoCorasick:
+    """Multi-literal automaton: one pass over the text finds every literal it contains"""
+
+    def __init__(self, literals: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[FrozenSet[str]] = [frozenset()]
+
+        for literal in literals:
+            state = 0
+            for ch in literal:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(frozenset())
+                    self._goto[state][ch] = nxt
+                state = nxt
+            self._out[state] = self._out[state] | {literal}
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] | self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> Set[str]:
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Set[str] = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found |= out[state]
+        return found
+
+
+class RuleMatcher:
+    """
+    First-match-wins matcher over an ordered list of compiled patterns.
+
+    Each pattern is indexed by its required literals. A single scan of the
+    command yields the candidate patterns; only those (plus patterns with no
+    extractable literal) are verified, in their original order. A pattern
+    whose literals are absent from the text cannot match, so the result is
+    identical to trying every pattern in turn.
+    """
+
+    def __init__(self, regexes: Sequence[Pattern]):
+        self._regexes = list(regexes)
+        self._by_literal: Dict[str, List[int]] = {}
+        self._always: List[int] = []
+
+        for index, regex in enumerate(self._regexes):
+            literals = None
+            if not regex.flags & sre_constants.SRE_FLAG_IGNORECASE:
+                literals = extract_literals(regex.pattern)
+            if not literals:
+                self._always.append(index)
+                continue
+            for literal in literals:
+                self._by_literal.setdefault(literal, []).append(index)
+
+        self._automaton = AhoCorasick(self._by_literal)
+
+    def __len__(self) -> int:
+        return len(self._regexes)
+
+    def candidates(self, text: str) -> List[int]:
+        """Indices of the patterns that could match, in match order"""
+        indices = set(self._always)
+        for literal in self._automaton.find(text):
+            indices.update(self._by_literal[literal])
+        return sorted(indices)
+
+    def match(self, text: str) -> Optional[int]:
+        """Index of the first pattern that matches, or None"""
+        return self.match_counted(text)[0]
+
+    def match_counted(self, text: str) -> Tuple[Optional[int], int]:
+        """(index of the first matching pattern or None, patterns evaluated)"""
+        evaluated = 0
+        for index in self.candidates(text):
+            evaluated += 1
+            if self._regexes[index].search(text):
+                return index, evaluated
+        return None, evaluated
+
+    def match_within(
+        self, text: str, budget: float, skip: Collection[int] = ()
+    ) -> Tuple[Optional[int], int, List[int], List[Tuple[int, float]]]:
+        """
+        match_counted with a time budget in seconds for the whole scan.
+
+        Patterns in skip are not evaluated, and once the budget is spent the
+        remaining candidates are skipped as well. Returns (index of the first
+        matching pattern or None, patterns evaluated, skipped indices,
+        (index, seconds) of every pattern whose own search overran the
+        budget). A search already running cannot be interrupted.
+        """
+        evaluated = 0
+        skipped: List[int] = []
+        slow: List[Tuple[int, float]] = []
+        deadline = time.perf_counter() + budget
+        candidates = self.candidates(text)
+        for position, index in enumerate(candidates):
+            if index in skip:
+                skipped.append(index)
+                continue
+            start = time.perf_counter()
+            if start >= deadline:
+                skipped.extend(candidates[position:])
+                break
+            evaluated += 1
+            found = self._regexes[index].search(text)
+            elapsed = time.perf_counter() - start
+            if elapsed > budget:
+                slow.append((index, elapsed))
+            if found:
+                return index, evaluated, skipped, slow
+        return None, evaluated, skipped, slow
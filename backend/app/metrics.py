@@ -0,0 +1,254 @@
+import asyncio
+import glob
+import json
+import os
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from app.config import get_settings
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MATCH_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    """
+    One metric family: label values -> list of numbers.
+
+    Values are only updated from the event loop thread, so plain list item
+    increments need no lock. A series list is allocated the first time a
+    label combination is seen and updated in place afterwards.
+    """
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def _new_series(self) -> List[float]:
+        raise NotImplementedError
+
+    def values(self) -> Dict[Tuple[str, ...], List[float]]:
+        return {labels: list(series) for labels, series in self._series.items()}
+
+    def clear(self) -> None:
+        self._series.clear()
+
+    def render(self, series: Dict[Tuple[str, ...], List[float]]) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def _new_series(self) -> List[float]:
+        return [0.0]
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = self._new_series()
+        series[0] += amount
+
+    def render(self, series):
+        for labels, values in sorted(series.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(values[0])}"
+
+
+class Histogram(_Metric):
+    """Fixed buckets; a series holds the per-bucket counts (last one is +Inf) followed by the sum"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_series(self) -> List[float]:
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = self._new_series()
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self, series):
+        for labels, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values):
+                cumulative += count
+                bucket_labels = _format_labels(self.labelnames + ("le",), labels + (_format_value(bound),))
+                yield f"{self.name}_bucket{bucket_labels} {int(cumulative)}"
+            label_text = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {_format_value(values[-1])}"
+            yield f"{self.name}_count{label_text} {int(cumulative)}"
+
+
+class Metrics:
+    """
+    Process-wide metrics served at /metrics in the Prometheus text format.
+
+    Every metric is a counter or histogram, so values from several uvicorn
+    workers add up. With metrics_multiproc_dir set, each worker writes its
+    values to <dir>/<pid>.json every metrics_flush_interval_seconds (and on
+    shutdown); whichever worker serves /metrics returns its live values plus
+    the latest files of the others.
+    """
+
+    http_request_duration = Histogram(
+        "gateway_http_request_duration_seconds", "HTTP request latency", ("method", "route", "status")
+    )
+    rule_match_duration = Histogram(
+        "gateway_rule_match_duration_seconds", "Time to match one command against the active ruleset", (), MATCH_BUCKETS
+    )
+    rules_evaluated = Histogram(
+        "gateway_rules_evaluated", "Rule patterns evaluated per command match", (), COUNT_BUCKETS
+    )
+    rules_skipped = Counter(
+        "gateway_rules_skipped_total", "Rule patterns skipped by the match time budget, by reason (slow, budget)", ("reason",)
+    )
+    decision_cache = Counter(
+        "gateway_rule_decision_cache_total", "Rule decision cache lookups by result (hit, miss)", ("result",)
+    )
+    db_duration = Histogram(
+        "gateway_db_duration_seconds", "Storage call latency", ("table", "operation")
+    )
+    db_errors = Counter(
+        "gateway_db_errors_total", "Storage calls that raised", ("table", "operation")
+    )
+    auth = Counter(
+        "gateway_auth_total", "API key authentications by outcome (ok, invalid, missing, error, rate_limited) and source (cache, db, none)",
+        ("outcome", "source")
+    )
+    commands = Counter(
+        "gateway_commands_total", "Processed commands by outcome (executed, rejected, no_rule, no_credits)", ("outcome",)
+    )
+
+    _task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def all(cls) -> List[_Metric]:
+        return [value for value in vars(cls).values() if isinstance(value, _Metric)]
+
+    @classmethod
+    def snapshot(cls) -> Dict[str, List]:
+        """{metric name: [[label values, series values], ...]} (JSON-serializable)"""
+        return {
+            metric.name: [[list(labels), values] for labels, values in metric.values().items()]
+            for metric in cls.all()
+        }
+
+    @classmethod
+    def reset(cls) -> None:
+        for metric in cls.all():
+            metric.clear()
+
+    @staticmethod
+    def _worker_file(directory: str, pid: int) -> str:
+        return os.path.join(directory, f"{pid}.json")
+
+    @classmethod
+    def write_snapshot(cls) -> None:
+        directory = get_settings().metrics_multiproc_dir
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = cls._worker_file(directory, os.getpid())
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cls.snapshot(), f)
+        # Readers never see a partly written file
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def _other_workers(cls) -> List[Dict[str, List]]:
+        directory = get_settings().metrics_multiproc_dir
+        if not directory:
+            return []
+        own = cls._worker_file(directory, os.getpid())
+        snapshots = []
+        for path in glob.glob(os.path.join(directory, "*.json")):
+            if path == own:
+                continue
+            try:
+                with open(path, encoding="utf-8") as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    @classmethod
+    def render(cls) -> str:
+        """Prometheus text exposition of this worker plus the other workers' latest snapshots"""
+        others = cls._other_workers()
+        lines = []
+        for metric in cls.all():
+            series = metric.values()
+            for snapshot in others:
+                for labels, values in snapshot.get(metric.name, []):
+                    key = tuple(labels)
+                    if key in series and len(series[key]) == len(values):
+                        series[key] = [a + b for a, b in zip(series[key], values)]
+                    elif key not in series:
+                        series[key] = values
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.render(series))
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def is_running(cls) -> bool:
+        return cls._task is not None and not cls._task.done()
+
+    @classmethod
+    async def start(cls) -> None:
+        """Start the periodic snapshot writer (only when metrics_multiproc_dir is set)"""
+        settings = get_settings()
+        if not settings.metrics_enabled or not settings.metrics_multiproc_dir or cls.is_running():
+            return
+        cls._task = asyncio.create_task(cls._run(settings.metrics_flush_interval_seconds))
+
+    @classmethod
+    async def stop(cls) -> None:
+        if not cls.is_running():
+            return
+        cls._task.cancel()
+        try:
+            await cls._task
+        except asyncio.CancelledError:
+            pass
+        cls._task = None
+        cls.write_snapshot()
+
+    @classmethod
+    async def _run(cls, interval: float) -> None:
+        while True:
+            try:
+                cls.write_snapshot()
+            except OSError:
+                pass
+            await asyncio.sleep(interval)
@@ -1,3 +1,7 @@
 from .auth import get_current_user, require_admin
+from .auth_cache import AuthCache
+from .metrics import MetricsMiddleware
+from .rate_limit import RateLimiter
+from .tracing import TracingMiddleware
 
-__all__ = ["get_current_user", "require_admin"]
+__all__ = ["get_current_user", "require_admin", "AuthCache", "RateLimiter", "MetricsMiddleware", "TracingMiddleware"]
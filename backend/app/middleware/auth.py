@@ -1,27 +1,55 @@
 from fastapi import Header, HTTPException, Depends
 from typing import Optional
-from app.database import supabase_admin
+from app.metrics import Metrics
 from app.models import User, UserRole
+from app.middleware.auth_cache import AuthCache
+from app.middleware.rate_limit import RateLimiter
+from app.storage import get_storage
 
 
 async def get_current_user(x_api_key: Optional[str] = Header(None)) -> User:
     """Authenticate user via API key"""
     if not x_api_key:
+        Metrics.auth.inc("missing", "none")
         raise HTTPException(status_code=401, detail="API key is required")
     
+    hit, cached_user = AuthCache.get(x_api_key)
+    
+    # Before any DB work, so over-limit clients never reach the DB
+    retry_after = RateLimiter.check(x_api_key, cached_user.role if cached_user else None)
+    if retry_after is not None:
+        Metrics.auth.inc("rate_limited", "cache" if hit else "none")
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(retry_after)}
+        )
+    
+    if hit:
+        if cached_user is None:
+            Metrics.auth.inc("invalid", "cache")
+            raise HTTPException(status_code=401, detail="Invalid API key")
+        Metrics.auth.inc("ok", "cache")
+        return cached_user
+    
     try:
         # Query user by API key
-        response = supabase_admin.table("users").select("*").eq("api_key", x_api_key).execute()
+        user_data = await get_storage().users.get_by_api_key(x_api_key)
         
-        if not response.data or len(response.data) == 0:
+        if user_data is None:
+            AuthCache.put_invalid(x_api_key)
+            Metrics.auth.inc("invalid", "db")
             raise HTTPException(status_code=401, detail="Invalid API key")
         
-        user_data = response.data[0]
-        return User(**user_data)
+        user = User(**user_data)
+        AuthCache.put(x_api_key, user)
+        Metrics.auth.inc("ok", "db")
+        return user
     
     except HTTPException:
         raise
     except Exception as e:
+        Metrics.auth.inc("error", "db")
         raise HTTPException(status_code=500, detail=f"Authentication error: {str(e)}")
 
 
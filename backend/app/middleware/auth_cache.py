@@ -0,0 +1,87 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from app.config import get_settings
+from app.models import User
+
+
+def _hash_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+class AuthCache:
+    """
+    Bounded LRU + TTL cache of API key -> user, keyed by a hash of the key.
+
+    Unknown keys are cached as None for a shorter TTL so repeated bad keys
+    do not reach the DB. Cached credits are informational only; anything
+    that spends credits must re-read the balance from the DB.
+    """
+
+    _lock = threading.Lock()
+    _entries: "OrderedDict[str, Tuple[float, Optional[User]]]" = OrderedDict()
+    _key_by_user: Dict[int, str] = {}
+
+    @classmethod
+    def get(cls, api_key: str) -> Tuple[bool, Optional[User]]:
+        """Return (hit, user). A hit with user None means the key is known to be invalid."""
+        key_hash = _hash_key(api_key)
+        with cls._lock:
+            entry = cls._entries.get(key_hash)
+            if entry is None:
+                return False, None
+            expires_at, user = entry
+            if time.monotonic() >= expires_at:
+                cls._remove(key_hash)
+                return False, None
+            cls._entries.move_to_end(key_hash)
+        return True, user.model_copy() if user else None
+
+    @classmethod
+    def put(cls, api_key: str, user: User) -> None:
+        cls._store(_hash_key(api_key), user, get_settings().auth_cache_ttl_seconds)
+
+    @classmethod
+    def put_invalid(cls, api_key: str) -> None:
+        cls._store(_hash_key(api_key), None, get_settings().auth_cache_negative_ttl_seconds)
+
+    @classmethod
+    def invalidate_user(cls, user_id: int) -> None:
+        with cls._lock:
+            key_hash = cls._key_by_user.get(user_id)
+            if key_hash:
+                cls._remove(key_hash)
+
+    @classmethod
+    def invalidate_key(cls, api_key: str) -> None:
+        with cls._lock:
+            cls._remove(_hash_key(api_key))
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._entries.clear()
+            cls._key_by_user.clear()
+
+    @classmethod
+    def _store(cls, key_hash: str, user: Optional[User], ttl: float) -> None:
+        settings = get_settings()
+        if settings.auth_cache_max_entries <= 0 or ttl <= 0:
+            return
+        with cls._lock:
+            cls._remove(key_hash)
+            cls._entries[key_hash] = (time.monotonic() + ttl, user)
+            if user is not None and user.id is not None:
+                cls._key_by_user[user.id] = key_hash
+            while len(cls._entries) > settings.auth_cache_max_entries:
+                oldest, _ = next(iter(cls._entries.items()))
+                cls._remove(oldest)
+
+    @classmethod
+    def _remove(cls, key_hash: str) -> None:
+        # Caller holds the lock
+        entry = cls._entries.pop(key_hash, None)
+        if entry and entry[1] is not None and cls._key_by_user.get(entry[1].id) == key_hash:
+            del cls._key_by_user[entry[1].id]
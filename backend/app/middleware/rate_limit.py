@@ -0,0 +1,225 @@
+import hashlib
+import math
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Set, Tuple, Union
+from app.config import get_settings
+from app.models import UserRole
+
+# (bucket key, tokens per second, burst)
+Limit = Tuple[bytes, float, float]
+
+
+def _bucket_key(api_key: str) -> bytes:
+    return hashlib.blake2b(api_key.encode("utf-8"), digest_size=16).digest()
+
+
+def _refill(tokens: float, updated: float, now: float, rate: float, burst: float) -> float:
+    return min(burst, tokens + (now - updated) * rate)
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated", "full_at", "slot")
+
+
+class TokenBuckets:
+    """
+    Token buckets in process memory.
+
+    A bucket is only kept while it is below its burst: once it would have
+    refilled completely it is indistinguishable from a new one. Each bucket
+    sits in the time-wheel slot of the moment it becomes full, and every
+    take() sweeps the slots the clock has passed since the last call, so
+    eviction is O(expired buckets) with no background task.
+    """
+
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self, resolution: float = 1.0, slots: int = 64):
+        self._buckets: Dict[bytes, _Bucket] = {}
+        self._wheel: List[Set[bytes]] = [set() for _ in range(slots)]
+        self._resolution = resolution
+        self._tick: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _advance(self, now: float) -> None:
+        tick = int(now / self._resolution)
+        if self._tick is None:
+            self._tick = tick
+            return
+        # One lap covers every slot
+        for t in range(max(self._tick + 1, tick - len(self._wheel) + 1), tick + 1):
+            slot = self._wheel[t % len(self._wheel)]
+            for key in [key for key in slot if self._buckets[key].full_at <= now]:
+                slot.discard(key)
+                del self._buckets[key]
+        self._tick = max(self._tick, tick)
+
+    def take(self, limits: Sequence[Limit], now: float, cost: float = 1.0) -> float:
+        """Take cost tokens from every bucket, or from none. Returns 0 when
+        allowed, else the seconds until all of them have enough tokens."""
+        self._advance(now)
+        levels = []
+        wait = 0.0
+        for key, rate, burst in limits:
+            bucket = self._buckets.get(key)
+            tokens = burst if bucket is None else _refill(bucket.tokens, bucket.updated, now, rate, burst)
+            levels.append(tokens)
+            if tokens < cost:
+                wait = max(wait, (cost - tokens) / rate)
+        if wait:
+            return wait
+
+        for (key, rate, burst), tokens in zip(limits, levels):
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = _Bucket()
+                bucket.slot = None
+            bucket.tokens = tokens - cost
+            bucket.updated = now
+            bucket.full_at = now + (burst - bucket.tokens) / rate
+            # First tick at or after full_at that a later sweep will visit
+            slot = (int(bucket.full_at / self._resolution) + 1) % len(self._wheel)
+            if slot != bucket.slot:
+                if bucket.slot is not None:
+                    self._wheel[bucket.slot].discard(key)
+                self._wheel[slot].add(key)
+                bucket.slot = slot
+        return 0.0
+
+
+class SharedTokenBuckets:
+    """
+    The same buckets in a SQLite file, so every worker process on the host
+    draws from them. Full buckets are deleted by a periodic sweep.
+
+    Times are wall-clock: the file outlives the process (and a reboot, which
+    restarts the monotonic clock). A row dated in the future, after the
+    clock was set back, is treated as a full bucket.
+    """
+
+    clock = staticmethod(time.time)
+
+    def __init__(self, path: str, sweep_interval: float = 60.0):
+        self.db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.execute("PRAGMA synchronous = OFF")
+        self.db.execute("PRAGMA busy_timeout = 1000")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "key BLOB PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, full_at REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_buckets_full_at ON buckets(full_at)")
+        self._sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM buckets").fetchone()[0]
+
+    def take(self, limits: Sequence[Limit], now: float, cost: float = 1.0) -> float:
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            if now >= self._next_sweep:
+                self.db.execute("DELETE FROM buckets WHERE full_at <= ?", (now,))
+                self._next_sweep = now + self._sweep_interval
+
+            levels = []
+            wait = 0.0
+            for key, rate, burst in limits:
+                row = self.db.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+                tokens = burst if row is None or row[1] > now else _refill(row[0], row[1], now, rate, burst)
+                levels.append(tokens)
+                if tokens < cost:
+                    wait = max(wait, (cost - tokens) / rate)
+
+            if not wait:
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?)",
+                    [
+                        (key, tokens - cost, now, now + (burst - tokens + cost) / rate)
+                        for (key, rate, burst), tokens in zip(limits, levels)
+                    ]
+                )
+            self.db.execute("COMMIT")
+            return wait
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+
+
+class RateLimiter:
+    """
+    Per-API-key and per-role token buckets, checked by get_current_user
+    before it does any DB work.
+
+    A key draws from its own bucket (limits of its role) and, when a
+    role-wide rate is set, from the bucket shared by all keys of that role.
+    The role is taken from the auth cache; keys not cached yet are limited
+    as members. With rate_limit_shared_path the buckets live in a SQLite
+    file shared by the workers on the host; if that file is unavailable
+    requests are let through.
+    """
+
+    _lock = threading.Lock()
+    _buckets: Optional[Union[TokenBuckets, SharedTokenBuckets]] = None
+
+    @classmethod
+    def _store(cls):
+        if cls._buckets is None:
+            path = get_settings().rate_limit_shared_path
+            cls._buckets = SharedTokenBuckets(path) if path else TokenBuckets()
+        return cls._buckets
+
+    @staticmethod
+    def _limits(api_key: str, role: Optional[UserRole]) -> List[Limit]:
+        settings = get_settings()
+        if role == UserRole.ADMIN:
+            key_rate, key_burst = settings.rate_limit_admin_per_second, settings.rate_limit_admin_burst
+            role_rate, role_burst = settings.rate_limit_admin_role_per_second, settings.rate_limit_admin_role_burst
+        else:
+            key_rate, key_burst = settings.rate_limit_member_per_second, settings.rate_limit_member_burst
+            role_rate, role_burst = settings.rate_limit_member_role_per_second, settings.rate_limit_member_role_burst
+
+        limits = []
+        if key_rate > 0:
+            limits.append((_bucket_key(api_key), key_rate, max(key_burst, 1)))
+        if role_rate > 0:
+            # Unverified keys get a budget of their own, so a flood of made-up
+            # keys cannot use up the members' one
+            role_name = role.value if role else "unverified"
+            limits.append((f"role:{role_name}".encode(), role_rate, max(role_burst, 1)))
+        return limits
+
+    @classmethod
+    def check(cls, api_key: str, role: Optional[UserRole]) -> Optional[int]:
+        """Spend one request for this key. Returns None when allowed, else
+        the Retry-After value in whole seconds."""
+        if not get_settings().rate_limit_enabled:
+            return None
+        limits = cls._limits(api_key, role)
+        if not limits:
+            return None
+        with cls._lock:
+            try:
+                store = cls._store()
+                wait = store.take(limits, store.clock())
+            except sqlite3.Error:
+                return None
+        return max(1, math.ceil(wait)) if wait else None
+
+    @classmethod
+    def tracked(cls) -> int:
+        """Buckets currently held (not yet refilled)"""
+        with cls._lock:
+            return len(cls._store())
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            if isinstance(cls._buckets, SharedTokenBuckets):
+                cls._buckets.db.close()
+            cls._buckets = None
@@ -0,0 +1,45 @@
+from app.config import get_settings
+from app.tracing import DbTracer
+
+
+class TracingMiddleware:
+    """
+    Pure ASGI middleware tracing the DB calls of each request. Adds a
+    Server-Timing header with the calls made before the response started
+    and logs slow or chatty requests once the response has finished.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        settings = get_settings()
+        self.threshold_ms = settings.slow_request_threshold_ms
+        self.max_calls = settings.slow_request_max_db_calls
+        self.server_timing = settings.db_trace_server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = DbTracer.begin(f"{scope['method']} {scope['path']}")
+        trace = DbTracer.current()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                trace.streaming = any(
+                    name.lower() == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in headers
+                )
+                if self.server_timing:
+                    headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            DbTracer.end(token, status, self.threshold_ms, self.max_calls)
@@ -1,11 +1,11 @@
 from .user import User, UserCreate, UserResponse, UserRole, UserUpdateCredits
 from .rule import Rule, RuleCreate, RuleResponse, RuleAction, RegexValidateRequest, ApprovalStatus, VoteType, RuleVoteCreate, RuleVoteResponse, RuleNotification
-from .command import Command, CommandSubmit, CommandResponse, CommandStatus
+from .command import Command, CommandSubmit, CommandBatchSubmit, CommandResponse, CommandStatus
 from .audit import AuditLog, AuditLogResponse
 
 __all__ = [
     "User", "UserCreate", "UserResponse", "UserRole", "UserUpdateCredits",
     "Rule", "RuleCreate", "RuleResponse", "RuleAction", "RegexValidateRequest", "ApprovalStatus", "VoteType", "RuleVoteCreate", "RuleVoteResponse", "RuleNotification",
-    "Command", "CommandSubmit", "CommandResponse", "CommandStatus",
+    "Command", "CommandSubmit", "CommandBatchSubmit", "CommandResponse", "CommandStatus",
     "AuditLog", "AuditLogResponse"
 ]
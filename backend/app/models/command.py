@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -23,6 +23,10 @@ class CommandSubmit(BaseModel):
     command_text: str
 
 
+class CommandBatchSubmit(BaseModel):
+    commands: List[str] = Field(..., min_length=1)
+
+
 class CommandResponse(BaseModel):
     id: int
     command_text: str
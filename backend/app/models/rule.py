@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
 from datetime import datetime
 
@@ -36,6 +36,16 @@ class RuleCreate(BaseModel):
     approval_threshold: Optional[int] = 1
 
 
+class RuleVoteResponse(BaseModel):
+    id: int
+    rule_id: int
+    admin_id: int
+    admin_name: str
+    vote: str
+    comment: Optional[str] = None
+    voted_at: datetime
+
+
 class RuleResponse(BaseModel):
     id: int
     pattern: str
@@ -48,6 +58,7 @@ class RuleResponse(BaseModel):
     created_at: Optional[datetime] = None
     approval_count: Optional[int] = 0
     rejection_count: Optional[int] = 0
+    votes: Optional[List[RuleVoteResponse]] = None
 
 
 class RegexValidateRequest(BaseModel):
@@ -59,16 +70,6 @@ class RuleVoteCreate(BaseModel):
     comment: Optional[str] = None
 
 
-class RuleVoteResponse(BaseModel):
-    id: int
-    rule_id: int
-    admin_id: int
-    admin_name: str
-    vote: str
-    comment: Optional[str] = None
-    voted_at: datetime
-
-
 class RuleNotification(BaseModel):
     id: int
     rule_id: int
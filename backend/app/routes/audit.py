@@ -1,24 +1,68 @@
-from fastapi import APIRouter, Depends
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from datetime import datetime
 from app.models import AuditLogResponse
 from app.middleware import require_admin
-from app.services import AuditService
+from app.serialization import ListSerializer
+from app.services import AuditService, AuditSink, HistoryRetention
+from app.services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+from app.services.export_service import ExportService, ExportFormat, MEDIA_TYPES, AUDIT_EXPORT_FIELDS, EXPORT_PAGE_SIZE
 
 router = APIRouter(prefix="/api/audit", tags=["audit"])
 
+AUDIT_LOGS = ListSerializer(AuditLogResponse)
+
 
 @router.get("", response_model=List[AuditLogResponse], dependencies=[Depends(require_admin)])
-async def get_audit_logs():
-    """Get all audit logs (admin only)"""
-    logs = AuditService.get_all_logs()
-    return [
-        AuditLogResponse(
-            id=log["id"],
-            user_id=log["user_id"],
-            user_name=log.get("user_name", "Unknown"),
-            event=log["event"],
-            meta=log.get("meta", {}),
-            timestamp=log["timestamp"]
-        )
-        for log in logs
-    ]
+async def get_audit_logs(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    user_id: Optional[int] = None,
+    event: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """Get audit logs, newest first, one page at a time (admin only)
+    
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    """
+    try:
+        logs, next_cursor = await AuditService.get_all_logs(limit, cursor, user_id, event, since, until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return AUDIT_LOGS.response(logs, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
+
+
+@router.get("/export", dependencies=[Depends(require_admin)])
+async def export_audit_logs(
+    format: ExportFormat = ExportFormat.NDJSON,
+    gzip: bool = False,
+    user_id: Optional[int] = None,
+    event: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """Stream audit logs as NDJSON or CSV, newest first (admin only)"""
+    async def fetch_page(cursor):
+        return await AuditService.get_all_logs(EXPORT_PAGE_SIZE, cursor, user_id, event, since, until)
+    
+    filename = ExportService.filename("audit_logs", format, gzip)
+    return StreamingResponse(
+        ExportService.stream(fetch_page, AUDIT_EXPORT_FIELDS, format, gzip),
+        media_type="application/gzip" if gzip else MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/sink", dependencies=[Depends(require_admin)])
+async def get_audit_sink_stats():
+    """Write-behind audit sink queue depth and flush latency (admin only)"""
+    return AuditSink.stats()
+
+
+@router.get("/retention", dependencies=[Depends(require_admin)])
+async def get_history_retention_stats():
+    """History retention job runs and archived months per table (admin only)"""
+    return HistoryRetention.stats()
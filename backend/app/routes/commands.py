@@ -1,17 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
-from app.models import User, CommandSubmit, CommandResponse
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from datetime import datetime
+from app.config import get_settings
+from app.models import User, UserRole, CommandSubmit, CommandBatchSubmit, CommandResponse, CommandStatus
 from app.middleware import get_current_user
+from app.serialization import ListSerializer
 from app.services import CommandService
+from app.services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+from app.services.export_service import ExportService, ExportFormat, MEDIA_TYPES, COMMAND_EXPORT_FIELDS, EXPORT_PAGE_SIZE
 
 router = APIRouter(prefix="/api/commands", tags=["commands"])
 
+COMMAND_HISTORY = ListSerializer(CommandResponse)
+
 
 @router.post("", response_model=CommandResponse)
 async def submit_command(command: CommandSubmit, current_user: User = Depends(get_current_user)):
     """Submit a command for processing"""
+    max_length = get_settings().command_max_length
+    if max_length and len(command.command_text) > max_length:
+        raise HTTPException(status_code=400, detail=f"Commands are limited to {max_length} characters")
+    
     try:
-        result = CommandService.process_command(current_user.id, command.command_text)
+        result = await CommandService.process_command(current_user.id, command.command_text)
         return CommandResponse(
             id=result["id"],
             command_text=command.command_text,
@@ -25,19 +37,76 @@ async def submit_command(command: CommandSubmit, current_user: User = Depends(ge
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/batch", response_model=List[CommandResponse])
+async def submit_command_batch(batch: CommandBatchSubmit, current_user: User = Depends(get_current_user)):
+    """Submit several commands in one request
+    
+    Commands are evaluated in order against one ruleset snapshot. Executed
+    commands spend one credit each; once credits run out the remaining
+    commands are rejected with action NO_CREDITS.
+    """
+    max_size = get_settings().command_batch_max_size
+    if len(batch.commands) > max_size:
+        raise HTTPException(status_code=400, detail=f"At most {max_size} commands per batch")
+    max_length = get_settings().command_max_length
+    if max_length and any(len(command_text) > max_length for command_text in batch.commands):
+        raise HTTPException(status_code=400, detail=f"Commands are limited to {max_length} characters")
+    
+    try:
+        results = await CommandService.process_batch(current_user.id, batch.commands)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return [CommandResponse(**result) for result in results]
+
+
 @router.get("/history", response_model=List[CommandResponse])
-async def get_command_history(current_user: User = Depends(get_current_user)):
-    """Get command history for current user"""
-    commands = CommandService.get_user_commands(current_user.id)
-    return [
-        CommandResponse(
-            id=cmd.id,
-            command_text=cmd.command_text,
-            status=cmd.status.value,
-            action=cmd.action,
-            result_message=cmd.result_message,
-            new_balance=None,
-            created_at=cmd.created_at.isoformat() if cmd.created_at else ""
-        )
-        for cmd in commands
-    ]
+async def get_command_history(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status: Optional[CommandStatus] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Get command history for current user, newest first, one page at a time
+    
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    """
+    try:
+        commands, next_cursor = await CommandService.get_user_commands(current_user.id, limit, cursor, status, since, until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return COMMAND_HISTORY.response(commands, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
+
+
+@router.get("/export")
+async def export_command_history(
+    format: ExportFormat = ExportFormat.NDJSON,
+    gzip: bool = False,
+    user_id: Optional[int] = None,
+    status: Optional[CommandStatus] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Stream command history as NDJSON or CSV, newest first
+    
+    Members export their own history. Admins may pass user_id, or omit it
+    to export every user's commands.
+    """
+    if current_user.role != UserRole.ADMIN:
+        if user_id is not None and user_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Admin access required")
+        user_id = current_user.id
+    
+    async def fetch_page(cursor):
+        return await CommandService.get_commands_page(EXPORT_PAGE_SIZE, cursor, user_id, status, since, until)
+    
+    filename = ExportService.filename("commands", format, gzip)
+    return StreamingResponse(
+        ExportService.stream(fetch_page, COMMAND_EXPORT_FIELDS, format, gzip),
+        media_type="application/gzip" if gzip else MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
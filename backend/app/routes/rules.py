@@ -1,11 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from datetime import datetime
 from app.models import Rule, RuleCreate, RuleResponse, RegexValidateRequest, RuleVoteCreate, RuleVoteResponse, RuleNotification
 from app.middleware import require_admin, get_current_user
-from app.services import RuleService, VotingService
+from app.config import get_settings
+from app.serialization import ListSerializer
+from app.services import RuleService, VotingService, PatternTestService, NotificationHub, DecisionCache
+from app.services.export_service import ExportFormat, MEDIA_TYPES
+from app.services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
 
 router = APIRouter(prefix="/api/rules", tags=["rules"])
 
+PENDING_RULES = ListSerializer(RuleResponse, fill_defaults=True)
+
 
 @router.post("", response_model=RuleResponse, dependencies=[Depends(require_admin)])
 async def create_rule(rule_create: RuleCreate, force: bool = False, current_user=Depends(get_current_user)):
@@ -16,9 +24,12 @@ async def create_rule(rule_create: RuleCreate, force: bool = False, current_user
         force: If True, create rule even if conflicts exist
     """
     try:
+        # Reject invalid or backtracking-prone patterns before running them over the corpus
+        RuleService.check_pattern(rule_create.pattern)
+        
         # Check for conflicts unless force is True
         if not force:
-            conflict_result = RuleService.detect_conflicts(rule_create.pattern)
+            conflict_result = await RuleService.detect_conflicts(rule_create.pattern)
             if conflict_result["has_conflicts"]:
                 raise HTTPException(
                     status_code=409,
@@ -29,9 +40,9 @@ async def create_rule(rule_create: RuleCreate, force: bool = False, current_user
                 )
         
         # Create rule with voting system
-        rule = VotingService.create_rule_with_approval(rule_create.dict(), current_user.id)
+        rule = await VotingService.create_rule_with_approval(rule_create.dict(), current_user.id)
         
-        return RuleResponse(**rule, approval_count=0, rejection_count=0)
+        return RuleResponse(**rule)
     except HTTPException:
         raise
     except ValueError as e:
@@ -43,7 +54,7 @@ async def create_rule(rule_create: RuleCreate, force: bool = False, current_user
 @router.get("", response_model=List[RuleResponse], dependencies=[Depends(require_admin)])
 async def get_all_rules():
     """Get all active rules (admin only)"""
-    rules = RuleService.get_all_rules()
+    rules = await RuleService.get_all_rules()
     return [
         RuleResponse(
             id=rule.id,
@@ -61,11 +72,15 @@ async def get_all_rules():
 
 
 @router.get("/pending", response_model=List[RuleResponse], dependencies=[Depends(require_admin)])
-async def get_pending_rules():
-    """Get all rules pending approval (admin only)"""
+async def get_pending_rules(include_votes: bool = False):
+    """Get all rules pending approval (admin only)
+    
+    Args:
+        include_votes: Embed each rule's votes in the response
+    """
     try:
-        rules = VotingService.get_pending_rules()
-        return [RuleResponse(**rule) for rule in rules]
+        rules = await VotingService.get_pending_rules(include_votes)
+        return PENDING_RULES.response(rules)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -74,7 +89,7 @@ async def get_pending_rules():
 async def vote_on_rule(rule_id: int, vote_data: RuleVoteCreate, current_user=Depends(get_current_user)):
     """Vote on a pending rule (admin only)"""
     try:
-        result = VotingService.vote_on_rule(rule_id, current_user.id, vote_data)
+        result = await VotingService.vote_on_rule(rule_id, current_user.id, vote_data)
         return result
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -86,18 +101,90 @@ async def vote_on_rule(rule_id: int, vote_data: RuleVoteCreate, current_user=Dep
 async def get_rule_votes(rule_id: int):
     """Get all votes for a rule (admin only)"""
     try:
-        votes = VotingService.get_rule_votes(rule_id)
+        votes = await VotingService.get_rule_votes(rule_id)
         return [RuleVoteResponse(**vote) for vote in votes]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/notifications", response_model=List[RuleNotification], dependencies=[Depends(require_admin)])
-async def get_notifications(current_user=Depends(get_current_user), unread_only: bool = False):
-    """Get notifications for current admin"""
+async def get_notifications(
+    response: Response,
+    current_user=Depends(get_current_user),
+    unread_only: bool = False,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """Get notifications for current admin, newest first, one page at a time
+    
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    """
     try:
-        notifications = VotingService.get_admin_notifications(current_user.id, unread_only)
+        notifications, next_cursor = await VotingService.get_admin_notifications(
+            current_user.id, unread_only, limit, cursor, since, until
+        )
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         return [RuleNotification(**notif) for notif in notifications]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/notifications/unread-count", dependencies=[Depends(require_admin)])
+async def get_unread_count(current_user=Depends(get_current_user)):
+    """Number of unread notifications for current admin"""
+    try:
+        return {"unread_count": await VotingService.get_unread_count(current_user.id)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/notifications/stream", dependencies=[Depends(require_admin)])
+async def stream_notifications(request: Request, current_user=Depends(get_current_user)):
+    """Server-Sent Events stream of new notifications and unread counts for current admin
+    
+    Events: "unread" ({"unread_count": n}) on connect and whenever it changes,
+    "notification" (same shape as GET /notifications items) for each new one.
+    """
+    try:
+        unread_count = await VotingService.get_unread_count(current_user.id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return StreamingResponse(
+        NotificationHub.stream(current_user.id, unread_count, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.put("/notifications/mark-all-read", dependencies=[Depends(require_admin)])
+async def mark_all_notifications_read(current_user=Depends(get_current_user)):
+    """Mark all notifications of current admin as read"""
+    try:
+        updated = await VotingService.mark_notifications_read(current_user.id)
+        return {"updated": updated}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.put("/notifications/mark-read", dependencies=[Depends(require_admin)])
+async def mark_notifications_read(ids: List[str] = Query(...), current_user=Depends(get_current_user)):
+    """Mark several notifications as read (?ids=1,2,3 or ?ids=1&ids=2)"""
+    try:
+        notification_ids = [int(part) for value in ids for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be integers")
+    if not notification_ids:
+        raise HTTPException(status_code=400, detail="ids are required")
+    
+    try:
+        updated = await VotingService.mark_notifications_read(current_user.id, notification_ids)
+        return {"updated": updated}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -106,7 +193,7 @@ async def get_notifications(current_user=Depends(get_current_user), unread_only:
 async def mark_notification_read(notification_id: int, current_user=Depends(get_current_user)):
     """Mark a notification as read"""
     try:
-        VotingService.mark_notification_read(notification_id, current_user.id)
+        await VotingService.mark_notification_read(notification_id, current_user.id)
         return {"message": "Notification marked as read"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -115,7 +202,7 @@ async def mark_notification_read(notification_id: int, current_user=Depends(get_
 @router.delete("/{rule_id}", dependencies=[Depends(require_admin)])
 async def delete_rule(rule_id: int):
     """Delete a rule (admin only)"""
-    success = RuleService.delete_rule(rule_id)
+    success = await RuleService.delete_rule(rule_id)
     if not success:
         raise HTTPException(status_code=404, detail="Rule not found")
     return {"message": "Rule deleted successfully"}
@@ -125,10 +212,13 @@ async def delete_rule(rule_id: int):
 async def validate_regex(request: RegexValidateRequest):
     """Validate a regex pattern (admin only)"""
     is_valid, error = RuleService.validate_regex(request.pattern)
-    if is_valid:
-        return {"valid": True, "message": "Regex pattern is valid"}
-    else:
+    if not is_valid:
         return {"valid": False, "message": f"Invalid regex: {error}"}
+    
+    allowed, risk = RuleService.backtracking_allowed(request.pattern)
+    if not allowed:
+        return {"valid": False, "message": f"Pattern has {risk['level']} backtracking risk: {risk['reason']}", "backtracking": risk}
+    return {"valid": True, "message": "Regex pattern is valid", "backtracking": risk}
 
 
 @router.post("/check-conflicts", dependencies=[Depends(require_admin)])
@@ -141,27 +231,99 @@ async def check_conflicts(request: dict):
         raise HTTPException(status_code=400, detail="Pattern is required")
     
     try:
-        result = RuleService.detect_conflicts(pattern, test_commands)
+        result = await RuleService.detect_conflicts(pattern, test_commands)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/analysis", dependencies=[Depends(require_admin)])
+async def analyze_rules(include_same_action: bool = False):
+    """Static overlap and shadowing analysis of the active rules (admin only)
+    
+    Args:
+        include_same_action: Also report overlaps between rules with the same action
+    """
+    try:
+        return await RuleService.analyze_rules(include_same_action)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/decision-cache", dependencies=[Depends(require_admin)])
+async def get_decision_cache_stats():
+    """Rule decision cache size and hit rate, for sizing it (admin only)"""
+    return DecisionCache.stats()
+
+
+@router.get("/slow", dependencies=[Depends(require_admin)])
+async def get_slow_rules():
+    """Rules skipped for overrunning the match time budget (admin only)"""
+    try:
+        return await RuleService.slow_rules()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/test-commands", dependencies=[Depends(require_admin)])
+async def get_test_commands():
+    """List the command corpus used for conflict detection (admin only)"""
+    try:
+        commands = await RuleService.get_test_commands()
+        return {"commands": commands, "total": len(commands)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/test-commands", dependencies=[Depends(require_admin)])
+async def register_test_commands(request: dict, current_user=Depends(get_current_user)):
+    """Add commands to the conflict-detection corpus (admin only)"""
+    commands = request.get("commands")
+    
+    if not commands or not isinstance(commands, list):
+        raise HTTPException(status_code=400, detail="Commands are required")
+    
+    try:
+        added = await RuleService.register_test_commands([str(c) for c in commands], current_user.id)
+        return {"added": added}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/test-pattern", dependencies=[Depends(require_admin)])
-async def test_pattern(request: dict):
-    """Test a pattern against specific commands (admin only)"""
+async def test_pattern(request: dict, stream: bool = False):
+    """Test a pattern against specific commands (admin only)
+    
+    Args:
+        stream: If True, stream one NDJSON line per command followed by a summary line
+    """
     pattern = request.get("pattern")
     commands = request.get("commands")
     
     if not pattern:
         raise HTTPException(status_code=400, detail="Pattern is required")
-    if not commands:
+    if not commands or not isinstance(commands, list):
         raise HTTPException(status_code=400, detail="Commands are required")
     
+    max_commands = get_settings().pattern_test_max_commands
+    if len(commands) > max_commands:
+        raise HTTPException(status_code=400, detail=f"At most {max_commands} commands per request")
+    
+    # The pattern runs against every command, on the event loop below the
+    # pool threshold: refuse what create_rule would refuse
     try:
-        results = RuleService.test_pattern_against_commands(pattern, commands)
-        return {"results": results}
+        RuleService.check_pattern(pattern)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    
+    commands = [str(command) for command in commands]
+    if stream:
+        return StreamingResponse(
+            PatternTestService.stream_ndjson(pattern, commands),
+            media_type=MEDIA_TYPES[ExportFormat.NDJSON]
+        )
+    
+    try:
+        return await PatternTestService.test(pattern, commands)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,17 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
-from app.models import User, UserCreate, UserResponse, UserUpdateCredits
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Optional
+from app.models import User, UserCreate, UserResponse, UserUpdateCredits, UserRole
 from app.middleware import require_admin, get_current_user
+from app.serialization import ListSerializer
 from app.services import UserService
+from app.services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
+USERS = ListSerializer(UserResponse)
+
 
 @router.post("", response_model=UserResponse, dependencies=[Depends(require_admin)])
 async def create_user(user_create: UserCreate):
     """Create a new user (admin only)"""
     try:
-        user = UserService.create_user(user_create)
+        user = await UserService.create_user(user_create)
         return UserResponse(
             id=user.id,
             name=user.name,
@@ -24,19 +28,21 @@ async def create_user(user_create: UserCreate):
 
 
 @router.get("", response_model=List[UserResponse], dependencies=[Depends(require_admin)])
-async def get_all_users():
-    """Get all users (admin only)"""
-    users = UserService.get_all_users()
-    return [
-        UserResponse(
-            id=user.id,
-            name=user.name,
-            api_key=user.api_key,
-            role=user.role.value,
-            credits=user.credits
-        )
-        for user in users
-    ]
+async def get_all_users(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    role: Optional[UserRole] = None
+):
+    """Get users ordered by id, one page at a time (admin only)
+    
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    """
+    try:
+        users, next_cursor = await UserService.get_all_users(limit, cursor, role)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return USERS.response(users, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
 
 
 @router.get("/me", response_model=UserResponse)
@@ -55,7 +61,7 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
 async def update_user_credits(user_id: int, update: UserUpdateCredits):
     """Update user credits (admin only)"""
     try:
-        user = UserService.update_credits(user_id, update.credits)
+        user = await UserService.update_credits(user_id, update.credits)
         return UserResponse(
             id=user.id,
             name=user.name,
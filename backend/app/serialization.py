@@ -0,0 +1,75 @@
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Type, Union, get_args, get_origin
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from typing_extensions import TypedDict
+
+
+def _row_annotation(annotation: Any) -> Any:
+    """The annotation with every model in it replaced by its row TypedDict"""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _row_type(annotation)
+    args = get_args(annotation)
+    if not args:
+        return annotation
+    origin = get_origin(annotation)
+    if origin is Union:
+        return Union[tuple(_row_annotation(arg) for arg in args)]
+    if origin in (list, List):
+        return List[_row_annotation(args[0])]
+    if origin in (dict, Dict):
+        return Dict[args[0], _row_annotation(args[1])]
+    return annotation
+
+
+@lru_cache(maxsize=None)
+def _row_type(model: Type[BaseModel]) -> type:
+    return TypedDict(
+        f"{model.__name__}Row",
+        {name: _row_annotation(field.annotation) for name, field in model.model_fields.items()}
+    )
+
+
+def parse_timestamp(value: Optional[Union[str, datetime]]) -> Optional[datetime]:
+    """DB timestamp (ISO 8601 text) as a datetime, for fields the response
+    models declare as datetime"""
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+class ListSerializer:
+    """
+    JSON for list endpoints straight from DB rows.
+
+    Returning pydantic objects from a route costs a model per row, then
+    FastAPI validates and serializes each one again for response_model.
+    Routes keep response_model (the OpenAPI schema doesn't change) but
+    return serializer.response(rows): plain dicts dumped to bytes by a
+    serializer compiled once from the model's fields, without validation.
+    Keys the model doesn't declare are left out. Rows must already hold
+    the values the model would produce (e.g. datetime objects for datetime
+    fields); with fill_defaults, missing optional fields get the model
+    defaults, otherwise rows must carry every field.
+    """
+
+    def __init__(self, model: Type[BaseModel], fill_defaults: bool = False):
+        self.model = model
+        self._adapter = TypeAdapter(List[_row_type(model)])
+        self._defaults: Optional[Dict[str, Any]] = None
+        if fill_defaults:
+            self._defaults = {
+                name: field.get_default(call_default_factory=True)
+                for name, field in model.model_fields.items() if not field.is_required()
+            }
+
+    def dumps(self, rows: Sequence[Mapping[str, Any]]) -> bytes:
+        if self._defaults:
+            rows = [{**self._defaults, **row} for row in rows]
+        # Warnings would fire for every value passed as a plain dict instead
+        # of a model, which is the point here
+        return self._adapter.dump_json(rows, warnings=False)
+
+    def response(self, rows: Sequence[Mapping[str, Any]], headers: Optional[Dict[str, str]] = None) -> Response:
+        return Response(self.dumps(rows), media_type="application/json", headers=headers)
@@ -1,7 +1,14 @@
+from .ruleset_cache import RulesetCache
+from .decision_cache import DecisionCache
+from .audit_sink import AuditSink
+from .pattern_test_service import PatternTestService
+from .notification_hub import NotificationHub
 from .user_service import UserService
 from .rule_service import RuleService
 from .command_service import CommandService
 from .audit_service import AuditService
 from .voting_service import VotingService
+from .history_archive import HistoryArchive
+from .history_retention import HistoryRetention
 
-__all__ = ["UserService", "RuleService", "CommandService", "AuditService", "VotingService"]
+__all__ = ["UserService", "RuleService", "CommandService", "AuditService", "VotingService", "RulesetCache", "DecisionCache", "AuditSink", "PatternTestService", "NotificationHub", "HistoryArchive", "HistoryRetention"]
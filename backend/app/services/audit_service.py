@@ -1,32 +1,54 @@
-from typing import List, Dict, Any, Optional
-from app.database import supabase_admin
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Tuple
 from app.models import AuditLog
+from app.services.audit_sink import AuditSink
+from app.services.history_archive import HistoryArchive
+from app.services.pagination import DEFAULT_PAGE_SIZE
+from app.storage import get_storage
 
 
 class AuditService:
     @staticmethod
-    def log_event(user_id: int, event: str, meta: Optional[Dict[str, Any]] = None) -> AuditLog:
-        """Log an audit event"""
+    async def log_event(user_id: int, event: str, meta: Optional[Dict[str, Any]] = None, wait: bool = False) -> AuditLog:
+        """Log an audit event
+        
+        By default the event is handed to the write-behind AuditSink and the
+        returned AuditLog has no id. Pass wait=True to insert synchronously
+        and get the stored row back.
+        """
         audit_data = {
             "user_id": user_id,
             "event": event,
-            "meta": meta or {}
+            "meta": meta or {},
+            # Event time, not flush time
+            "timestamp": datetime.now(timezone.utc).isoformat()
         }
         
-        response = supabase_admin.table("audit_logs").insert(audit_data).execute()
-        
-        if not response.data:
-            raise Exception("Failed to create audit log")
+        if not wait and AuditSink.enqueue(audit_data):
+            return AuditLog(**audit_data)
         
-        return AuditLog(**response.data[0])
+        return AuditLog(**await get_storage().audit.insert(audit_data))
     
     @staticmethod
-    def get_all_logs() -> List[Dict[str, Any]]:
-        """Get all audit logs with user information"""
-        response = supabase_admin.table("audit_logs").select("*, users(name)").order("timestamp", desc=True).execute()
+    async def get_all_logs(
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        user_id: Optional[int] = None,
+        event: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Get one page of audit logs (newest first) with user information.
+        Returns (logs, next_cursor). Months moved out by the retention job
+        are read from the archive when the page reaches them."""
+        rows, next_cursor = await HistoryArchive.page(
+            "audit_logs",
+            await get_storage().audit.page(limit, cursor, user_id, event, since, until),
+            limit, cursor, {"user_id": user_id, "event": event}, since, until
+        )
         
         logs = []
-        for log in response.data:
+        for log in rows:
             log_data = {
                 "id": log["id"],
                 "user_id": log["user_id"],
@@ -37,4 +59,4 @@ class AuditService:
             }
             logs.append(log_data)
         
-        return logs
+        return logs, next_cursor
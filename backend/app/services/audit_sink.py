@@ -0,0 +1,241 @@
+import asyncio
+import contextvars
+import glob
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from app.config import get_settings
+from app.storage import get_storage
+
+_STOP = object()
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # No cheap check; leave the file to its owner
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class AuditSink:
+    """
+    Write-behind buffer for audit_logs.
+
+    Request handlers only enqueue. A background task bulk-inserts batches
+    when batch_size records are waiting or flush_interval has passed,
+    retrying with exponential backoff. Batches that still fail are appended
+    to a local JSONL spill file, which is replayed after the next successful
+    flush and on startup by whichever worker claims it first. stop() drains
+    the queue before returning.
+    """
+
+    _queue: Optional[asyncio.Queue] = None
+    _task: Optional[asyncio.Task] = None
+    _replaying = False
+    _stats: Dict[str, Any] = {
+        "enqueued": 0,
+        "flushed": 0,
+        "spilled": 0,
+        "replayed": 0,
+        "skipped_spill_lines": 0,
+        "failed_flushes": 0,
+        "last_batch_size": 0,
+        "last_flush_ms": 0.0,
+        "max_flush_ms": 0.0,
+    }
+
+    @classmethod
+    def is_running(cls) -> bool:
+        return cls._task is not None and not cls._task.done()
+
+    @classmethod
+    async def start(cls) -> None:
+        settings = get_settings()
+        if not settings.audit_sink_enabled or cls.is_running():
+            return
+        cls._queue = asyncio.Queue(maxsize=settings.audit_queue_max_size)
+        cls._task = asyncio.create_task(cls._run(), context=contextvars.Context())
+        await cls._replay_spill()
+
+    @classmethod
+    async def stop(cls) -> None:
+        """Flush everything still queued and stop the background task"""
+        if not cls.is_running():
+            return
+        await cls._queue.put(_STOP)
+        await cls._task
+        cls._task = None
+        cls._queue = None
+
+    @classmethod
+    def enqueue(cls, record: Dict[str, Any]) -> bool:
+        """Queue a record for insertion. Returns False if the sink is not running."""
+        if not cls.is_running():
+            return False
+        try:
+            cls._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            # Never block the request path; keep the record on disk instead
+            cls._spill([record])
+            return True
+        cls._stats["enqueued"] += 1
+        return True
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        return {
+            **cls._stats,
+            "running": cls.is_running(),
+            "queue_depth": cls._queue.qsize() if cls._queue else 0,
+            "queue_max_size": cls._queue.maxsize if cls._queue else 0,
+        }
+
+    @classmethod
+    async def _run(cls) -> None:
+        settings = get_settings()
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            item = await cls._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+
+            deadline = loop.time() + settings.audit_flush_interval_seconds
+            while len(batch) < settings.audit_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(cls._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await cls._flush(batch)
+
+    @classmethod
+    async def _flush(cls, batch: List[Dict[str, Any]]) -> None:
+        settings = get_settings()
+        start = time.perf_counter()
+
+        for attempt in range(settings.audit_flush_max_retries + 1):
+            try:
+                await get_storage().audit.insert_many(batch)
+                break
+            except Exception:
+                cls._stats["failed_flushes"] += 1
+                if attempt < settings.audit_flush_max_retries:
+                    await asyncio.sleep(settings.audit_retry_backoff_seconds * (2 ** attempt))
+        else:
+            cls._spill(batch)
+            return
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        cls._stats["flushed"] += len(batch)
+        cls._stats["last_batch_size"] = len(batch)
+        cls._stats["last_flush_ms"] = round(elapsed_ms, 2)
+        cls._stats["max_flush_ms"] = round(max(cls._stats["max_flush_ms"], elapsed_ms), 2)
+
+        if os.path.exists(get_settings().audit_spill_path):
+            await cls._replay_spill()
+
+    @staticmethod
+    def _write_spill(path: str, records: List[Dict[str, Any]]) -> None:
+        with open(path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, default=str) + "\n")
+
+    @classmethod
+    def _spill(cls, records: List[Dict[str, Any]]) -> None:
+        cls._write_spill(get_settings().audit_spill_path, records)
+        cls._stats["spilled"] += len(records)
+
+    @staticmethod
+    def _read_spill(path: str) -> Tuple[List[Dict[str, Any]], int]:
+        """Records of a spill file, and the number of lines that didn't decode
+        (a line torn by a crash mid-write)"""
+        records, skipped = [], 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    skipped += 1
+        return records, skipped
+
+    @staticmethod
+    def _unclaimed(path: str) -> Iterator[str]:
+        """The spill file, then replay files left by workers that died mid-replay"""
+        yield path
+        for name in sorted(glob.glob(glob.escape(path) + ".replay*")):
+            pid = name.rsplit(".", 1)[-1]
+            if name == path + ".replay" or (pid.isdigit() and not _pid_alive(int(pid))):
+                yield name
+
+    @classmethod
+    async def _replay_spill(cls) -> None:
+        """
+        Insert the spilled records. Every worker shares the spill file, so a
+        worker claims it by renaming it to <path>.replay.<pid> (a rename
+        either fully happens or fails because another worker got there
+        first) and replays only what it claimed.
+        """
+        if cls._replaying:
+            return
+        cls._replaying = True
+        try:
+            path = get_settings().audit_spill_path
+            claimed = f"{path}.replay.{os.getpid()}"
+            while True:
+                # A claim of ours is only left over from a replay interrupted
+                # by a crash (of an earlier process with the same pid)
+                if not os.path.exists(claimed):
+                    source = next((name for name in cls._unclaimed(path) if os.path.exists(name)), None)
+                    if source is None:
+                        return
+                    try:
+                        os.rename(source, claimed)
+                    except FileNotFoundError:
+                        # Another worker took it
+                        continue
+                if not await cls._replay_claimed(path, claimed):
+                    return
+        finally:
+            cls._replaying = False
+
+    @classmethod
+    async def _replay_claimed(cls, path: str, claimed: str) -> bool:
+        """Replay a claimed file and remove it. Returns False if the DB is
+        still unavailable (the rest is spilled again)."""
+        settings = get_settings()
+        records, skipped = cls._read_spill(claimed)
+        cls._stats["skipped_spill_lines"] += skipped
+
+        replayed = True
+        for i in range(0, len(records), settings.audit_batch_size):
+            batch = records[i:i + settings.audit_batch_size]
+            try:
+                await get_storage().audit.insert_many(batch)
+            except Exception:
+                # DB still unavailable: put the rest back for the next attempt
+                cls._write_spill(path, records[i:])
+                replayed = False
+                break
+            cls._stats["replayed"] += len(batch)
+
+        os.remove(claimed)
+        return replayed
@@ -1,10 +1,15 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
-from app.database import supabase_admin
-from app.models import Command, CommandStatus, RuleAction
+from app.metrics import Metrics
+from app.middleware.auth_cache import AuthCache
+from app.models import CommandStatus, Rule, RuleAction
+from app.serialization import parse_timestamp
 from app.services.rule_service import RuleService
-from app.services.user_service import UserService
+from app.services.ruleset_cache import RulesetCache
 from app.services.audit_service import AuditService
+from app.services.history_archive import HistoryArchive
+from app.services.pagination import DEFAULT_PAGE_SIZE
+from app.storage import get_storage
 
 
 class CommandService:
@@ -14,151 +19,141 @@ class CommandService:
         return f"Mock execution for command: {command_text}"
     
     @staticmethod
-    def process_command(user_id: int, command_text: str) -> Dict[str, Any]:
+    def _outcome(matched_rule: Optional[Rule], command_text: str) -> Tuple[str, str]:
+        """Action and result message for a matched (or unmatched) command"""
+        if not matched_rule:
+            # No rule matched - reject by default
+            return "NO_RULE", "No matching rule found"
+        if matched_rule.action == RuleAction.AUTO_REJECT:
+            return matched_rule.action.value, f"Command rejected by rule: {matched_rule.description or 'Security policy'}"
+        return matched_rule.action.value, CommandService.mock_execute(command_text)
+    
+    @staticmethod
+    def _count_outcome(result: Dict[str, Any]) -> None:
+        if result["action"] == "NO_CREDITS":
+            outcome = "no_credits"
+        elif result["action"] == "NO_RULE":
+            outcome = "no_rule"
+        else:
+            outcome = result["status"]
+        Metrics.commands.inc(outcome)
+    
+    @staticmethod
+    async def process_command(user_id: int, command_text: str) -> Dict[str, Any]:
         """
         Process command with full workflow:
-        1. Check credits
-        2. Match against rules
-        3. Execute or reject
-        4. Deduct credit if executed
-        5. Log to audit
+        1. Match against the cached ruleset (no DB call)
+        2. In one DB transaction (storage commands.process):
+           check and deduct credits, store the command, log to audit
         
         Returns dict with status, output, new_balance, etc.
         """
-        # Check credits first
-        user = UserService.get_user_by_id(user_id)
-        if not user:
-            raise Exception("User not found")
+        matched_rule = await RuleService.match_command(command_text)
         
-        if user.credits <= 0:
-            # Log rejection due to no credits
-            AuditService.log_event(
-                user_id=user_id,
-                event="COMMAND_REJECTED",
-                meta={"command": command_text, "reason": "No credits"}
+        action, result_message = CommandService._outcome(matched_rule, command_text)
+        
+        try:
+            result = await get_storage().commands.process(
+                user_id,
+                command_text,
+                action,
+                result_message,
+                matched_rule.id if matched_rule else None,
+                matched_rule.description if matched_rule else None
             )
-            
-            # Store rejected command
-            command_data = {
-                "user_id": user_id,
-                "command_text": command_text,
-                "status": CommandStatus.REJECTED.value,
-                "action": "NO_CREDITS",
-                "result_message": "Insufficient credits"
-            }
-            supabase_admin.table("commands").insert(command_data).execute()
-            
+        except Exception as e:
+            if action == RuleAction.AUTO_ACCEPT.value:
+                # Log failure
+                await AuditService.log_event(
+                    user_id=user_id,
+                    event="COMMAND_FAILED",
+                    meta={"command": command_text, "error": str(e)}
+                )
+            raise
+        
+        CommandService._count_outcome(result)
+        
+        if result["action"] == "NO_CREDITS":
             raise Exception("Insufficient credits")
         
-        # Match against rules
-        matched_rule = RuleService.match_command(command_text)
+        if result["status"] == CommandStatus.EXECUTED.value:
+            # Balance changed outside UserService.update_credits
+            AuthCache.invalidate_user(user_id)
         
-        if not matched_rule:
-            # No rule matched - reject by default
-            AuditService.log_event(
-                user_id=user_id,
-                event="COMMAND_REJECTED",
-                meta={"command": command_text, "reason": "No matching rule"}
-            )
-            
-            command_data = {
-                "user_id": user_id,
-                "command_text": command_text,
-                "status": CommandStatus.REJECTED.value,
-                "action": "NO_RULE",
-                "result_message": "No matching rule found"
-            }
-            response = supabase_admin.table("commands").insert(command_data).execute()
-            
-            return {
-                "id": response.data[0]["id"],
-                "status": "rejected",
-                "result_message": "No matching rule found",
-                "action": "NO_RULE",
-                "new_balance": user.credits,
-                "created_at": response.data[0]["created_at"]
-            }
+        return {
+            "id": result["id"],
+            "status": result["status"],
+            "result_message": result["result_message"],
+            "action": result["action"],
+            "new_balance": result["new_balance"],
+            "created_at": result["created_at"]
+        }
+    
+    @staticmethod
+    async def process_batch(user_id: int, command_texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Process several commands in order with one ruleset snapshot and one
+        DB transaction (storage commands.process_batch).
         
-        # Handle AUTO_REJECT
-        if matched_rule.action == RuleAction.AUTO_REJECT:
-            AuditService.log_event(
-                user_id=user_id,
-                event="COMMAND_REJECTED",
-                meta={
-                    "command": command_text,
-                    "rule_id": matched_rule.id,
-                    "rule_description": matched_rule.description
-                }
-            )
-            
-            command_data = {
-                "user_id": user_id,
-                "command_text": command_text,
-                "status": CommandStatus.REJECTED.value,
-                "action": matched_rule.action.value,
-                "result_message": f"Command rejected by rule: {matched_rule.description or 'Security policy'}"
-            }
-            response = supabase_admin.table("commands").insert(command_data).execute()
-            
-            return {
-                "id": response.data[0]["id"],
-                "status": "rejected",
-                "result_message": command_data["result_message"],
-                "action": matched_rule.action.value,
-                "new_balance": user.credits,
-                "created_at": response.data[0]["created_at"]
-            }
+        Executed commands spend one credit each; once credits run out every
+        remaining command is rejected with action NO_CREDITS. Returns one
+        result dict per command, in input order.
+        """
+        ruleset = await RulesetCache.get()
         
-        # Handle AUTO_ACCEPT - atomic operation
-        try:
-            # Deduct credit
-            new_balance = UserService.deduct_credit(user_id)
-            
-            # Mock execute
-            output = CommandService.mock_execute(command_text)
-            
-            # Store command
-            command_data = {
-                "user_id": user_id,
+        items = []
+        for command_text in command_texts:
+            matched_rule = RuleService.match_in(ruleset, command_text)
+            action, result_message = CommandService._outcome(matched_rule, command_text)
+            items.append({
                 "command_text": command_text,
-                "status": CommandStatus.EXECUTED.value,
-                "action": matched_rule.action.value,
-                "result_message": output
-            }
-            response = supabase_admin.table("commands").insert(command_data).execute()
-            
-            # Log success
-            AuditService.log_event(
-                user_id=user_id,
-                event="COMMAND_EXECUTED",
-                meta={
-                    "command": command_text,
-                    "rule_id": matched_rule.id,
-                    "rule_description": matched_rule.description,
-                    "credits_remaining": new_balance
-                }
-            )
-            
-            return {
-                "id": response.data[0]["id"],
-                "status": "executed",
-                "result_message": output,
-                "action": matched_rule.action.value,
-                "new_balance": new_balance,
-                "created_at": response.data[0]["created_at"]
-            }
+                "action": action,
+                "result_message": result_message,
+                "rule_id": matched_rule.id if matched_rule else None,
+                "rule_description": matched_rule.description if matched_rule else None
+            })
         
-        except Exception as e:
-            # Log failure
-            AuditService.log_event(
-                user_id=user_id,
-                event="COMMAND_FAILED",
-                meta={"command": command_text, "error": str(e)}
-            )
-            raise
+        results = await get_storage().commands.process_batch(user_id, items)
+        
+        for result in results:
+            CommandService._count_outcome(result)
+        
+        if any(result["status"] == CommandStatus.EXECUTED.value for result in results):
+            AuthCache.invalidate_user(user_id)
+        
+        return results
+    
+    @staticmethod
+    async def get_commands_page(
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        user_id: Optional[int] = None,
+        status: Optional[CommandStatus] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Get one page of raw command rows (newest first), optionally for one user,
+        including archived months when the page reaches them. Returns (rows, next_cursor)."""
+        status_value = status.value if status else None
+        return await HistoryArchive.page(
+            "commands",
+            await get_storage().commands.page(limit, cursor, user_id, status_value, since, until),
+            limit, cursor, {"user_id": user_id, "status": status_value}, since, until
+        )
     
     @staticmethod
-    def get_user_commands(user_id: int) -> List[Command]:
-        """Get command history for a user"""
-        response = supabase_admin.table("commands").select("*").eq("user_id", user_id).order("created_at", desc=True).execute()
-        return [Command(**cmd) for cmd in response.data]
+    async def get_user_commands(
+        user_id: int,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        status: Optional[CommandStatus] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Get one page of command history for a user (newest first), shaped
+        like CommandResponse. Returns (commands, next_cursor)."""
+        rows, next_cursor = await CommandService.get_commands_page(limit, cursor, user_id, status, since, until)
+        for cmd in rows:
+            cmd["new_balance"] = None
+            cmd["created_at"] = parse_timestamp(cmd["created_at"]).isoformat() if cmd.get("created_at") else ""
+        return rows, next_cursor
@@ -0,0 +1,156 @@
+import asyncio
+import re
+import time
+from typing import Dict, Iterable, List, Optional, Pattern, Set
+from app.config import get_settings
+from app.models import Rule
+from app.storage import get_storage
+
+# Default test commands for conflict detection
+DEFAULT_TEST_COMMANDS = [
+    "ls -la",
+    "cat /etc/passwd",
+    "pwd",
+    "echo hello",
+    "git status",
+    "git log",
+    "git diff",
+    "rm -rf /",
+    "rm file.txt",
+    "mkfs.ext4 /dev/sda",
+    ":(){ :|:& };:",
+    "docker run nginx",
+    "npm install",
+    "sudo su",
+    "chmod 777 file",
+]
+
+
+class ConflictMatrix:
+    """
+    Rule x corpus match matrix used by conflict detection.
+
+    The corpus is DEFAULT_TEST_COMMANDS plus admin-registered commands
+    (rule_test_commands table). Each rule keeps a bitset of the corpus
+    commands it matches, and each corpus command keeps the set of rules
+    matching it. Adding or deleting a rule evaluates only that rule; a
+    conflict check evaluates only the new pattern and reads the columns of
+    the commands it matches, so its cost does not grow with the rule count.
+
+    Like RulesetCache, the matrix is per process: local writes update it
+    directly and a TTL re-sync (a diff against the DB) picks up the rest.
+    """
+
+    _corpus: List[str] = []
+    _corpus_index: Dict[str, int] = {}
+    _columns: List[Set[int]] = []
+    _rules: Dict[int, Rule] = {}
+    _regexes: Dict[int, Optional[Pattern]] = {}
+    _bits: Dict[int, int] = {}
+    _loaded_at: Optional[float] = None
+
+    @classmethod
+    async def refresh(cls, force: bool = False) -> None:
+        """Re-sync with the DB if the TTL has expired"""
+        ttl = get_settings().conflict_matrix_ttl_seconds
+        if not force and cls._loaded_at is not None and time.monotonic() - cls._loaded_at < ttl:
+            return
+
+        storage = get_storage()
+        rule_rows, corpus = await asyncio.gather(storage.rules.list(), storage.rules.test_commands())
+
+        cls.add_commands(DEFAULT_TEST_COMMANDS)
+        cls.add_commands(corpus)
+
+        rules = [Rule(**rule) for rule in rule_rows]
+        current_ids = {rule.id for rule in rules}
+        for rule_id in list(cls._rules):
+            if rule_id not in current_ids:
+                cls.remove_rule(rule_id)
+        for rule in rules:
+            cls.add_rule(rule)
+
+        cls._loaded_at = time.monotonic()
+
+    @classmethod
+    def add_commands(cls, commands: Iterable[str]) -> int:
+        """Add commands to the corpus, evaluating every known rule against each new one"""
+        added = 0
+        for command in commands:
+            if command in cls._corpus_index:
+                continue
+            index = len(cls._corpus)
+            cls._corpus.append(command)
+            cls._corpus_index[command] = index
+            column = set()
+            for rule_id, regex in cls._regexes.items():
+                if regex is not None and regex.search(command):
+                    column.add(rule_id)
+                    cls._bits[rule_id] |= 1 << index
+            cls._columns.append(column)
+            added += 1
+        return added
+
+    @classmethod
+    def add_rule(cls, rule: Rule) -> None:
+        """Add or update a rule; only re-evaluated when its pattern changed"""
+        existing = cls._rules.get(rule.id)
+        if existing is not None and existing.pattern == rule.pattern:
+            cls._rules[rule.id] = rule
+            return
+        if existing is not None:
+            cls.remove_rule(rule.id)
+
+        try:
+            regex = re.compile(rule.pattern)
+        except re.error:
+            # Invalid patterns never match
+            regex = None
+
+        bits = 0
+        if regex is not None:
+            for index, command in enumerate(cls._corpus):
+                if regex.search(command):
+                    bits |= 1 << index
+                    cls._columns[index].add(rule.id)
+
+        cls._rules[rule.id] = rule
+        cls._regexes[rule.id] = regex
+        cls._bits[rule.id] = bits
+
+    @classmethod
+    def remove_rule(cls, rule_id: int) -> None:
+        bits = cls._bits.pop(rule_id, 0)
+        cls._rules.pop(rule_id, None)
+        cls._regexes.pop(rule_id, None)
+        index = 0
+        while bits:
+            if bits & 1:
+                cls._columns[index].discard(rule_id)
+            bits >>= 1
+            index += 1
+
+    @classmethod
+    def corpus(cls) -> List[str]:
+        return list(cls._corpus)
+
+    @classmethod
+    def rules(cls) -> List[Rule]:
+        """All known rules in priority order"""
+        return sorted(cls._rules.values(), key=lambda rule: (rule.priority, rule.id))
+
+    @classmethod
+    def rules_matching(cls, command: str) -> List[Rule]:
+        """Existing rules matching a command, in priority order"""
+        index = cls._corpus_index.get(command)
+        if index is not None:
+            rule_ids = cls._columns[index]
+        else:
+            # Ad-hoc command outside the corpus: evaluate the compiled rules once
+            rule_ids = [
+                rule_id for rule_id, regex in cls._regexes.items()
+                if regex is not None and regex.search(command)
+            ]
+        rules = [cls._rules[rule_id] for rule_id in rule_ids]
+        rules.sort(key=lambda rule: (rule.priority, rule.id))
+        return rules
@@ -0,0 +1,102 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from app.config import get_settings
+from app.metrics import Metrics
+from app.models import Rule
+from app.services.ruleset_cache import Ruleset
+
+
+class DecisionCache:
+    """
+    Bounded LRU of (ruleset version, command text) -> matched rule, with
+    None cached for "no rule matched".
+
+    The ruleset version only moves when the active rules change, and the
+    cache is emptied the first time a new version is seen. With
+    rule_decision_cache_normalize, trailing whitespace is stripped from the
+    key, but only for rulesets where that provably never changes the match
+    (Ruleset.rstrip_safe); otherwise the exact text is used.
+    """
+
+    _lock = threading.Lock()
+    _entries: "OrderedDict[Tuple[int, str], Optional[Rule]]" = OrderedDict()
+    _version: Optional[int] = None
+    _normalizing = False
+    _stats: Dict[str, int] = {
+        "hits": 0,
+        "misses": 0,
+        "evictions": 0,
+        "invalidations": 0,
+        "normalized": 0,
+        "uncacheable": 0,
+    }
+
+    @classmethod
+    def _key(cls, ruleset: Ruleset, command_text: str) -> Optional[Tuple[int, str]]:
+        settings = get_settings()
+        if settings.rule_decision_cache_max_entries <= 0:
+            return None
+        if len(command_text) > settings.rule_decision_cache_max_command_length:
+            cls._stats["uncacheable"] += 1
+            return None
+        cls._normalizing = settings.rule_decision_cache_normalize and ruleset.rstrip_safe
+        if cls._normalizing:
+            normalized = command_text.rstrip()
+            if normalized != command_text:
+                cls._stats["normalized"] += 1
+                command_text = normalized
+        return ruleset.version, command_text
+
+    @classmethod
+    def match(cls, ruleset: Ruleset, command_text: str) -> Tuple[Optional[Rule], Optional[int]]:
+        """(matched rule or None, rule patterns evaluated; None on a cache hit)"""
+        key = cls._key(ruleset, command_text)
+        if key is None:
+            return ruleset.match_counted(command_text)
+
+        with cls._lock:
+            if cls._version != ruleset.version:
+                if cls._entries:
+                    cls._stats["invalidations"] += 1
+                cls._entries.clear()
+                cls._version = ruleset.version
+            if key in cls._entries:
+                cls._entries.move_to_end(key)
+                cls._stats["hits"] += 1
+                Metrics.decision_cache.inc("hit")
+                return cls._entries[key], None
+
+        rule, evaluated, skipped = ruleset.match_budgeted(key[1])
+        with cls._lock:
+            cls._stats["misses"] += 1
+            Metrics.decision_cache.inc("miss")
+            # A decision made with rules skipped by the match budget isn't final
+            if cls._version == ruleset.version and not skipped:
+                cls._entries[key] = rule
+                while len(cls._entries) > get_settings().rule_decision_cache_max_entries:
+                    cls._entries.popitem(last=False)
+                    cls._stats["evictions"] += 1
+        return rule, evaluated
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._entries.clear()
+            cls._version = None
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        settings = get_settings()
+        with cls._lock:
+            lookups = cls._stats["hits"] + cls._stats["misses"]
+            return {
+                **cls._stats,
+                "hit_rate": round(cls._stats["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": len(cls._entries),
+                "max_entries": settings.rule_decision_cache_max_entries,
+                "ruleset_version": cls._version,
+                "normalize": settings.rule_decision_cache_normalize,
+                # False while a rule is sensitive to trailing whitespace
+                "normalizing": cls._normalizing,
+            }
@@ -0,0 +1,93 @@
+import csv
+import io
+import json
+import zlib
+from enum import Enum
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from app.services.pagination import MAX_PAGE_SIZE
+
+PageFetcher = Callable[[Optional[str]], Awaitable[Tuple[List[Dict[str, Any]], Optional[str]]]]
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+# Rows fetched per DB round trip while exporting
+EXPORT_PAGE_SIZE = MAX_PAGE_SIZE
+
+AUDIT_EXPORT_FIELDS = ["id", "user_id", "user_name", "event", "meta", "timestamp"]
+COMMAND_EXPORT_FIELDS = ["id", "user_id", "command_text", "status", "action", "result_message", "created_at"]
+
+
+class ExportService:
+    """
+    Streams large tables as NDJSON or CSV.
+
+    Rows are read one keyset page at a time and each page is encoded into a
+    single chunk, so memory stays bounded by the page size however large the
+    table is.
+    """
+
+    @staticmethod
+    async def iter_pages(fetch_page: PageFetcher) -> AsyncIterator[List[Dict[str, Any]]]:
+        cursor = None
+        while True:
+            rows, cursor = await fetch_page(cursor)
+            if rows:
+                yield rows
+            if not cursor:
+                break
+
+    @staticmethod
+    def _encode_csv_rows(rows: List[Dict[str, Any]], fields: List[str]) -> str:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([
+                json.dumps(row.get(field)) if isinstance(row.get(field), (dict, list)) else row.get(field)
+                for field in fields
+            ])
+        return buffer.getvalue()
+
+    @staticmethod
+    async def stream(
+        fetch_page: PageFetcher,
+        fields: List[str],
+        export_format: ExportFormat,
+        compress: bool = False
+    ) -> AsyncIterator[bytes]:
+        """Encode every page from fetch_page, optionally gzip-compressed"""
+        compressor = zlib.compressobj(wbits=31) if compress else None  # 31 = gzip container
+
+        def emit(text: str) -> bytes:
+            data = text.encode("utf-8")
+            return compressor.compress(data) if compressor else data
+
+        if export_format == ExportFormat.CSV:
+            yield emit(ExportService._encode_csv_rows([dict(zip(fields, fields))], fields))
+
+        async for rows in ExportService.iter_pages(fetch_page):
+            if export_format == ExportFormat.CSV:
+                chunk = emit(ExportService._encode_csv_rows(rows, fields))
+            else:
+                chunk = emit("".join(
+                    json.dumps({field: row.get(field) for field in fields}, default=str) + "\n"
+                    for row in rows
+                ))
+            if chunk:
+                yield chunk
+
+        if compressor:
+            yield compressor.flush()
+
+    @staticmethod
+    def filename(base: str, export_format: ExportFormat, compress: bool) -> str:
+        return f"{base}.{export_format.value}" + (".gz" if compress else "")
+
@@ -0,0 +1,320 @@
+import asyncio
+import gzip
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from app.config import get_settings
+from app.services.pagination import decode_cursor, encode_cursor
+
+Row = Dict[str, Any]
+Page = Tuple[List[Row], Optional[str]]
+
+# History table -> the time column it is partitioned and paged by
+HISTORY_TABLES = {"audit_logs": "timestamp", "commands": "created_at"}
+
+
+def _utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def parse_time(value: Any) -> datetime:
+    return _utc(value if isinstance(value, datetime) else datetime.fromisoformat(value))
+
+
+def month_of(value: datetime) -> str:
+    """'YYYY-MM' of a time, in UTC"""
+    return _utc(value).astimezone(timezone.utc).strftime("%Y-%m")
+
+
+def add_months(month: str, count: int) -> str:
+    year, number = divmod(int(month[:4]) * 12 + int(month[5:7]) - 1 + count, 12)
+    return f"{year:04d}-{number + 1:02d}"
+
+
+def month_bounds(month: str) -> Tuple[datetime, datetime]:
+    """[start, end) of a month, in UTC"""
+    def start(m: str) -> datetime:
+        return datetime(int(m[:4]), int(m[5:7]), 1, tzinfo=timezone.utc)
+    return start(month), start(add_months(month, 1))
+
+
+class _Block(NamedTuple):
+    month: str
+    offset: int
+    length: int
+    rows: int
+    min: datetime
+    max: datetime
+    last_id: int
+
+
+class _TableArchive:
+    """
+    Archive of one history table: <table>.jsonl.gz, a series of gzip members
+    of up to block_rows rows (one JSON object per line, in id order), and
+    <table>.idx, one JSON line per member with its offset, length, row count,
+    time range and last id, plus a {"month", "done"} line once a month is
+    complete. Both files are only appended to.
+
+    The data is written and synced before its index line, so after a crash
+    the index never points past the data; bytes past the last indexed member
+    and a torn last index line are cut off before the next append. Only
+    months with a done line are read. The concatenated members are a valid
+    gzip file, so `zcat` reads the whole table back.
+    """
+
+    def __init__(self, directory: str, table: str):
+        self.table = table
+        self.column = HISTORY_TABLES[table]
+        self.data_path = os.path.join(directory, f"{table}.jsonl.gz")
+        self.index_path = os.path.join(directory, f"{table}.idx")
+        self._lock = threading.Lock()
+        self._index_stat: Optional[Tuple[int, int]] = None
+        self._blocks: List[_Block] = []
+        self._done: Dict[str, int] = {}
+        self._end = 0
+        self._index_end = 0
+        self._decoded: "OrderedDict[int, List[Tuple[datetime, int, Row]]]" = OrderedDict()
+
+    def _refresh(self) -> None:
+        """Re-read the index if another process appended to it"""
+        try:
+            stat = os.stat(self.index_path)
+        except FileNotFoundError:
+            self._index_stat, self._blocks, self._done, self._end, self._index_end = None, [], {}, 0, 0
+            return
+        key = (stat.st_size, stat.st_mtime_ns)
+        if key == self._index_stat:
+            return
+        blocks, done, end, index_end = [], {}, 0, 0
+        with open(self.index_path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Torn write: the entry never happened
+                    break
+                index_end += len(line)
+                entry = json.loads(line)
+                if entry.get("done"):
+                    done[entry["month"]] = entry["rows"]
+                    continue
+                blocks.append(_Block(
+                    entry["month"], entry["offset"], entry["length"], entry["rows"],
+                    parse_time(entry["min"]), parse_time(entry["max"]), entry["last_id"]
+                ))
+                end = entry["offset"] + entry["length"]
+        self._index_stat, self._blocks, self._done, self._end, self._index_end = key, blocks, done, end, index_end
+
+    def boundary(self) -> Optional[datetime]:
+        """End of the newest complete month; every archived row is older"""
+        with self._lock:
+            self._refresh()
+            return month_bounds(max(self._done))[1] if self._done else None
+
+    def done(self, month: str) -> bool:
+        with self._lock:
+            self._refresh()
+            return month in self._done
+
+    def resume_after(self, month: str) -> int:
+        """Last archived id of an unfinished month (0 if none), to continue from"""
+        with self._lock:
+            self._refresh()
+            return max((block.last_id for block in self._blocks if block.month == month), default=0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh()
+            return {
+                "months": dict(sorted(self._done.items())),
+                "blocks": len(self._blocks),
+                "bytes": self._end,
+            }
+
+    def _append_index(self, *entries: Row) -> None:
+        with open(self.index_path, "ab") as f:
+            if f.tell() != self._index_end:
+                f.truncate(self._index_end)
+            f.write(b"".join(json.dumps(entry, separators=(",", ":")).encode("utf-8") + b"\n" for entry in entries))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def append(self, month: str, rows: List[Row], block_rows: int) -> None:
+        """Append rows of an unfinished month (in id order), block_rows per block"""
+        blocks = []
+        for i in range(0, len(rows), block_rows):
+            chunk = rows[i:i + block_rows]
+            payload = b"".join(json.dumps(row, separators=(",", ":"), default=str).encode("utf-8") + b"\n" for row in chunk)
+            times = [parse_time(row[self.column]) for row in chunk]
+            blocks.append((gzip.compress(payload, compresslevel=6), chunk, min(times), max(times)))
+        with self._lock:
+            self._refresh()
+            if month in self._done:
+                raise ValueError(f"{self.table} {month} is already archived")
+            os.makedirs(os.path.dirname(self.data_path) or ".", exist_ok=True)
+            entries, offset = [], self._end
+            with open(self.data_path, "ab") as f:
+                if f.tell() != self._end:
+                    # Left over from a write whose index entries never landed
+                    f.truncate(self._end)
+                for data, chunk, first, last in blocks:
+                    f.write(data)
+                    entries.append({
+                        "month": month,
+                        "offset": offset,
+                        "length": len(data),
+                        "rows": len(chunk),
+                        "min": first.isoformat(),
+                        "max": last.isoformat(),
+                        "last_id": chunk[-1]["id"],
+                    })
+                    offset += len(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self._append_index(*entries)
+            self._refresh()
+
+    def finish(self, month: str) -> int:
+        """Mark a month complete, making it readable. Returns its row count."""
+        with self._lock:
+            self._refresh()
+            if month not in self._done:
+                count = sum(block.rows for block in self._blocks if block.month == month)
+                self._append_index({"month": month, "done": True, "rows": count})
+                self._refresh()
+            return self._done[month]
+
+    def _decode(self, block: _Block) -> List[Tuple[datetime, int, Row]]:
+        cached = self._decoded.get(block.offset)
+        if cached is not None:
+            self._decoded.move_to_end(block.offset)
+            return cached
+        with open(self.data_path, "rb") as f:
+            f.seek(block.offset)
+            payload = gzip.decompress(f.read(block.length))
+        rows = []
+        for line in payload.splitlines():
+            row = json.loads(line)
+            rows.append((parse_time(row[self.column]), row["id"], row))
+        self._decoded[block.offset] = rows
+        while len(self._decoded) > get_settings().history_archive_cached_blocks:
+            self._decoded.popitem(last=False)
+        return rows
+
+    def read(
+        self,
+        limit: int,
+        cursor: Optional[str],
+        filters: Dict[str, Any],
+        since: Optional[datetime],
+        until: Optional[datetime]
+    ) -> List[Row]:
+        """Up to limit archived rows after the cursor, newest first, with
+        the filter columns equal to the given values (None matches all)"""
+        position = None
+        if cursor:
+            sort_value, last_id = decode_cursor(cursor)
+            position = (parse_time(sort_value), last_id)
+        since = _utc(since) if since else None
+        until = _utc(until) if until else None
+        filters = {column: value for column, value in filters.items() if value is not None}
+
+        with self._lock:
+            self._refresh()
+            blocks = [
+                block for block in self._blocks
+                if block.month in self._done
+                and (since is None or block.max >= since)
+                and (until is None or block.min < until)
+                and (position is None or block.min <= position[0])
+            ]
+            # Blocks are in id order, which is only roughly time order, so
+            # they may overlap: stop at the first block entirely older than
+            # the rows already found
+            blocks.sort(key=lambda block: block.max, reverse=True)
+            found: List[Tuple[datetime, int, Row]] = []
+            for block in blocks:
+                if len(found) >= limit and block.max < found[limit - 1][0]:
+                    break
+                for at, row_id, row in self._decode(block):
+                    if since is not None and at < since:
+                        continue
+                    if until is not None and at >= until:
+                        continue
+                    if position is not None and (at, row_id) >= position:
+                        continue
+                    if any(row.get(column) != value for column, value in filters.items()):
+                        continue
+                    found.append((at, row_id, row))
+                found.sort(key=lambda item: (item[0], item[1]), reverse=True)
+                del found[limit:]
+        # Copies, so callers can reshape rows without touching the cache
+        return [dict(row) for _, _, row in found]
+
+
+class HistoryArchive:
+    """
+    Cold storage for months of audit_logs and commands that the retention
+    job (HistoryRetention) moved out of the database, as compressed local
+    files under history_archive_dir.
+
+    page() completes a page read from the hot tables: the archive is only
+    opened when the requested range reaches past the boundary (the end of
+    the newest archived month) and the hot rows don't already fill the
+    page. Rows can be in both places until their partition is dropped, so
+    the merge drops duplicate ids.
+    """
+
+    _archives: Dict[str, _TableArchive] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, table: str) -> _TableArchive:
+        directory = get_settings().history_archive_dir
+        with cls._lock:
+            archive = cls._archives.get(table)
+            if archive is None or os.path.dirname(archive.data_path) != directory:
+                archive = cls._archives[table] = _TableArchive(directory, table)
+            return archive
+
+    @classmethod
+    async def page(
+        cls,
+        table: str,
+        hot: Page,
+        limit: int,
+        cursor: Optional[str],
+        filters: Dict[str, Any],
+        since: Optional[datetime],
+        until: Optional[datetime]
+    ) -> Page:
+        rows, next_cursor = hot
+        archive = cls.get(table)
+        boundary = archive.boundary()
+        if boundary is None or (since and _utc(since) >= boundary):
+            return hot
+        column = archive.column
+        if next_cursor and parse_time(rows[-1][column]) >= boundary:
+            # Every archived row sorts after this full page
+            return hot
+
+        archived = await asyncio.to_thread(archive.read, limit + 1, cursor, filters, since, until)
+        if not archived:
+            return hot
+        merged = {row["id"]: row for row in archived}
+        merged.update((row["id"], row) for row in rows)
+        ordered = sorted(merged.values(), key=lambda row: (parse_time(row[column]), row["id"]), reverse=True)
+        page = ordered[:limit]
+        more = len(ordered) > limit or len(archived) > limit or next_cursor is not None
+        if not (more and page):
+            return page, None
+        return page, encode_cursor(page[-1][column], page[-1]["id"])
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        return {
+            "path": get_settings().history_archive_dir,
+            **{table: cls.get(table).stats() for table in HISTORY_TABLES},
+        }
@@ -0,0 +1,165 @@
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional
+from app.config import get_settings
+from app.services.history_archive import HISTORY_TABLES, HistoryArchive, add_months, month_of
+from app.storage import get_storage
+
+logger = logging.getLogger("gateway.history")
+
+# Archive blocks fetched per storage call and written per fsync
+BLOCKS_PER_READ = 10
+
+
+@contextmanager
+def _exclusive_lock(path: str) -> Iterator[bool]:
+    """Non-blocking lock on a file shared by the workers of a host; yields
+    whether it was acquired. Released when the holder exits or dies."""
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            except OSError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            yield True
+
+
+class HistoryRetention:
+    """
+    Periodic maintenance of the monthly history partitions.
+
+    Every history_retention_interval_seconds it creates the partitions for
+    the coming months and, with history_retention_months > 0, moves each
+    month older than that out of the database: its rows are appended to
+    HistoryArchive in id order, the month is marked complete there, then
+    the partition is detached and dropped. Each step is idempotent and an
+    interrupted month resumes after its last archived id, so a crash at
+    any point only repeats work. A file lock in the archive directory lets
+    one worker per host do this.
+    """
+
+    _task: Optional[asyncio.Task] = None
+    _stats: Dict[str, Any] = {
+        "runs": 0,
+        "skipped_runs": 0,
+        "failed_runs": 0,
+        "archived_rows": 0,
+        "archived_months": 0,
+        "dropped_months": 0,
+        "last_run_ms": 0.0,
+        "last_error": None,
+    }
+
+    @classmethod
+    def is_running(cls) -> bool:
+        return cls._task is not None and not cls._task.done()
+
+    @classmethod
+    async def start(cls) -> None:
+        if get_settings().history_retention_interval_seconds <= 0 or cls.is_running():
+            return
+        cls._task = asyncio.create_task(cls._run(), context=contextvars.Context())
+
+    @classmethod
+    async def stop(cls) -> None:
+        if not cls.is_running():
+            return
+        cls._task.cancel()
+        try:
+            await cls._task
+        except asyncio.CancelledError:
+            pass
+        cls._task = None
+
+    @classmethod
+    async def _run(cls) -> None:
+        while True:
+            await cls.run_once()
+            await asyncio.sleep(get_settings().history_retention_interval_seconds)
+
+    @classmethod
+    async def run_once(cls, now: Optional[datetime] = None) -> bool:
+        """One maintenance pass. Returns False if another worker holds the lock or it failed."""
+        settings = get_settings()
+        os.makedirs(settings.history_archive_dir, exist_ok=True)
+        with _exclusive_lock(os.path.join(settings.history_archive_dir, ".retention.lock")) as locked:
+            if not locked:
+                cls._stats["skipped_runs"] += 1
+                return False
+
+            start = time.perf_counter()
+            try:
+                for table in HISTORY_TABLES:
+                    await cls._maintain(table, now or datetime.now(timezone.utc))
+            except Exception as e:
+                cls._stats["failed_runs"] += 1
+                cls._stats["last_error"] = str(e)
+                logger.exception("History retention failed")
+                return False
+            finally:
+                cls._stats["runs"] += 1
+                cls._stats["last_run_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            cls._stats["last_error"] = None
+            return True
+
+    @classmethod
+    async def _maintain(cls, table: str, now: datetime) -> None:
+        settings = get_settings()
+        history = get_storage().history
+        created = await history.prepare(table, settings.history_partitions_ahead)
+        if created:
+            logger.info("Created %s partitions for %s", table, ", ".join(created))
+        if settings.history_retention_months <= 0:
+            return
+
+        # The current month plus history_retention_months full months stay hot
+        keep_from = add_months(month_of(now), -settings.history_retention_months)
+        archive = HistoryArchive.get(table)
+        for month in await history.months(table):
+            if month >= keep_from:
+                break
+            if not archive.done(month):
+                after_id = archive.resume_after(month)
+                block_rows = settings.history_archive_block_rows
+                while True:
+                    rows = await history.rows(table, month, after_id, block_rows * BLOCKS_PER_READ)
+                    if not rows:
+                        break
+                    await asyncio.to_thread(archive.append, month, rows, block_rows)
+                    cls._stats["archived_rows"] += len(rows)
+                    after_id = rows[-1]["id"]
+                count = await asyncio.to_thread(archive.finish, month)
+                cls._stats["archived_months"] += 1
+                logger.info("Archived %s %s (%d rows)", table, month, count)
+            await history.drop(table, month)
+            cls._stats["dropped_months"] += 1
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        settings = get_settings()
+        return {
+            **cls._stats,
+            "running": cls.is_running(),
+            "retention_months": settings.history_retention_months,
+            "archive": HistoryArchive.stats(),
+        }
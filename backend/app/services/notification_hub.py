@@ -0,0 +1,186 @@
+import asyncio
+import contextvars
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set, Tuple
+from app.config import get_settings
+from app.storage import get_storage
+
+# Notifications fetched per poll
+POLL_BATCH_SIZE = 500
+
+# Ids re-read behind the newest one seen on every poll: transactions commit
+# out of id order, so a lower id can become visible after a higher one
+POLL_LOOKBACK_IDS = 100
+
+# Events buffered per connection before new ones are dropped
+SUBSCRIBER_QUEUE_SIZE = 100
+
+Event = Tuple[str, Dict[str, Any]]
+
+
+def format_notification(notif: Dict[str, Any]) -> Dict[str, Any]:
+    # Handle case where rule might have been deleted
+    rule_pattern = notif.get('rules', {}).get('pattern', 'Unknown') if notif.get('rules') else 'Unknown'
+    return {
+        'id': notif['id'],
+        'rule_id': notif['rule_id'],
+        'rule_pattern': rule_pattern,
+        'message': notif['message'],
+        'is_read': notif['is_read'],
+        'created_at': notif['created_at']
+    }
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class NotificationHub:
+    """
+    Pushes rule notifications and unread counts to connected admins.
+
+    One background task per process polls for notifications newer than the
+    last one seen, for all connected admins in a single query, and only
+    while someone is connected. Writers in this process call wake() so their
+    notifications are delivered without waiting for the next poll; other
+    workers' notifications arrive within notification_poll_interval_seconds.
+    Each poll re-reads POLL_LOOKBACK_IDS ids behind the newest one seen, to
+    catch notifications committed late, and skips the ids already delivered.
+    """
+
+    _subscribers: Dict[int, Set[asyncio.Queue]] = {}
+    _task: Optional[asyncio.Task] = None
+    _wake: Optional[asyncio.Event] = None
+    _last_id: Optional[int] = None
+    # Id polling started from, and the ids delivered since within the lookback window
+    _first_id = 0
+    _delivered: Set[int] = set()
+
+    @classmethod
+    def subscribe(cls, admin_id: int) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        cls._subscribers.setdefault(admin_id, set()).add(queue)
+        if cls._task is None or cls._task.done():
+            cls._wake = asyncio.Event()
+            # Started from the first subscriber's request: run it in a fresh
+            # context so its polls aren't traced as part of that request
+            cls._task = asyncio.create_task(cls._run(), context=contextvars.Context())
+        return queue
+
+    @classmethod
+    def unsubscribe(cls, admin_id: int, queue: asyncio.Queue) -> None:
+        queues = cls._subscribers.get(admin_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del cls._subscribers[admin_id]
+        if not cls._subscribers and cls._wake is not None:
+            # Let the poller notice there is nobody left and exit
+            cls._wake.set()
+
+    @classmethod
+    def wake(cls) -> None:
+        """Poll now instead of at the next interval"""
+        if cls._wake is not None and cls._subscribers:
+            cls._wake.set()
+
+    @classmethod
+    def connected(cls, admin_id: int) -> bool:
+        return admin_id in cls._subscribers
+
+    @classmethod
+    def _deliver(cls, admin_id: int, event: Event) -> None:
+        for queue in cls._subscribers.get(admin_id, ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow client: it still gets the next unread count
+                pass
+
+    @classmethod
+    def publish_unread(cls, admin_id: int, unread_count: int) -> None:
+        cls._deliver(admin_id, ("unread", {"unread_count": unread_count}))
+
+    @staticmethod
+    async def unread_counts(admin_ids) -> Dict[int, int]:
+        return await get_storage().notifications.unread_counts(list(admin_ids))
+
+    @classmethod
+    async def _poll(cls) -> None:
+        notifications = get_storage().notifications
+        if cls._last_id is None:
+            # Start from the newest existing notification; history is fetched over HTTP
+            cls._last_id = cls._first_id = await notifications.latest_id()
+            cls._delivered = set()
+            return
+
+        low = max(cls._first_id, cls._last_id - POLL_LOOKBACK_IDS)
+        rows = await notifications.after(low, list(cls._subscribers), POLL_BATCH_SIZE)
+        rows = [row for row in rows if row['id'] not in cls._delivered]
+        if not rows:
+            return
+
+        cls._last_id = max(cls._last_id, rows[-1]['id'])
+        for row in rows:
+            cls._delivered.add(row['id'])
+            cls._deliver(row['admin_id'], ("notification", format_notification(row)))
+        low = cls._last_id - POLL_LOOKBACK_IDS
+        cls._delivered = {row_id for row_id in cls._delivered if row_id > low}
+
+        counts = await cls.unread_counts({row['admin_id'] for row in rows})
+        for admin_id, count in counts.items():
+            cls.publish_unread(admin_id, count)
+
+    @classmethod
+    async def _run(cls) -> None:
+        interval = get_settings().notification_poll_interval_seconds
+        try:
+            while cls._subscribers:
+                try:
+                    await cls._poll()
+                except Exception:
+                    # Keep the stream alive through transient DB errors
+                    pass
+                try:
+                    await asyncio.wait_for(cls._wake.wait(), interval)
+                except asyncio.TimeoutError:
+                    pass
+                cls._wake.clear()
+        finally:
+            cls._last_id = None
+            cls._delivered = set()
+
+    @classmethod
+    async def stream(
+        cls,
+        admin_id: int,
+        unread_count: int,
+        is_disconnected: Callable[[], Awaitable[bool]]
+    ) -> AsyncIterator[str]:
+        """Server-Sent Events for one connection: the unread count, then pushed events"""
+        heartbeat = get_settings().notification_stream_heartbeat_seconds
+        queue = cls.subscribe(admin_id)
+        try:
+            yield format_sse("unread", {"unread_count": unread_count})
+            while not await is_disconnected():
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event, data)
+        finally:
+            cls.unsubscribe(admin_id, queue)
+
+    @classmethod
+    async def stop(cls) -> None:
+        cls._subscribers.clear()
+        if cls._task is not None and not cls._task.done():
+            cls._task.cancel()
+            try:
+                await cls._task
+            except asyncio.CancelledError:
+                pass
+        cls._task = None
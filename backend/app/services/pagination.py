@@ -0,0 +1,71 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Response header carrying the cursor for the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort_value: Any, row_id: int) -> str:
+    """Opaque cursor for keyset pagination over (sort_value, id)"""
+    raw = json.dumps([sort_value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, int]:
+    """Inverse of encode_cursor. Raises ValueError on malformed input."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return sort_value, int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _quote(value: Any) -> str:
+    # PostgREST logic trees need reserved characters (",.:()") quoted
+    return '"' + str(value).replace('"', '\\"') + '"'
+
+
+def apply_keyset(query, sort_column: Optional[str], cursor: Optional[str], limit: int, desc: bool = True):
+    """
+    Order by (sort_column, id) and continue after the cursor position.
+    With sort_column None the keyset is just the id.
+    Fetches one extra row so the caller can tell whether another page exists.
+    """
+    op = "lt" if desc else "gt"
+    if cursor:
+        sort_value, last_id = decode_cursor(cursor)
+        if sort_column:
+            query = query.or_(
+                f"{sort_column}.{op}.{_quote(sort_value)},"
+                f"and({sort_column}.eq.{_quote(sort_value)},id.{op}.{last_id})"
+            )
+        else:
+            query = getattr(query, op)("id", last_id)
+
+    if sort_column:
+        query = query.order(sort_column, desc=desc)
+    return query.order("id", desc=desc).limit(limit + 1)
+
+
+def apply_time_range(query, column: str, since: Optional[datetime], until: Optional[datetime]):
+    """Filter column to [since, until)"""
+    if since:
+        query = query.gte(column, since.isoformat())
+    if until:
+        query = query.lt(column, until.isoformat())
+    return query
+
+
+def split_page(rows: List[Dict[str, Any]], sort_column: Optional[str], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Trim the look-ahead row and build the next cursor"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last[sort_column] if sort_column else None, last["id"])
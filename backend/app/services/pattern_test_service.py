@@ -0,0 +1,125 @@
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional
+from app.config import get_settings
+from app.engine.bulk import Evaluation, evaluate_commands
+from app.models import RuleAction
+from app.services.ruleset_cache import Ruleset, RulesetCache
+
+
+class PatternTestService:
+    """
+    Bulk evaluation of a candidate pattern against many commands.
+
+    One ruleset snapshot is used for the whole request. Commands are
+    evaluated in chunks, in-process for small inputs and on a process pool
+    once the input reaches pattern_test_pool_threshold.
+    """
+
+    _pool: Optional[ProcessPoolExecutor] = None
+
+    @classmethod
+    def _workers(cls) -> int:
+        return get_settings().pattern_test_workers or os.cpu_count() or 1
+
+    @classmethod
+    def _executor(cls, command_count: int) -> Optional[ProcessPoolExecutor]:
+        settings = get_settings()
+        if command_count < settings.pattern_test_pool_threshold or cls._workers() < 2:
+            return None
+        if cls._pool is None:
+            # spawn: workers must not inherit the event loop or client sockets
+            cls._pool = ProcessPoolExecutor(
+                max_workers=cls._workers(),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return cls._pool
+
+    @classmethod
+    def shutdown(cls) -> None:
+        if cls._pool is not None:
+            cls._pool.shutdown(cancel_futures=True)
+            cls._pool = None
+
+    @staticmethod
+    def new_summary() -> Dict[str, int]:
+        return {
+            "total": 0,
+            "matches_new_pattern": 0,
+            "currently_accepted": 0,
+            "currently_rejected": 0,
+            "currently_unmatched": 0,
+        }
+
+    @staticmethod
+    def _results(ruleset: Ruleset, commands: List[str], evaluations: List[Evaluation], summary: Dict[str, int]) -> List[Dict[str, Any]]:
+        results = []
+        for command, (matches, rule_index) in zip(commands, evaluations):
+            rule = ruleset.evaluated[rule_index].rule if rule_index is not None else None
+
+            summary["total"] += 1
+            if matches:
+                summary["matches_new_pattern"] += 1
+            if rule is None:
+                summary["currently_unmatched"] += 1
+            elif rule.action == RuleAction.AUTO_ACCEPT:
+                summary["currently_accepted"] += 1
+            else:
+                summary["currently_rejected"] += 1
+
+            result = {
+                "command": command,
+                "matches": matches
+            }
+            # If it matches, show which existing rule would handle it
+            if matches and rule is not None:
+                result["current_rule"] = {
+                    "id": rule.id,
+                    "pattern": rule.pattern,
+                    "action": rule.action.value,
+                    "priority": rule.priority,
+                    "description": rule.description
+                }
+            results.append(result)
+        return results
+
+    @classmethod
+    async def iter_results(cls, pattern: str, commands: List[str], summary: Dict[str, int]) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield result chunks in input order, accumulating counts into summary"""
+        settings = get_settings()
+        ruleset = await RulesetCache.get()
+        executor = cls._executor(len(commands))
+        chunk_size = settings.pattern_test_chunk_size
+
+        offset = 0
+        async for evaluations in evaluate_commands(
+            pattern,
+            [compiled.rule.pattern for compiled in ruleset.evaluated],
+            commands,
+            chunk_size,
+            key=ruleset.version,
+            matcher=ruleset.matcher,
+            executor=executor,
+            max_in_flight=cls._workers() * 2
+        ):
+            chunk = commands[offset:offset + len(evaluations)]
+            offset += len(evaluations)
+            yield cls._results(ruleset, chunk, evaluations, summary)
+
+    @classmethod
+    async def test(cls, pattern: str, commands: List[str]) -> Dict[str, Any]:
+        summary = cls.new_summary()
+        results = []
+        async for chunk in cls.iter_results(pattern, commands, summary):
+            results.extend(chunk)
+        return {"results": results, "summary": summary}
+
+    @classmethod
+    async def stream_ndjson(cls, pattern: str, commands: List[str]) -> AsyncIterator[bytes]:
+        """One line per command, then a final {"summary": ...} line"""
+        summary = cls.new_summary()
+        async for chunk in cls.iter_results(pattern, commands, summary):
+            yield "".join(json.dumps(result) + "\n" for result in chunk).encode("utf-8")
+        yield (json.dumps({"summary": summary}) + "\n").encode("utf-8")
@@ -0,0 +1,94 @@
+from typing import Any, Dict, List, Optional, Sequence
+from app.config import get_settings
+from app.engine import OverlapAnalyzer
+from app.models import Rule
+
+
+class RuleAnalysis:
+    """
+    Process-wide rule overlap analyzer.
+
+    The pair cache outlives ruleset reloads, so after a rule change only the
+    changed rule's pairs are recomputed.
+    """
+
+    _analyzer: Optional[OverlapAnalyzer] = None
+
+    @classmethod
+    def analyzer(cls) -> OverlapAnalyzer:
+        if cls._analyzer is None:
+            cls._analyzer = OverlapAnalyzer(max_pairs=get_settings().rule_analysis_max_pairs)
+        return cls._analyzer
+
+    @classmethod
+    def relation(cls, pattern: str, other: str) -> Optional[str]:
+        """How pattern's matches relate to other's: equivalent, covers, covered_by or None if unknown/partial"""
+        analyzer = cls.analyzer()
+        inside = analyzer.is_subset(pattern, other)
+        outside = analyzer.is_subset(other, pattern)
+        if inside and outside:
+            return "equivalent"
+        if outside:
+            return "covers"
+        if inside:
+            return "covered_by"
+        return None
+
+    @classmethod
+    def compare(cls, pattern: str, rules: Sequence[Rule], corpus: Sequence[str]) -> Dict[int, Dict[str, Any]]:
+        """Overlap of a candidate pattern with each existing rule, keyed by rule id"""
+        analyzer = cls.analyzer()
+        results = {}
+        for rule in rules:
+            overlap = analyzer.overlap(pattern, rule.pattern, corpus)
+            if not overlap.overlaps:
+                continue
+            results[rule.id] = {
+                "relation": cls.relation(pattern, rule.pattern) or "overlaps",
+                "witness": overlap.witness,
+                "analysis": overlap.method,
+            }
+        return results
+
+    @classmethod
+    def report(
+        cls,
+        rules: Sequence[Rule],
+        corpus: Sequence[str],
+        include_same_action: bool = False
+    ) -> Dict[str, Any]:
+        """Pairwise overlaps and shadowed rules for rules given in match order"""
+        analyzer = cls.analyzer()
+        patterns = [rule.pattern for rule in rules]
+
+        overlaps: List[Dict[str, Any]] = []
+        for j, later in enumerate(rules):
+            for i in range(j):
+                earlier = rules[i]
+                if not include_same_action and earlier.action == later.action:
+                    continue
+                overlap = analyzer.overlap(earlier.pattern, later.pattern, corpus)
+                if overlap.overlaps:
+                    overlaps.append({
+                        "rule_id": earlier.id,
+                        "other_rule_id": later.id,
+                        "conflicting": earlier.action != later.action,
+                        "witness": overlap.witness,
+                        "analysis": overlap.method,
+                    })
+
+        shadowed = [
+            {
+                "rule_id": rules[item.index].id,
+                "shadowed_by": rules[item.by_index].id,
+                "witness": item.witness,
+            }
+            for item in analyzer.shadowed(patterns)
+        ]
+
+        return {
+            "rules_analyzed": len(rules),
+            "unanalyzable_rule_ids": [rule.id for rule in rules if analyzer.automaton(rule.pattern) is None],
+            "overlaps": overlaps,
+            "shadowed": shadowed,
+        }
@@ -1,28 +1,23 @@
+import asyncio
 import re
+import time
 from typing import List, Optional, Tuple, Dict, Any
-from app.database import supabase_admin
+from app.config import get_settings
+from app.engine import RISK_LEVELS, backtracking_risk
+from app.metrics import Metrics
 from app.models import Rule, RuleCreate, RuleAction
+from app.services.conflict_matrix import ConflictMatrix, DEFAULT_TEST_COMMANDS
+from app.services.decision_cache import DecisionCache
+from app.services.pattern_test_service import PatternTestService
+from app.services.rule_analysis import RuleAnalysis
+from app.services.ruleset_cache import Ruleset, RulesetCache
+from app.storage import get_storage
 
 
 class RuleService:
     # Default test commands for conflict detection
-    TEST_COMMANDS = [
-        "ls -la",
-        "cat /etc/passwd",
-        "pwd",
-        "echo hello",
-        "git status",
-        "git log",
-        "git diff",
-        "rm -rf /",
-        "rm file.txt",
-        "mkfs.ext4 /dev/sda",
-        ":(){ :|:& };:",
-        "docker run nginx",
-        "npm install",
-        "sudo su",
-        "chmod 777 file",
-    ]
+    TEST_COMMANDS = DEFAULT_TEST_COMMANDS
+
     @staticmethod
     def validate_regex(pattern: str) -> Tuple[bool, Optional[str]]:
         """Validate regex pattern. Returns (is_valid, error_message)"""
@@ -33,11 +28,29 @@ class RuleService:
             return False, str(e)
     
     @staticmethod
-    def create_rule(rule_create: RuleCreate) -> Rule:
-        """Create a new rule with regex validation"""
-        is_valid, error = RuleService.validate_regex(rule_create.pattern)
+    def backtracking_allowed(pattern: str) -> Tuple[bool, Optional[Dict[str, str]]]:
+        """Check a valid pattern's backtracking risk against
+        rule_backtracking_max_risk. Returns (is_allowed, risk or None)"""
+        risk = backtracking_risk(pattern)
+        if risk is None:
+            return True, None
+        allowed = RISK_LEVELS.index(risk.level) <= RISK_LEVELS.index(get_settings().rule_backtracking_max_risk)
+        return allowed, {"level": risk.level, "reason": risk.reason}
+    
+    @staticmethod
+    def check_pattern(pattern: str) -> None:
+        """Raise ValueError for an invalid pattern or one too prone to backtracking"""
+        is_valid, error = RuleService.validate_regex(pattern)
         if not is_valid:
             raise ValueError(f"Invalid regex pattern: {error}")
+        allowed, risk = RuleService.backtracking_allowed(pattern)
+        if not allowed:
+            raise ValueError(f"Pattern has {risk['level']} backtracking risk: {risk['reason']}")
+    
+    @staticmethod
+    async def create_rule(rule_create: RuleCreate) -> Rule:
+        """Create a new rule with regex and backtracking validation"""
+        RuleService.check_pattern(rule_create.pattern)
         
         rule_data = {
             "pattern": rule_create.pattern,
@@ -46,105 +59,94 @@ class RuleService:
             "description": rule_create.description
         }
         
-        response = supabase_admin.table("rules").insert(rule_data).execute()
-        
-        if not response.data:
-            raise Exception("Failed to create rule")
-        
-        return Rule(**response.data[0])
+        rule = Rule(**await get_storage().rules.create(rule_data))
+        RulesetCache.invalidate()
+        ConflictMatrix.add_rule(rule)
+        return rule
     
     @staticmethod
-    def get_all_rules() -> List[Rule]:
+    async def get_all_rules() -> List[Rule]:
         """Get all rules ordered by priority"""
-        response = supabase_admin.table("rules").select("*").order("priority").execute()
-        return [Rule(**rule) for rule in response.data]
+        return [Rule(**rule) for rule in await get_storage().rules.list()]
     
     @staticmethod
-    def delete_rule(rule_id: int) -> bool:
+    async def delete_rule(rule_id: int) -> bool:
         """Delete a rule"""
-        response = supabase_admin.table("rules").delete().eq("id", rule_id).execute()
-        return response.data is not None
+        deleted = await get_storage().rules.delete(rule_id)
+        RulesetCache.invalidate()
+        ConflictMatrix.remove_rule(rule_id)
+        return deleted
     
     @staticmethod
-    def match_command(command_text: str) -> Optional[Rule]:
-        """Match command against rules (first match wins)"""
-        rules = RuleService.get_all_rules()
-        
-        for rule in rules:
-            try:
-                if re.search(rule.pattern, command_text):
-                    return rule
-            except re.error:
-                # Skip invalid regex patterns
-                continue
-        
-        return None
+    def match_in(ruleset: Ruleset, command_text: str) -> Optional[Rule]:
+        """Match command against a ruleset snapshot through the decision cache,
+        recording match metrics"""
+        start = time.perf_counter()
+        rule, evaluated = DecisionCache.match(ruleset, command_text)
+        Metrics.rule_match_duration.observe(time.perf_counter() - start)
+        Metrics.rules_evaluated.observe(evaluated or 0)
+        return rule
+
+    @staticmethod
+    async def match_command(command_text: str) -> Optional[Rule]:
+        """Match command against the cached active ruleset (first match wins)"""
+        ruleset = await RulesetCache.get()
+        return RuleService.match_in(ruleset, command_text)
+    
+    @staticmethod
+    async def slow_rules() -> Dict[str, Any]:
+        """Rules the match time budget currently skips for long commands"""
+        ruleset = await RulesetCache.get()
+        return {
+            "ruleset_version": ruleset.version,
+            "budget_ms": ruleset.budget * 1000,
+            "rules": ruleset.slow_rules()
+        }
     
     @staticmethod
-    def detect_conflicts(pattern: str, test_commands: Optional[List[str]] = None) -> Dict[str, Any]:
+    async def detect_conflicts(pattern: str, test_commands: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         Detect if a new pattern conflicts with existing rules.
         Returns dict with conflict information.
         """
-        # Validate the pattern first
-        is_valid, error = RuleService.validate_regex(pattern)
-        if not is_valid:
+        # Validate the pattern first; it is searched against every test command
+        try:
+            RuleService.check_pattern(pattern)
+        except ValueError as e:
             return {
                 "has_conflicts": False,
                 "conflicts": [],
                 "test_results": [],
-                "error": f"Invalid regex pattern: {error}"
+                "error": str(e)
             }
         
-        # Use default test commands if none provided
-        commands_to_test = test_commands or RuleService.TEST_COMMANDS
+        # Default corpus: built-in test commands plus admin-registered ones
+        await ConflictMatrix.refresh()
+        commands_to_test = test_commands or ConflictMatrix.corpus()
         
-        # Get all existing rules
-        existing_rules = RuleService.get_all_rules()
+        new_pattern_compiled = re.compile(pattern)
         
-        # Track conflicts
-        conflicts = []
+        # Only the new pattern is evaluated here; existing rules' matches come
+        # from the maintained matrix
+        conflicts_by_rule: Dict[int, Dict[str, Any]] = {}
         test_results = []
         
-        try:
-            new_pattern_compiled = re.compile(pattern)
-        except re.error as e:
-            return {
-                "has_conflicts": False,
-                "conflicts": [],
-                "test_results": [],
-                "error": str(e)
-            }
-        
-        # Test each command
         for command in commands_to_test:
             new_matches = bool(new_pattern_compiled.search(command))
             
             if new_matches:
-                # Check if any existing rule also matches this command
-                for rule in existing_rules:
-                    try:
-                        if re.search(rule.pattern, command):
-                            # Check if this rule is already in conflicts
-                            existing_conflict = next(
-                                (c for c in conflicts if c["rule_id"] == rule.id),
-                                None
-                            )
-                            
-                            if existing_conflict:
-                                existing_conflict["overlapping_commands"].append(command)
-                            else:
-                                conflict_info = {
-                                    "rule_id": rule.id,
-                                    "pattern": rule.pattern,
-                                    "action": rule.action.value,
-                                    "priority": rule.priority,
-                                    "description": rule.description,
-                                    "overlapping_commands": [command]
-                                }
-                                conflicts.append(conflict_info)
-                    except re.error:
-                        continue
+                for rule in ConflictMatrix.rules_matching(command):
+                    conflict_info = conflicts_by_rule.get(rule.id)
+                    if conflict_info is None:
+                        conflict_info = conflicts_by_rule[rule.id] = {
+                            "rule_id": rule.id,
+                            "pattern": rule.pattern,
+                            "action": rule.action.value,
+                            "priority": rule.priority,
+                            "description": rule.description,
+                            "overlapping_commands": []
+                        }
+                    conflict_info["overlapping_commands"].append(command)
             
             # Record test result
             test_results.append({
@@ -152,16 +154,71 @@ class RuleService:
                 "matches_new_pattern": new_matches
             })
         
+        # Static analysis finds overlaps the corpus misses. Rules seen only
+        # here count as conflicts when one pattern contains the other;
+        # partial overlaps are reported separately.
+        possible_overlaps = []
+        analysis = RuleAnalysis.compare(pattern, ConflictMatrix.rules(), commands_to_test)
+        for rule in ConflictMatrix.rules():
+            found = analysis.get(rule.id)
+            if found is None:
+                continue
+            conflict_info = conflicts_by_rule.get(rule.id)
+            if conflict_info is not None:
+                conflict_info.update(found)
+                continue
+            entry = {
+                "rule_id": rule.id,
+                "pattern": rule.pattern,
+                "action": rule.action.value,
+                "priority": rule.priority,
+                "description": rule.description,
+                "overlapping_commands": [],
+                **found
+            }
+            if found["relation"] == "overlaps":
+                possible_overlaps.append(entry)
+            else:
+                conflicts_by_rule[rule.id] = entry
+        
+        conflicts = list(conflicts_by_rule.values())
+        
         return {
             "has_conflicts": len(conflicts) > 0,
             "conflicts": conflicts,
             "test_results": test_results,
             "total_conflicts": len(conflicts),
-            "total_overlapping_commands": sum(len(c["overlapping_commands"]) for c in conflicts)
+            "total_overlapping_commands": sum(len(c["overlapping_commands"]) for c in conflicts),
+            "possible_overlaps": possible_overlaps
         }
     
     @staticmethod
-    def test_pattern_against_commands(pattern: str, commands: List[str]) -> List[Dict[str, Any]]:
+    async def analyze_rules(include_same_action: bool = False) -> Dict[str, Any]:
+        """Static overlap/shadowing report for the active ruleset"""
+        ruleset, _ = await asyncio.gather(RulesetCache.get(), ConflictMatrix.refresh())
+        rules = [compiled.rule for compiled in ruleset.rules]
+        report = RuleAnalysis.report(rules, ConflictMatrix.corpus(), include_same_action)
+        report["ruleset_version"] = ruleset.version
+        report["skipped_in_matching"] = sorted(ruleset.shadowed)
+        return report
+    
+    @staticmethod
+    async def get_test_commands() -> List[str]:
+        """Conflict-detection corpus: built-in test commands plus registered ones"""
+        await ConflictMatrix.refresh()
+        return ConflictMatrix.corpus()
+    
+    @staticmethod
+    async def register_test_commands(commands: List[str], created_by: int) -> int:
+        """Add commands to the conflict-detection corpus. Returns how many were new."""
+        commands = [command for command in dict.fromkeys(commands) if command]
+        if not commands:
+            return 0
+        await get_storage().rules.add_test_commands(commands, created_by)
+        return ConflictMatrix.add_commands(commands)
+    
+    @staticmethod
+    async def test_pattern_against_commands(pattern: str, commands: List[str]) -> List[Dict[str, Any]]:
         """
         Test a pattern against specific commands.
         Returns list of results showing which commands match.
@@ -170,31 +227,5 @@ class RuleService:
         if not is_valid:
             raise ValueError(f"Invalid regex pattern: {error}")
         
-        try:
-            pattern_compiled = re.compile(pattern)
-        except re.error as e:
-            raise ValueError(str(e))
-        
-        results = []
-        for command in commands:
-            matches = bool(pattern_compiled.search(command))
-            result = {
-                "command": command,
-                "matches": matches
-            }
-            
-            # If it matches, check which existing rule would handle it
-            if matches:
-                matched_rule = RuleService.match_command(command)
-                if matched_rule:
-                    result["current_rule"] = {
-                        "id": matched_rule.id,
-                        "pattern": matched_rule.pattern,
-                        "action": matched_rule.action.value,
-                        "priority": matched_rule.priority,
-                        "description": matched_rule.description
-                    }
-            
-            results.append(result)
-        
-        return results
+        result = await PatternTestService.test(pattern, commands)
+        return result["results"]
@@ -0,0 +1,239 @@
+import asyncio
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Pattern, Tuple
+from app.config import get_settings
+from app.engine import OverlapAnalyzer, RuleMatcher, rstrip_safe
+from app.metrics import Metrics
+from app.models import Rule, RuleAction
+from app.services.rule_analysis import RuleAnalysis
+from app.storage import get_storage
+
+
+logger = logging.getLogger("gateway.rules")
+
+
+class CompiledRule(NamedTuple):
+    rule: Rule
+    regex: Pattern
+
+
+class SlowRule(NamedTuple):
+    # Shortest command the rule overran the match budget on, and how long it took
+    length: int
+    seconds: float
+
+
+class Ruleset:
+    """
+    Immutable snapshot of the active rules, in match order.
+
+    With an analyzer, rules fully shadowed by an earlier rule are left out of
+    the matcher: they can never be the first match, so results are unchanged.
+
+    With a match budget (seconds), a rule whose search alone overran it is
+    recorded as slow and skipped for commands at least as long as the one it
+    overran on (kept across reloads of the same ruleset version). Skipping never lets a command
+    through that a skipped AUTO_REJECT rule would have stopped: such a match
+    is dropped and the command left unmatched.
+    """
+
+    def __init__(
+        self,
+        version: int,
+        rules: List[CompiledRule],
+        loaded_at: float,
+        analyzer: Optional[OverlapAnalyzer] = None,
+        budget: float = 0.0
+    ):
+        self.version = version
+        self.rules = tuple(rules)
+        self.loaded_at = loaded_at
+        self.matcher = RuleMatcher([compiled.regex for compiled in self.rules])
+
+        # rule id -> (shadowing rule id, example command both match)
+        self.shadowed: Dict[int, Tuple[int, str]] = {}
+        if analyzer is not None:
+            patterns = [compiled.rule.pattern for compiled in self.rules]
+            for item in analyzer.shadowed(patterns, self.matcher):
+                self.shadowed[self.rules[item.index].rule.id] = (self.rules[item.by_index].rule.id, item.witness)
+
+        self.evaluated = self.rules
+        if self.shadowed:
+            self.evaluated = tuple(compiled for compiled in self.rules if compiled.rule.id not in self.shadowed)
+            self.matcher = RuleMatcher([compiled.regex for compiled in self.evaluated])
+
+        self._rstrip_safe: Optional[bool] = None
+
+        self.budget = budget
+        # evaluated index -> SlowRule
+        self.slow: Dict[int, SlowRule] = {}
+        self._slow_lock = threading.Lock()
+
+    @property
+    def rstrip_safe(self) -> bool:
+        """Whether stripping trailing whitespace provably never changes the
+        match (every evaluated pattern is insensitive to it); computed once"""
+        if self._rstrip_safe is None:
+            self._rstrip_safe = all(rstrip_safe(compiled.regex.pattern) for compiled in self.evaluated)
+        return self._rstrip_safe
+
+    def match(self, command_text: str) -> Optional[Rule]:
+        """First match wins"""
+        return self.match_counted(command_text)[0]
+
+    def match_counted(self, command_text: str) -> Tuple[Optional[Rule], int]:
+        """(first matching rule or None, rule patterns evaluated)"""
+        rule, evaluated, _ = self.match_budgeted(command_text)
+        return rule, evaluated
+
+    def match_budgeted(self, command_text: str) -> Tuple[Optional[Rule], int, int]:
+        """(first matching rule or None, rule patterns evaluated, rule
+        patterns skipped by the match budget)"""
+        if not self.budget:
+            index, evaluated = self.matcher.match_counted(command_text)
+            return (self.evaluated[index].rule if index is not None else None), evaluated, 0
+
+        length = len(command_text)
+        skip = {index for index, slow in self.slow.items() if length >= slow.length}
+        index, evaluated, skipped, slow = self.matcher.match_within(command_text, self.budget, skip)
+        for slow_index, seconds in slow:
+            self._record_slow(slow_index, length, seconds)
+        if skipped:
+            # Only candidates reached by the scan count, not every slow rule
+            slow_skipped = sum(skipped_index in skip for skipped_index in skipped)
+            over_budget = len(skipped) - slow_skipped
+            if slow_skipped:
+                Metrics.rules_skipped.inc("slow", amount=slow_skipped)
+            if over_budget:
+                Metrics.rules_skipped.inc("budget", amount=over_budget)
+            if index is not None and any(
+                skipped_index < index and self.evaluated[skipped_index].rule.action == RuleAction.AUTO_REJECT
+                for skipped_index in skipped
+            ):
+                index = None
+        return (self.evaluated[index].rule if index is not None else None), evaluated, len(skipped)
+
+    def _record_slow(self, index: int, length: int, seconds: float) -> None:
+        with self._slow_lock:
+            known = self.slow.get(index)
+            if known is not None and known.length <= length:
+                return
+            self.slow[index] = SlowRule(length, seconds)
+        rule = self.evaluated[index].rule
+        logger.warning(
+            "Rule %s (%r) took %.1f ms on a %d character command, over the %.1f ms match budget; "
+            "skipping it for commands of that length or longer",
+            rule.id, rule.pattern, seconds * 1000, length, self.budget * 1000
+        )
+
+    def slow_rules(self) -> List[Dict[str, Any]]:
+        """Rules currently skipped for long commands, in match order"""
+        return [
+            {
+                "rule_id": self.evaluated[index].rule.id,
+                "pattern": self.evaluated[index].rule.pattern,
+                "action": self.evaluated[index].rule.action.value,
+                "min_command_length": slow.length,
+                "search_ms": round(slow.seconds * 1000, 2),
+            }
+            for index, slow in sorted(self.slow.items())
+        ]
+
+
+class RulesetCache:
+    """
+    Process-local cache of the active ruleset with pre-compiled patterns.
+
+    Writers in this process call invalidate() so the next read reloads.
+    Other workers pick up changes once the TTL expires. The version only
+    moves when the reloaded rules actually differ, so it can be used as a
+    cache key by anything derived from the ruleset.
+    """
+
+    _lock: Optional[asyncio.Lock] = None
+    _lock_loop: Optional[asyncio.AbstractEventLoop] = None
+    _snapshot: Optional[Ruleset] = None
+    _fingerprint: Optional[Tuple] = None
+    _version = 0
+    _generation = 0
+
+    @staticmethod
+    async def _load_rules() -> List[Rule]:
+        return [Rule(**rule) for rule in await get_storage().rules.list("ACTIVE")]
+
+    @classmethod
+    def _reload_lock(cls) -> asyncio.Lock:
+        # asyncio locks belong to one event loop; recreate for a new loop
+        loop = asyncio.get_running_loop()
+        if cls._lock is None or cls._lock_loop is not loop:
+            cls._lock = asyncio.Lock()
+            cls._lock_loop = loop
+        return cls._lock
+
+    @staticmethod
+    def _compile(rules: List[Rule]) -> List[CompiledRule]:
+        compiled = []
+        for rule in rules:
+            try:
+                compiled.append(CompiledRule(rule, re.compile(rule.pattern)))
+            except re.error:
+                # Skip invalid regex patterns
+                continue
+        return compiled
+
+    @classmethod
+    def _fresh(cls) -> Optional[Ruleset]:
+        snapshot = cls._snapshot
+        ttl = get_settings().ruleset_cache_ttl_seconds
+        if snapshot is not None and time.monotonic() - snapshot.loaded_at < ttl:
+            return snapshot
+        return None
+
+    @classmethod
+    async def get(cls) -> Ruleset:
+        """Return the current ruleset, reloading it if stale or invalidated"""
+        snapshot = cls._fresh()
+        if snapshot is not None:
+            return snapshot
+
+        async with cls._reload_lock():
+            # Another caller may have reloaded while we waited
+            snapshot = cls._fresh()
+            if snapshot is not None:
+                return snapshot
+
+            generation = cls._generation
+            rules = await cls._load_rules()
+            fingerprint = tuple(
+                (rule.id, rule.pattern, rule.action.value, rule.priority, rule.description)
+                for rule in rules
+            )
+            if fingerprint != cls._fingerprint:
+                cls._version += 1
+                cls._fingerprint = fingerprint
+
+            settings = get_settings()
+            analyzer = RuleAnalysis.analyzer() if settings.ruleset_skip_shadowed_rules else None
+            snapshot = Ruleset(
+                cls._version, cls._compile(rules), time.monotonic(), analyzer, settings.rule_match_budget_ms / 1000
+            )
+            previous = cls._snapshot
+            if previous is not None and previous.version == snapshot.version:
+                snapshot.slow.update(previous.slow)
+            # Don't publish a snapshot that was invalidated while loading
+            if generation == cls._generation:
+                cls._snapshot = snapshot
+            return snapshot
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """Drop the cached ruleset so the next read goes to the DB"""
+        cls._generation += 1
+        cls._snapshot = None
+
+    @classmethod
+    def version(cls) -> int:
+        return cls._version
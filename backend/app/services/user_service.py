@@ -1,7 +1,9 @@
 import secrets
-from typing import List, Optional
-from app.database import supabase_admin
+from typing import Any, Dict, List, Optional, Tuple
 from app.models import User, UserCreate, UserRole
+from app.middleware.auth_cache import AuthCache
+from app.services.pagination import DEFAULT_PAGE_SIZE
+from app.storage import get_storage
 
 
 class UserService:
@@ -11,7 +13,7 @@ class UserService:
         return f"cgw_{secrets.token_urlsafe(32)}"
     
     @staticmethod
-    def create_user(user_create: UserCreate) -> User:
+    async def create_user(user_create: UserCreate) -> User:
         """Create a new user with generated API key"""
         api_key = UserService.generate_api_key()
         
@@ -22,43 +24,42 @@ class UserService:
             "credits": user_create.credits
         }
         
-        response = supabase_admin.table("users").insert(user_data).execute()
+        user = await get_storage().users.create(user_data)
         
-        if not response.data:
-            raise Exception("Failed to create user")
-        
-        return User(**response.data[0])
+        # Drop any negative entry a client may have cached for this key
+        AuthCache.invalidate_key(api_key)
+        return User(**user)
     
     @staticmethod
-    def get_user_by_id(user_id: int) -> Optional[User]:
-        """Get user by ID"""
-        response = supabase_admin.table("users").select("*").eq("id", user_id).execute()
-        
-        if not response.data or len(response.data) == 0:
-            return None
-        
-        return User(**response.data[0])
+    async def get_user_by_id(user_id: int) -> Optional[User]:
+        """Get user by ID (always reads the DB; use this for credit checks)"""
+        user = await get_storage().users.get(user_id)
+        return User(**user) if user else None
     
     @staticmethod
-    def get_all_users() -> List[User]:
-        """Get all users"""
-        response = supabase_admin.table("users").select("*").execute()
-        return [User(**user) for user in response.data]
+    async def get_all_users(
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        role: Optional[UserRole] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Get one page of users ordered by id, as DB rows. Returns (users, next_cursor)."""
+        return await get_storage().users.page(limit, cursor, role.value if role else None)
     
     @staticmethod
-    def update_credits(user_id: int, credits: int) -> User:
+    async def update_credits(user_id: int, credits: int) -> User:
         """Update user credits"""
-        response = supabase_admin.table("users").update({"credits": credits}).eq("id", user_id).execute()
+        user = await get_storage().users.update_credits(user_id, credits)
         
-        if not response.data:
+        if not user:
             raise Exception("Failed to update credits")
         
-        return User(**response.data[0])
+        AuthCache.invalidate_user(user_id)
+        return User(**user)
     
     @staticmethod
-    def deduct_credit(user_id: int) -> int:
+    async def deduct_credit(user_id: int) -> int:
         """Deduct one credit from user and return new balance"""
-        user = UserService.get_user_by_id(user_id)
+        user = await UserService.get_user_by_id(user_id)
         if not user:
             raise Exception("User not found")
         
@@ -66,5 +67,5 @@ class UserService:
             raise Exception("Insufficient credits")
         
         new_credits = user.credits - 1
-        updated_user = UserService.update_credits(user_id, new_credits)
+        updated_user = await UserService.update_credits(user_id, new_credits)
         return updated_user.credits
@@ -1,19 +1,28 @@
-from app.database import supabase_admin
-from app.models import RuleVoteCreate, VoteType, ApprovalStatus
-from typing import List, Dict, Any
+import asyncio
+from app.models import Rule, RuleVoteCreate, VoteType, ApprovalStatus
+from app.services.conflict_matrix import ConflictMatrix
+from app.services.notification_hub import NotificationHub, format_notification
+from app.serialization import parse_timestamp
+from app.services.rule_service import RuleService
+from app.services.ruleset_cache import RulesetCache
+from app.services.pagination import DEFAULT_PAGE_SIZE
+from app.storage import get_storage
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
 
 class VotingService:
     
     @staticmethod
-    def create_rule_with_approval(rule_data: dict, creator_id: int) -> dict:
+    async def create_rule_with_approval(rule_data: dict, creator_id: int) -> dict:
         """Create a rule that requires approval"""
+        RuleService.check_pattern(rule_data['pattern'])
         threshold = rule_data.get('approval_threshold', 1)
         
         # If threshold is 1, auto-approve (creator's implicit vote)
         status = 'ACTIVE' if threshold <= 1 else 'PENDING'
         
         # Create rule
-        result = supabase_admin.table('rules').insert({
+        rule = await get_storage().rules.create({
             'pattern': rule_data['pattern'],
             'action': rule_data['action'],
             'priority': rule_data['priority'],
@@ -21,29 +30,27 @@ class VotingService:
             'approval_threshold': threshold,
             'approval_status': status,
             'created_by': creator_id
-        }).execute()
+        })
         
-        rule = result.data[0]
+        RulesetCache.invalidate()
+        ConflictMatrix.add_rule(Rule(**rule))
         
         # If pending, notify all other admins
         if status == 'PENDING':
-            VotingService.notify_admins_for_approval(rule['id'], creator_id)
+            await VotingService.notify_admins_for_approval(rule['id'], creator_id)
         
         return rule
     
     @staticmethod
-    def notify_admins_for_approval(rule_id: int, creator_id: int):
+    async def notify_admins_for_approval(rule_id: int, creator_id: int):
         """Notify all admins except creator about pending rule"""
-        # Get all admins
-        admins_result = supabase_admin.table('users').select('id, name').eq('role', 'admin').execute()
-        
-        # Get rule details
-        rule_result = supabase_admin.table('rules').select('*').eq('id', rule_id).execute()
-        rule = rule_result.data[0]
+        # Get all admins and the rule details concurrently
+        storage = get_storage()
+        admins, rule = await asyncio.gather(storage.users.admins(), storage.rules.get(rule_id))
         
         # Create notifications for all admins except creator
         notifications = []
-        for admin in admins_result.data:
+        for admin in admins:
             if admin['id'] != creator_id:
                 notifications.append({
                     'rule_id': rule_id,
@@ -52,155 +59,94 @@ class VotingService:
                 })
         
         if notifications:
-            supabase_admin.table('rule_notifications').insert(notifications).execute()
+            await storage.notifications.create_many(notifications)
+            NotificationHub.wake()
     
     @staticmethod
-    def vote_on_rule(rule_id: int, admin_id: int, vote_data: RuleVoteCreate) -> Dict[str, Any]:
-        """Admin votes on a pending rule"""
-        # Check if rule exists and is pending
-        rule_result = supabase_admin.table('rules').select('*').eq('id', rule_id).execute()
-        if not rule_result.data:
-            raise ValueError("Rule not found")
-        
-        rule = rule_result.data[0]
-        
-        if rule['approval_status'] != 'PENDING':
-            raise ValueError(f"Rule is already {rule['approval_status']}")
-        
-        # Check if admin already voted
-        existing_vote = supabase_admin.table('rule_votes').select('*').eq('rule_id', rule_id).eq('admin_id', admin_id).execute()
-        
-        if existing_vote.data:
-            raise ValueError("You have already voted on this rule")
-        
-        # Record vote
-        supabase_admin.table('rule_votes').insert({
-            'rule_id': rule_id,
-            'admin_id': admin_id,
-            'vote': vote_data.vote.value,
-            'comment': vote_data.comment
-        }).execute()
-        
-        # Count votes
-        votes = supabase_admin.table('rule_votes').select('vote').eq('rule_id', rule_id).execute()
-        
-        approve_count = sum(1 for v in votes.data if v['vote'] == 'APPROVE')
-        reject_count = sum(1 for v in votes.data if v['vote'] == 'REJECT')
-        
-        # Check if threshold is met
-        new_status = None
-        if approve_count >= rule['approval_threshold']:
-            new_status = 'ACTIVE'
-            VotingService.notify_rule_decision(rule_id, 'approved', approve_count)
-        elif reject_count >= rule['approval_threshold']:
-            new_status = 'REJECTED'
-            VotingService.notify_rule_decision(rule_id, 'rejected', reject_count)
-        
-        # Update rule status if decision reached
-        if new_status:
-            supabase_admin.table('rules').update({
-                'approval_status': new_status
-            }).eq('id', rule_id).execute()
-        
+    async def vote_on_rule(rule_id: int, admin_id: int, vote_data: RuleVoteCreate) -> Dict[str, Any]:
+        """Admin votes on a pending rule
+        
+        The vote, the decision and the decision notifications are recorded in
+        one transaction (see 009_cast_rule_vote.sql).
+        """
+        result = await get_storage().votes.cast(rule_id, admin_id, vote_data.vote.value, vote_data.comment)
+        if result['decision_reached']:
+            RulesetCache.invalidate()
+            NotificationHub.wake()
+        
+        return result
+    
+    @staticmethod
+    def _format_vote(vote: dict) -> dict:
         return {
-            'rule_id': rule_id,
-            'your_vote': vote_data.vote.value,
-            'approve_count': approve_count,
-            'reject_count': reject_count,
-            'threshold': rule['approval_threshold'],
-            'new_status': new_status or 'PENDING',
-            'decision_reached': new_status is not None
+            'id': vote['id'],
+            'rule_id': vote['rule_id'],
+            'admin_id': vote['admin_id'],
+            'admin_name': vote['users']['name'],
+            'vote': vote['vote'],
+            'comment': vote['comment'],
+            'voted_at': parse_timestamp(vote['voted_at'])
         }
     
     @staticmethod
-    def notify_rule_decision(rule_id: int, decision: str, vote_count: int):
-        """Notify all admins when a rule decision is reached"""
-        # Get rule and all admins who voted
-        rule_result = supabase_admin.table('rules').select('*').eq('id', rule_id).execute()
-        rule = rule_result.data[0]
-        
-        votes_result = supabase_admin.table('rule_votes').select('admin_id').eq('rule_id', rule_id).execute()
-        admin_ids = [v['admin_id'] for v in votes_result.data]
-        
-        # Add creator to notification list
-        if rule['created_by']:
-            admin_ids.append(rule['created_by'])
-        
-        # Create notifications
-        notifications = []
-        for admin_id in set(admin_ids):
-            notifications.append({
-                'rule_id': rule_id,
-                'admin_id': admin_id,
-                'message': f"Rule '{rule['pattern']}' has been {decision} with {vote_count} votes"
-            })
-        
-        if notifications:
-            supabase_admin.table('rule_notifications').insert(notifications).execute()
+    async def get_pending_rules(include_votes: bool = False) -> List[dict]:
+        """Get all rules pending approval
+        
+        Vote tallies are maintained on the rule row. With include_votes the
+        votes are embedded in the same query.
+        """
+        rules = await get_storage().rules.pending(include_votes)
+        for rule in rules:
+            rule['created_at'] = parse_timestamp(rule.get('created_at'))
+            if include_votes:
+                rule['votes'] = [VotingService._format_vote(vote) for vote in rule.pop('rule_votes') or []]
+        
+        return rules
     
     @staticmethod
-    def get_pending_rules() -> List[dict]:
-        """Get all rules pending approval"""
-        result = supabase_admin.table('rules').select('*').eq('approval_status', 'PENDING').order('created_at', desc=True).execute()
-        
-        # Enrich with vote counts
-        enriched_rules = []
-        for rule in result.data:
-            votes = supabase_admin.table('rule_votes').select('vote').eq('rule_id', rule['id']).execute()
-            rule['approval_count'] = sum(1 for v in votes.data if v['vote'] == 'APPROVE')
-            rule['rejection_count'] = sum(1 for v in votes.data if v['vote'] == 'REJECT')
-            enriched_rules.append(rule)
-        
-        return enriched_rules
+    async def get_rule_votes(rule_id: int) -> List[dict]:
+        """Get all votes for a rule"""
+        return [VotingService._format_vote(vote) for vote in await get_storage().votes.for_rule(rule_id)]
     
     @staticmethod
-    def get_rule_votes(rule_id: int) -> List[dict]:
-        """Get all votes for a rule"""
-        result = supabase_admin.table('rule_votes').select('*, users(name)').eq('rule_id', rule_id).execute()
-        
-        votes = []
-        for vote in result.data:
-            votes.append({
-                'id': vote['id'],
-                'rule_id': vote['rule_id'],
-                'admin_id': vote['admin_id'],
-                'admin_name': vote['users']['name'],
-                'vote': vote['vote'],
-                'comment': vote['comment'],
-                'voted_at': vote['voted_at']
-            })
-        
-        return votes
+    async def get_admin_notifications(
+        admin_id: int,
+        unread_only: bool = False,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Get one page of notifications for an admin (newest first).
+        Returns (notifications, next_cursor)."""
+        rows, next_cursor = await get_storage().notifications.page(admin_id, limit, cursor, unread_only, since, until)
+        
+        notifications = [format_notification(notif) for notif in rows]
+        
+        return notifications, next_cursor
     
     @staticmethod
-    def get_admin_notifications(admin_id: int, unread_only: bool = False) -> List[dict]:
-        """Get notifications for an admin"""
-        query = supabase_admin.table('rule_notifications').select('*, rules(pattern)').eq('admin_id', admin_id)
-        
-        if unread_only:
-            query = query.eq('is_read', False)
-        
-        result = query.order('created_at', desc=True).execute()
-        
-        notifications = []
-        for notif in result.data:
-            # Handle case where rule might have been deleted
-            rule_pattern = notif.get('rules', {}).get('pattern', 'Unknown') if notif.get('rules') else 'Unknown'
-            
-            notifications.append({
-                'id': notif['id'],
-                'rule_id': notif['rule_id'],
-                'rule_pattern': rule_pattern,
-                'message': notif['message'],
-                'is_read': notif['is_read'],
-                'created_at': notif['created_at']
-            })
-        
-        return notifications
+    async def get_unread_count(admin_id: int) -> int:
+        """Unread notifications for an admin, from the maintained counter"""
+        counts = await NotificationHub.unread_counts([admin_id])
+        return counts[admin_id]
     
     @staticmethod
-    def mark_notification_read(notification_id: int, admin_id: int):
+    async def _publish_unread(admin_id: int) -> None:
+        # Only costs a read when the admin has a live notification stream here
+        if NotificationHub.connected(admin_id):
+            NotificationHub.publish_unread(admin_id, await VotingService.get_unread_count(admin_id))
+    
+    @staticmethod
+    async def mark_notification_read(notification_id: int, admin_id: int):
         """Mark a notification as read"""
-        supabase_admin.table('rule_notifications').update({
-            'is_read': True
-        }).eq('id', notification_id).eq('admin_id', admin_id).execute()
+        await get_storage().notifications.mark_read(admin_id, [notification_id])
+        await VotingService._publish_unread(admin_id)
+    
+    @staticmethod
+    async def mark_notifications_read(admin_id: int, notification_ids: Optional[List[int]] = None) -> int:
+        """Mark the given (or all) unread notifications of an admin as read in one UPDATE.
+        Returns how many were updated."""
+        count = await get_storage().notifications.mark_read(admin_id, notification_ids)
+        await VotingService._publish_unread(admin_id)
+        return count
@@ -0,0 +1,33 @@
+from functools import lru_cache
+from app.config import get_settings
+from .base import (
+    AuditRepository, CommandRepository, HistoryRepository, NotificationRepository,
+    RuleRepository, Storage, UserRepository, VoteRepository
+)
+
+
+def _backend(settings) -> Storage:
+    """The configured backend; imported lazily so only its dependencies are loaded"""
+    if settings.storage_backend == "supabase":
+        from .supabase import SupabaseStorage
+        return SupabaseStorage()
+    if settings.storage_backend == "sqlite":
+        from .sqlite import SqliteStorage
+        return SqliteStorage(settings.sqlite_path)
+    raise ValueError(f"Unknown storage_backend: {settings.storage_backend!r}")
+
+
+@lru_cache()
+def get_storage() -> Storage:
+    settings = get_settings()
+    storage = _backend(settings)
+    if settings.metrics_enabled or settings.db_trace_enabled:
+        from .instrumented import instrument
+        storage = instrument(storage, settings.metrics_enabled, settings.db_trace_enabled)
+    return storage
+
+
+__all__ = [
+    "get_storage", "Storage", "UserRepository", "RuleRepository", "CommandRepository",
+    "AuditRepository", "VoteRepository", "NotificationRepository", "HistoryRepository"
+]
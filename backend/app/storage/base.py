@@ -0,0 +1,201 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+Row = Dict[str, Any]
+# (rows, cursor for the next page or None on the last page)
+Page = Tuple[List[Row], Optional[str]]
+
+
+class UserRepository(ABC):
+    @abstractmethod
+    async def create(self, data: Row) -> Row: ...
+
+    @abstractmethod
+    async def get(self, user_id: int) -> Optional[Row]: ...
+
+    @abstractmethod
+    async def get_by_api_key(self, api_key: str) -> Optional[Row]: ...
+
+    @abstractmethod
+    async def page(self, limit: int, cursor: Optional[str] = None, role: Optional[str] = None) -> Page:
+        """Users by id, ascending"""
+
+    @abstractmethod
+    async def admins(self) -> List[Row]:
+        """id and name of every admin"""
+
+    @abstractmethod
+    async def update_credits(self, user_id: int, credits: int) -> Optional[Row]: ...
+
+
+class RuleRepository(ABC):
+    @abstractmethod
+    async def create(self, data: Row) -> Row: ...
+
+    @abstractmethod
+    async def get(self, rule_id: int) -> Optional[Row]: ...
+
+    @abstractmethod
+    async def list(self, approval_status: Optional[str] = None) -> List[Row]:
+        """Rules in match order (priority, then id)"""
+
+    @abstractmethod
+    async def pending(self, include_votes: bool = False) -> List[Row]:
+        """PENDING rules, newest first. With include_votes each row carries
+        rule_votes: [vote row with users: {name}]."""
+
+    @abstractmethod
+    async def delete(self, rule_id: int) -> bool: ...
+
+    @abstractmethod
+    async def test_commands(self) -> List[str]:
+        """Registered conflict-detection corpus, in registration order"""
+
+    @abstractmethod
+    async def add_test_commands(self, commands: List[str], created_by: Optional[int]) -> None:
+        """Register commands; already registered ones are ignored"""
+
+
+class CommandRepository(ABC):
+    @abstractmethod
+    async def process(
+        self,
+        user_id: int,
+        command_text: str,
+        action: str,
+        result_message: str,
+        rule_id: Optional[int] = None,
+        rule_description: Optional[str] = None
+    ) -> Row:
+        """Debit, command row and audit row in one transaction (see 003_process_command.sql).
+        Returns {id, status, action, result_message, new_balance, created_at}."""
+
+    @abstractmethod
+    async def process_batch(self, user_id: int, items: List[Row]) -> List[Row]:
+        """Batch form of process (see 005_process_command_batch.sql), results in input order"""
+
+    @abstractmethod
+    async def page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        user_id: Optional[int] = None,
+        status: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Page:
+        """Command rows, newest first"""
+
+
+class AuditRepository(ABC):
+    @abstractmethod
+    async def insert(self, record: Row) -> Row: ...
+
+    @abstractmethod
+    async def insert_many(self, records: List[Row]) -> None: ...
+
+    @abstractmethod
+    async def page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        user_id: Optional[int] = None,
+        event: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Page:
+        """Audit rows with users: {name}, newest first"""
+
+
+class VoteRepository(ABC):
+    @abstractmethod
+    async def cast(self, rule_id: int, admin_id: int, vote: str, comment: Optional[str]) -> Row:
+        """Record a vote, apply the decision and queue decision notifications in
+        one transaction (see 009_cast_rule_vote.sql). Raises ValueError when the
+        rule is missing, no longer pending or already voted on by this admin."""
+
+    @abstractmethod
+    async def for_rule(self, rule_id: int) -> List[Row]:
+        """Vote rows with users: {name}"""
+
+
+class NotificationRepository(ABC):
+    @abstractmethod
+    async def create_many(self, notifications: List[Row]) -> None: ...
+
+    @abstractmethod
+    async def page(
+        self,
+        admin_id: int,
+        limit: int,
+        cursor: Optional[str] = None,
+        unread_only: bool = False,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Page:
+        """Notification rows with rules: {pattern}, newest first"""
+
+    @abstractmethod
+    async def latest_id(self) -> int:
+        """Highest notification id, 0 when there are none"""
+
+    @abstractmethod
+    async def after(self, last_id: int, admin_ids: List[int], limit: int) -> List[Row]:
+        """Notifications for these admins with id > last_id, oldest first, with rules: {pattern}"""
+
+    @abstractmethod
+    async def unread_counts(self, admin_ids: List[int]) -> Dict[int, int]: ...
+
+    @abstractmethod
+    async def mark_read(self, admin_id: int, notification_ids: Optional[List[int]] = None) -> int:
+        """Mark the given (or all) unread notifications read. Returns how many changed."""
+
+
+class HistoryRepository(ABC):
+    """
+    Monthly partitions of the history tables (audit_logs, commands), for the
+    retention job (see 010_partition_history.sql). Months are "YYYY-MM" (UTC).
+    """
+
+    @abstractmethod
+    async def prepare(self, table: str, months_ahead: int) -> List[str]:
+        """Create the partitions for this month and months_ahead more. Returns the new months."""
+
+    @abstractmethod
+    async def months(self, table: str) -> List[str]:
+        """Months that still have a partition, oldest first"""
+
+    @abstractmethod
+    async def rows(self, table: str, month: str, after_id: int, limit: int) -> List[Row]:
+        """Rows of a month with id > after_id, in id order, shaped as page() returns them"""
+
+    @abstractmethod
+    async def drop(self, table: str, month: str) -> None:
+        """Detach and drop a month's partition"""
+
+
+class Storage(ABC):
+    """
+    Persistence used by the services, one repository per aggregate.
+
+    Rows are plain dicts shaped like PostgREST results (timestamps as ISO
+    strings, related rows embedded under the table name), so every backend
+    feeds the same model and formatting code.
+    """
+
+    name: str
+    users: UserRepository
+    rules: RuleRepository
+    commands: CommandRepository
+    audit: AuditRepository
+    votes: VoteRepository
+    notifications: NotificationRepository
+    history: HistoryRepository
+
+    @abstractmethod
+    async def close(self) -> None: ...
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Backend connection statistics"""
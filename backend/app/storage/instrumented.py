@@ -0,0 +1,68 @@
+import asyncio
+import functools
+import time
+from typing import Any
+from app.metrics import Metrics
+from app.tracing import DbTracer
+from .base import Storage
+
+# Storage attribute -> table behind it
+TABLES = {
+    "users": "users",
+    "rules": "rules",
+    "commands": "commands",
+    "audit": "audit_logs",
+    "votes": "rule_votes",
+    "notifications": "rule_notifications",
+    # Partition maintenance on audit_logs and commands
+    "history": "history",
+}
+
+
+class InstrumentedRepository:
+    """
+    Proxy around a storage repository. Every async call is timed per table
+    and operation into the metrics and recorded in the current request
+    trace. With the Supabase backend each call is one PostgREST round trip.
+    """
+
+    def __init__(self, repository, table: str, metrics: bool = True, tracing: bool = True):
+        self._repository = repository
+        self._table = table
+        self._metrics = metrics
+        self._tracing = tracing
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._repository, name)
+        if not asyncio.iscoroutinefunction(attr):
+            return attr
+
+        table, metrics, tracing = self._table, self._metrics, self._tracing
+
+        @functools.wraps(attr)
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            result = None
+            try:
+                result = await attr(*args, **kwargs)
+                return result
+            except Exception:
+                if metrics:
+                    Metrics.db_errors.inc(table, name)
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                if metrics:
+                    Metrics.db_duration.observe(elapsed, table, name)
+                if tracing:
+                    DbTracer.record(table, name, elapsed * 1000, result)
+
+        # Built once per method; later lookups don't reach __getattr__
+        setattr(self, name, timed)
+        return timed
+
+
+def instrument(storage: Storage, metrics: bool = True, tracing: bool = True) -> Storage:
+    for attribute, table in TABLES.items():
+        setattr(storage, attribute, InstrumentedRepository(getattr(storage, attribute), table, metrics, tracing))
+    return storage
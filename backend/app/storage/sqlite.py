@@ -0,0 +1,703 @@
+import json
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from app.services.history_archive import HISTORY_TABLES, month_bounds, month_of
+from app.services.pagination import decode_cursor, split_page
+from .base import (
+    AuditRepository, CommandRepository, HistoryRepository, NotificationRepository, Page, Row,
+    RuleRepository, Storage, UserRepository, VoteRepository
+)
+
+# Equivalent of migrations/001-009 (tables, indexes, tally and counter
+# triggers, seed data). The process_command / process_command_batch /
+# cast_rule_vote functions are implemented in Python below, each in one
+# transaction. The monthly partitions of 010 are emulated by month ranges
+# of the plain tables (SqliteHistory).
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    api_key TEXT UNIQUE NOT NULL,
+    role TEXT NOT NULL CHECK (role IN ('admin', 'member')),
+    credits INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS rules (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    pattern TEXT NOT NULL,
+    action TEXT NOT NULL CHECK (action IN ('AUTO_ACCEPT', 'AUTO_REJECT')),
+    priority INTEGER NOT NULL,
+    description TEXT,
+    approval_threshold INTEGER DEFAULT 1,
+    approval_status TEXT DEFAULT 'ACTIVE',
+    created_by INTEGER REFERENCES users(id),
+    approval_count INTEGER NOT NULL DEFAULT 0,
+    rejection_count INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS commands (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    command_text TEXT NOT NULL,
+    status TEXT NOT NULL CHECK (status IN ('executed', 'rejected')),
+    action TEXT,
+    result_message TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS audit_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    event TEXT NOT NULL,
+    meta TEXT,
+    timestamp TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS rule_votes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    rule_id INTEGER NOT NULL REFERENCES rules(id) ON DELETE CASCADE,
+    admin_id INTEGER NOT NULL REFERENCES users(id),
+    vote TEXT NOT NULL CHECK (vote IN ('APPROVE', 'REJECT')),
+    comment TEXT,
+    voted_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    UNIQUE (rule_id, admin_id)
+);
+
+CREATE TABLE IF NOT EXISTS rule_notifications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    rule_id INTEGER NOT NULL REFERENCES rules(id) ON DELETE CASCADE,
+    admin_id INTEGER NOT NULL REFERENCES users(id),
+    message TEXT NOT NULL,
+    is_read INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS rule_test_commands (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    command_text TEXT UNIQUE NOT NULL,
+    created_by INTEGER REFERENCES users(id) ON DELETE SET NULL,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS rule_notification_counters (
+    admin_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    unread_count INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_rules_priority ON rules(priority, id);
+CREATE INDEX IF NOT EXISTS idx_rules_status_created ON rules(approval_status, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_users_role_id ON users(role, id);
+CREATE INDEX IF NOT EXISTS idx_commands_created_id ON commands(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_commands_user_created_id ON commands(user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_commands_user_status_created_id ON commands(user_id, status, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_audit_logs_timestamp_id ON audit_logs(timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_audit_logs_user_timestamp_id ON audit_logs(user_id, timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_audit_logs_event_timestamp_id ON audit_logs(event, timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_rule_votes_admin ON rule_votes(admin_id);
+CREATE INDEX IF NOT EXISTS idx_rule_notifications_admin_created_id ON rule_notifications(admin_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_rule_notifications_admin_unread_created_id ON rule_notifications(admin_id, is_read, created_at DESC, id DESC);
+
+-- 007: vote tallies on rules
+CREATE TRIGGER IF NOT EXISTS trg_rule_votes_tally_insert AFTER INSERT ON rule_votes
+BEGIN
+    UPDATE rules SET
+        approval_count = approval_count + (NEW.vote = 'APPROVE'),
+        rejection_count = rejection_count + (NEW.vote = 'REJECT')
+    WHERE id = NEW.rule_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_rule_votes_tally_delete AFTER DELETE ON rule_votes
+BEGIN
+    UPDATE rules SET
+        approval_count = approval_count - (OLD.vote = 'APPROVE'),
+        rejection_count = rejection_count - (OLD.vote = 'REJECT')
+    WHERE id = OLD.rule_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_rule_votes_tally_update AFTER UPDATE OF vote, rule_id ON rule_votes
+BEGIN
+    UPDATE rules SET
+        approval_count = approval_count - (OLD.vote = 'APPROVE'),
+        rejection_count = rejection_count - (OLD.vote = 'REJECT')
+    WHERE id = OLD.rule_id;
+    UPDATE rules SET
+        approval_count = approval_count + (NEW.vote = 'APPROVE'),
+        rejection_count = rejection_count + (NEW.vote = 'REJECT')
+    WHERE id = NEW.rule_id;
+END;
+
+-- 008: unread notification counters
+CREATE TRIGGER IF NOT EXISTS trg_rule_notifications_unread_insert AFTER INSERT ON rule_notifications
+WHEN NOT NEW.is_read
+BEGIN
+    INSERT INTO rule_notification_counters (admin_id, unread_count) VALUES (NEW.admin_id, 1)
+    ON CONFLICT (admin_id) DO UPDATE SET unread_count = unread_count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_rule_notifications_unread_delete AFTER DELETE ON rule_notifications
+WHEN NOT OLD.is_read
+BEGIN
+    UPDATE rule_notification_counters SET unread_count = unread_count - 1 WHERE admin_id = OLD.admin_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_rule_notifications_unread_update AFTER UPDATE OF is_read, admin_id ON rule_notifications
+BEGIN
+    UPDATE rule_notification_counters SET unread_count = unread_count - 1
+    WHERE admin_id = OLD.admin_id AND NOT OLD.is_read;
+    INSERT INTO rule_notification_counters (admin_id, unread_count)
+    SELECT NEW.admin_id, 1 WHERE NOT NEW.is_read
+    ON CONFLICT (admin_id) DO UPDATE SET unread_count = unread_count + 1;
+END;
+
+-- 001: default admin and rules
+INSERT OR IGNORE INTO users (name, api_key, role, credits)
+VALUES ('Admin User', 'cgw_admin_default_key_change_in_production', 'admin', 100);
+
+INSERT INTO rules (pattern, action, priority, description)
+SELECT * FROM (VALUES
+    (':(){ :|:& };:', 'AUTO_REJECT', 1, 'Block fork-bomb'),
+    ('rm\\s+-rf\\s+/', 'AUTO_REJECT', 2, 'Block destructive delete of root'),
+    ('mkfs.', 'AUTO_REJECT', 3, 'Block filesystem formatting commands'),
+    ('git\\s+(status|log|diff)', 'AUTO_ACCEPT', 10, 'Allow safe git commands'),
+    ('^(ls|cat|pwd|echo)', 'AUTO_ACCEPT', 20, 'Allow basic shell commands')
+)
+WHERE NOT EXISTS (SELECT 1 FROM rules);
+"""
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    # WAL + NORMAL: commits do not fsync; a power loss can drop the last
+    # transactions but never corrupts the database
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+def _timestamp(value: Optional[Any] = None) -> str:
+    """UTC timestamp in one fixed-width format, so text order is time order"""
+    if value is None:
+        value = datetime.now(timezone.utc)
+    elif isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f+00:00')
+
+
+def _dict_row(cursor: sqlite3.Cursor, row: Tuple) -> Row:
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+def _placeholders(values: Sequence) -> str:
+    return ", ".join("?" * len(values))
+
+
+class _Repository:
+    def __init__(self, db: sqlite3.Connection):
+        self.db = db
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        # IMMEDIATE takes the write lock up front, like the row locks in the SQL functions
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        self.db.execute("COMMIT")
+
+    def insert(self, table: str, data: Row) -> Row:
+        columns = list(data)
+        return self.db.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({_placeholders(columns)}) RETURNING *",
+            [data[column] for column in columns]
+        ).fetchone()
+
+    def select_page(
+        self,
+        sql: str,
+        params: List[Any],
+        sort_column: Optional[str],
+        cursor: Optional[str],
+        limit: int,
+        desc: bool = True
+    ) -> Page:
+        """Keyset page over (sort_column, id); sql ends with its WHERE clause"""
+        op, direction = ("<", "DESC") if desc else (">", "ASC")
+        if cursor:
+            sort_value, last_id = decode_cursor(cursor)
+            if sort_column:
+                sql += f" AND ({sort_column}, t.id) {op} (?, ?)"
+                params = params + [sort_value, last_id]
+            else:
+                sql += f" AND t.id {op} ?"
+                params = params + [last_id]
+        order = f"{sort_column} {direction}, t.id {direction}" if sort_column else f"t.id {direction}"
+        rows = self.db.execute(f"{sql} ORDER BY {order} LIMIT ?", params + [limit + 1]).fetchall()
+        return split_page(rows, sort_column.split(".")[-1] if sort_column else None, limit)
+
+
+def _time_range(column: str, since: Optional[datetime], until: Optional[datetime]) -> Tuple[str, List[Any]]:
+    sql, params = "", []
+    if since:
+        sql += f" AND {column} >= ?"
+        params.append(_timestamp(since))
+    if until:
+        sql += f" AND {column} < ?"
+        params.append(_timestamp(until))
+    return sql, params
+
+
+def _embed(row: Row, table: str, column: str) -> Row:
+    """Move a joined column under the related table's key, as PostgREST embeds it"""
+    value = row.pop(f"{table}_{column}")
+    row[table] = {column: value} if value is not None else None
+    return row
+
+
+class SqliteUsers(_Repository, UserRepository):
+    async def create(self, data: Row) -> Row:
+        return self.insert("users", {**data, "created_at": _timestamp()})
+
+    async def get(self, user_id: int) -> Optional[Row]:
+        return self.db.execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone()
+
+    async def get_by_api_key(self, api_key: str) -> Optional[Row]:
+        return self.db.execute("SELECT * FROM users WHERE api_key = ?", (api_key,)).fetchone()
+
+    async def page(self, limit: int, cursor: Optional[str] = None, role: Optional[str] = None) -> Page:
+        sql, params = "SELECT * FROM users t WHERE 1 = 1", []
+        if role:
+            sql += " AND role = ?"
+            params.append(role)
+        return self.select_page(sql, params, None, cursor, limit, desc=False)
+
+    async def admins(self) -> List[Row]:
+        return self.db.execute("SELECT id, name FROM users WHERE role = 'admin'").fetchall()
+
+    async def update_credits(self, user_id: int, credits: int) -> Optional[Row]:
+        return self.db.execute(
+            "UPDATE users SET credits = ? WHERE id = ? RETURNING *", (credits, user_id)
+        ).fetchone()
+
+
+class SqliteRules(_Repository, RuleRepository):
+    async def create(self, data: Row) -> Row:
+        return self.insert("rules", {**data, "created_at": _timestamp()})
+
+    async def get(self, rule_id: int) -> Optional[Row]:
+        return self.db.execute("SELECT * FROM rules WHERE id = ?", (rule_id,)).fetchone()
+
+    async def list(self, approval_status: Optional[str] = None) -> List[Row]:
+        if approval_status:
+            return self.db.execute(
+                "SELECT * FROM rules WHERE approval_status = ? ORDER BY priority, id", (approval_status,)
+            ).fetchall()
+        return self.db.execute("SELECT * FROM rules ORDER BY priority, id").fetchall()
+
+    async def pending(self, include_votes: bool = False) -> List[Row]:
+        rules = self.db.execute(
+            "SELECT * FROM rules WHERE approval_status = 'PENDING' ORDER BY created_at DESC"
+        ).fetchall()
+        if include_votes:
+            by_rule = {rule["id"]: rule for rule in rules}
+            for rule in rules:
+                rule["rule_votes"] = []
+            ids = list(by_rule)
+            for vote in self.db.execute(
+                f"SELECT v.*, u.name AS users_name FROM rule_votes v LEFT JOIN users u ON u.id = v.admin_id "
+                f"WHERE v.rule_id IN ({_placeholders(ids)}) ORDER BY v.id",
+                ids
+            ):
+                by_rule[vote["rule_id"]]["rule_votes"].append(_embed(vote, "users", "name"))
+        return rules
+
+    async def delete(self, rule_id: int) -> bool:
+        return self.db.execute("DELETE FROM rules WHERE id = ?", (rule_id,)).rowcount > 0
+
+    async def test_commands(self) -> List[str]:
+        return [row["command_text"] for row in self.db.execute("SELECT command_text FROM rule_test_commands ORDER BY id")]
+
+    async def add_test_commands(self, commands: List[str], created_by: Optional[int]) -> None:
+        now = _timestamp()
+        with self.transaction():
+            self.db.executemany(
+                "INSERT OR IGNORE INTO rule_test_commands (command_text, created_by, created_at) VALUES (?, ?, ?)",
+                [(command, created_by, now) for command in commands]
+            )
+
+
+def _command_outcome(command_text: str, action: str, message: str, balance: int, rule_id, rule_description) -> Tuple[str, str, str, str, Row]:
+    """(action, status, message, event, meta), as in process_command / process_command_batch"""
+    if action == 'NO_CREDITS':
+        return action, 'rejected', 'Insufficient credits', 'COMMAND_REJECTED', {'command': command_text, 'reason': 'No credits'}
+    if action == 'NO_RULE':
+        return action, 'rejected', message, 'COMMAND_REJECTED', {'command': command_text, 'reason': 'No matching rule'}
+    meta = {'command': command_text, 'rule_id': rule_id, 'rule_description': rule_description}
+    if action == 'AUTO_REJECT':
+        return action, 'rejected', message, 'COMMAND_REJECTED', meta
+    return action, 'executed', message, 'COMMAND_EXECUTED', {**meta, 'credits_remaining': balance}
+
+
+class SqliteCommands(_Repository, CommandRepository):
+    def _balance(self, user_id: int) -> int:
+        row = self.db.execute("SELECT credits FROM users WHERE id = ?", (user_id,)).fetchone()
+        if row is None:
+            raise Exception("User not found")
+        return row["credits"]
+
+    async def process(
+        self,
+        user_id: int,
+        command_text: str,
+        action: str,
+        result_message: str,
+        rule_id: Optional[int] = None,
+        rule_description: Optional[str] = None
+    ) -> Row:
+        now = _timestamp()
+        with self.transaction():
+            balance = self._balance(user_id)
+            if balance <= 0:
+                action = 'NO_CREDITS'
+            elif action == 'AUTO_ACCEPT':
+                balance -= 1
+                self.db.execute("UPDATE users SET credits = ? WHERE id = ?", (balance, user_id))
+
+            action, status, message, event, meta = _command_outcome(
+                command_text, action, result_message, balance, rule_id, rule_description
+            )
+            command_id = self.db.execute(
+                "INSERT INTO commands (user_id, command_text, status, action, result_message, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (user_id, command_text, status, action, message, now)
+            ).lastrowid
+            self.db.execute(
+                "INSERT INTO audit_logs (user_id, event, meta, timestamp) VALUES (?, ?, ?, ?)",
+                (user_id, event, json.dumps(meta), now)
+            )
+
+        return {
+            'id': command_id,
+            'status': status,
+            'action': action,
+            'result_message': message,
+            'new_balance': balance,
+            'created_at': now
+        }
+
+    async def process_batch(self, user_id: int, items: List[Row]) -> List[Row]:
+        now = _timestamp()
+        results, commands, audit = [], [], []
+        with self.transaction():
+            balance = self._balance(user_id)
+            for item in items:
+                action = item['action']
+                if balance <= 0:
+                    action = 'NO_CREDITS'
+                elif action == 'AUTO_ACCEPT':
+                    balance -= 1
+                action, status, message, event, meta = _command_outcome(
+                    item['command_text'], action, item['result_message'], balance,
+                    item.get('rule_id'), item.get('rule_description')
+                )
+                commands.append((user_id, item['command_text'], status, action, message, now))
+                audit.append((user_id, event, json.dumps(meta), now))
+                results.append({
+                    'command_text': item['command_text'],
+                    'status': status,
+                    'action': action,
+                    'result_message': message,
+                    'new_balance': balance,
+                    'created_at': now
+                })
+
+            self.db.execute("UPDATE users SET credits = ? WHERE id = ?", (balance, user_id))
+            for result, values in zip(results, commands):
+                result['id'] = self.db.execute(
+                    "INSERT INTO commands (user_id, command_text, status, action, result_message, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    values
+                ).lastrowid
+            self.db.executemany("INSERT INTO audit_logs (user_id, event, meta, timestamp) VALUES (?, ?, ?, ?)", audit)
+
+        return results
+
+    async def page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        user_id: Optional[int] = None,
+        status: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Page:
+        sql, params = "SELECT * FROM commands t WHERE 1 = 1", []
+        if user_id is not None:
+            sql += " AND user_id = ?"
+            params.append(user_id)
+        if status:
+            sql += " AND status = ?"
+            params.append(status)
+        range_sql, range_params = _time_range("created_at", since, until)
+        return self.select_page(sql + range_sql, params + range_params, "created_at", cursor, limit)
+
+
+def _audit_row(row: Row) -> Row:
+    if row.get("meta") is not None:
+        row["meta"] = json.loads(row["meta"])
+    return row
+
+
+class SqliteAudit(_Repository, AuditRepository):
+    @staticmethod
+    def _values(record: Row) -> Tuple:
+        return (record["user_id"], record["event"], json.dumps(record.get("meta")), _timestamp(record.get("timestamp")))
+
+    async def insert(self, record: Row) -> Row:
+        row = self.db.execute(
+            "INSERT INTO audit_logs (user_id, event, meta, timestamp) VALUES (?, ?, ?, ?) RETURNING *",
+            self._values(record)
+        ).fetchone()
+        return _audit_row(row)
+
+    async def insert_many(self, records: List[Row]) -> None:
+        with self.transaction():
+            self.db.executemany(
+                "INSERT INTO audit_logs (user_id, event, meta, timestamp) VALUES (?, ?, ?, ?)",
+                [self._values(record) for record in records]
+            )
+
+    async def page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        user_id: Optional[int] = None,
+        event: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Page:
+        sql = "SELECT t.*, u.name AS users_name FROM audit_logs t LEFT JOIN users u ON u.id = t.user_id WHERE 1 = 1"
+        params: List[Any] = []
+        if user_id is not None:
+            sql += " AND t.user_id = ?"
+            params.append(user_id)
+        if event:
+            sql += " AND t.event = ?"
+            params.append(event)
+        range_sql, range_params = _time_range("t.timestamp", since, until)
+        rows, next_cursor = self.select_page(sql + range_sql, params + range_params, "t.timestamp", cursor, limit)
+        return [_embed(_audit_row(row), "users", "name") for row in rows], next_cursor
+
+
+class SqliteVotes(_Repository, VoteRepository):
+    async def cast(self, rule_id: int, admin_id: int, vote: str, comment: Optional[str]) -> Row:
+        with self.transaction():
+            rule = self.db.execute("SELECT * FROM rules WHERE id = ?", (rule_id,)).fetchone()
+            if rule is None:
+                raise ValueError("Rule not found")
+            if rule["approval_status"] != 'PENDING':
+                raise ValueError(f"Rule is already {rule['approval_status']}")
+
+            try:
+                self.db.execute(
+                    "INSERT INTO rule_votes (rule_id, admin_id, vote, comment, voted_at) VALUES (?, ?, ?, ?, ?)",
+                    (rule_id, admin_id, vote, comment, _timestamp())
+                )
+            except sqlite3.IntegrityError as e:
+                if "UNIQUE" not in str(e):
+                    raise
+                raise ValueError("You have already voted on this rule")
+
+            # Tallies as updated by trg_rule_votes_tally_*
+            tallies = self.db.execute(
+                "SELECT approval_count, rejection_count FROM rules WHERE id = ?", (rule_id,)
+            ).fetchone()
+            approve_count, reject_count = tallies["approval_count"], tallies["rejection_count"]
+            threshold = rule["approval_threshold"]
+
+            new_status = None
+            if approve_count >= threshold:
+                new_status, decision, decision_count = 'ACTIVE', 'approved', approve_count
+            elif reject_count >= threshold:
+                new_status, decision, decision_count = 'REJECTED', 'rejected', reject_count
+
+            if new_status:
+                self.db.execute("UPDATE rules SET approval_status = ? WHERE id = ?", (new_status, rule_id))
+                recipients = {row["admin_id"] for row in self.db.execute(
+                    "SELECT admin_id FROM rule_votes WHERE rule_id = ?", (rule_id,)
+                )}
+                if rule["created_by"]:
+                    recipients.add(rule["created_by"])
+                message = f"Rule '{rule['pattern']}' has been {decision} with {decision_count} votes"
+                now = _timestamp()
+                self.db.executemany(
+                    "INSERT INTO rule_notifications (rule_id, admin_id, message, created_at) VALUES (?, ?, ?, ?)",
+                    [(rule_id, recipient, message, now) for recipient in sorted(recipients)]
+                )
+
+        return {
+            'rule_id': rule_id,
+            'your_vote': vote,
+            'approve_count': approve_count,
+            'reject_count': reject_count,
+            'threshold': threshold,
+            'new_status': new_status or 'PENDING',
+            'decision_reached': new_status is not None
+        }
+
+    async def for_rule(self, rule_id: int) -> List[Row]:
+        rows = self.db.execute(
+            "SELECT v.*, u.name AS users_name FROM rule_votes v LEFT JOIN users u ON u.id = v.admin_id "
+            "WHERE v.rule_id = ? ORDER BY v.id",
+            (rule_id,)
+        ).fetchall()
+        return [_embed(row, "users", "name") for row in rows]
+
+
+def _notification_row(row: Row) -> Row:
+    row["is_read"] = bool(row["is_read"])
+    return _embed(row, "rules", "pattern")
+
+
+class SqliteNotifications(_Repository, NotificationRepository):
+    SELECT = "SELECT t.*, r.pattern AS rules_pattern FROM rule_notifications t LEFT JOIN rules r ON r.id = t.rule_id"
+
+    async def create_many(self, notifications: List[Row]) -> None:
+        now = _timestamp()
+        with self.transaction():
+            self.db.executemany(
+                "INSERT INTO rule_notifications (rule_id, admin_id, message, created_at) VALUES (?, ?, ?, ?)",
+                [(n["rule_id"], n["admin_id"], n["message"], now) for n in notifications]
+            )
+
+    async def page(
+        self,
+        admin_id: int,
+        limit: int,
+        cursor: Optional[str] = None,
+        unread_only: bool = False,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Page:
+        sql, params = self.SELECT + " WHERE t.admin_id = ?", [admin_id]
+        if unread_only:
+            sql += " AND t.is_read = 0"
+        range_sql, range_params = _time_range("t.created_at", since, until)
+        rows, next_cursor = self.select_page(sql + range_sql, params + range_params, "t.created_at", cursor, limit)
+        return [_notification_row(row) for row in rows], next_cursor
+
+    async def latest_id(self) -> int:
+        return self.db.execute("SELECT COALESCE(MAX(id), 0) AS id FROM rule_notifications").fetchone()["id"]
+
+    async def after(self, last_id: int, admin_ids: List[int], limit: int) -> List[Row]:
+        rows = self.db.execute(
+            f"{self.SELECT} WHERE t.id > ? AND t.admin_id IN ({_placeholders(admin_ids)}) ORDER BY t.id LIMIT ?",
+            [last_id, *admin_ids, limit]
+        ).fetchall()
+        return [_notification_row(row) for row in rows]
+
+    async def unread_counts(self, admin_ids: List[int]) -> Dict[int, int]:
+        counts = {admin_id: 0 for admin_id in admin_ids}
+        for row in self.db.execute(
+            f"SELECT admin_id, unread_count FROM rule_notification_counters WHERE admin_id IN ({_placeholders(admin_ids)})",
+            admin_ids
+        ):
+            counts[row["admin_id"]] = row["unread_count"]
+        return counts
+
+    async def mark_read(self, admin_id: int, notification_ids: Optional[List[int]] = None) -> int:
+        sql, params = "UPDATE rule_notifications SET is_read = 1 WHERE admin_id = ? AND is_read = 0", [admin_id]
+        if notification_ids is not None:
+            sql += f" AND id IN ({_placeholders(notification_ids)})"
+            params += notification_ids
+        return self.db.execute(sql, params).rowcount
+
+
+class SqliteHistory(_Repository, HistoryRepository):
+    """Months are time ranges of the plain tables; dropping one deletes its rows"""
+
+    async def prepare(self, table: str, months_ahead: int) -> List[str]:
+        return []
+
+    async def months(self, table: str) -> List[str]:
+        column = HISTORY_TABLES[table]
+        months, start = [], ""
+        # One index seek per month rather than a scan of the table
+        while True:
+            row = self.db.execute(f"SELECT MIN({column}) AS first FROM {table} WHERE {column} >= ?", (start,)).fetchone()
+            if row["first"] is None:
+                return months
+            month = month_of(datetime.fromisoformat(row["first"]))
+            months.append(month)
+            start = _timestamp(month_bounds(month)[1])
+
+    async def rows(self, table: str, month: str, after_id: int, limit: int) -> List[Row]:
+        column = HISTORY_TABLES[table]
+        start, end = month_bounds(month)
+        # Unary + keeps SQLite on the id order instead of scanning the
+        # whole month through the time index for every chunk
+        where = f"t.id > ? AND +t.{column} >= ? AND +t.{column} < ? ORDER BY t.id LIMIT ?"
+        params = (after_id, _timestamp(start), _timestamp(end), limit)
+        if table == "audit_logs":
+            rows = self.db.execute(
+                f"SELECT t.*, u.name AS users_name FROM audit_logs t LEFT JOIN users u ON u.id = t.user_id WHERE {where}",
+                params
+            ).fetchall()
+            return [_embed(_audit_row(row), "users", "name") for row in rows]
+        return self.db.execute(f"SELECT * FROM {table} t WHERE {where}", params).fetchall()
+
+    async def drop(self, table: str, month: str) -> None:
+        column = HISTORY_TABLES[table]
+        start, end = month_bounds(month)
+        with self.transaction():
+            self.db.execute(
+                f"DELETE FROM {table} WHERE {column} >= ? AND {column} < ?", (_timestamp(start), _timestamp(end))
+            )
+
+
+class SqliteStorage(Storage):
+    """
+    Embedded single-node storage.
+
+    One connection in autocommit mode, used from the event loop thread:
+    statements take microseconds, so they run inline rather than on a
+    thread pool. Multi-statement operations run in BEGIN IMMEDIATE
+    transactions. path=":memory:" keeps everything in memory.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self.db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.db.row_factory = _dict_row
+        for pragma in PRAGMAS:
+            self.db.execute(pragma)
+        self.db.executescript(SCHEMA)
+
+        self.users = SqliteUsers(self.db)
+        self.rules = SqliteRules(self.db)
+        self.commands = SqliteCommands(self.db)
+        self.audit = SqliteAudit(self.db)
+        self.votes = SqliteVotes(self.db)
+        self.notifications = SqliteNotifications(self.db)
+        self.history = SqliteHistory(self.db)
+
+    async def close(self) -> None:
+        self.db.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "path": self.path,
+            "journal_mode": self.db.execute("PRAGMA journal_mode").fetchone()["journal_mode"],
+            "sqlite_version": sqlite3.sqlite_version,
+        }
@@ -0,0 +1,285 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from postgrest.exceptions import APIError
+from app.database import supabase, supabase_admin, transport
+from app.services.pagination import apply_keyset, apply_time_range, split_page
+from .base import (
+    AuditRepository, CommandRepository, HistoryRepository, NotificationRepository, Page, Row,
+    RuleRepository, Storage, UserRepository, VoteRepository
+)
+
+# SQLSTATE of a plain RAISE EXCEPTION in plpgsql
+RAISE_EXCEPTION = 'P0001'
+
+
+class SupabaseUsers(UserRepository):
+    async def create(self, data: Row) -> Row:
+        response = await supabase_admin.table("users").insert(data).execute()
+        if not response.data:
+            raise Exception("Failed to create user")
+        return response.data[0]
+
+    async def get(self, user_id: int) -> Optional[Row]:
+        response = await supabase_admin.table("users").select("*").eq("id", user_id).execute()
+        return response.data[0] if response.data else None
+
+    async def get_by_api_key(self, api_key: str) -> Optional[Row]:
+        response = await supabase_admin.table("users").select("*").eq("api_key", api_key).execute()
+        return response.data[0] if response.data else None
+
+    async def page(self, limit: int, cursor: Optional[str] = None, role: Optional[str] = None) -> Page:
+        query = supabase_admin.table("users").select("*")
+        if role:
+            query = query.eq("role", role)
+        response = await apply_keyset(query, None, cursor, limit, desc=False).execute()
+        return split_page(response.data, None, limit)
+
+    async def admins(self) -> List[Row]:
+        response = await supabase_admin.table('users').select('id, name').eq('role', 'admin').execute()
+        return response.data
+
+    async def update_credits(self, user_id: int, credits: int) -> Optional[Row]:
+        response = await supabase_admin.table("users").update({"credits": credits}).eq("id", user_id).execute()
+        return response.data[0] if response.data else None
+
+
+class SupabaseRules(RuleRepository):
+    async def create(self, data: Row) -> Row:
+        response = await supabase_admin.table("rules").insert(data).execute()
+        if not response.data:
+            raise Exception("Failed to create rule")
+        return response.data[0]
+
+    async def get(self, rule_id: int) -> Optional[Row]:
+        response = await supabase_admin.table('rules').select('*').eq('id', rule_id).execute()
+        return response.data[0] if response.data else None
+
+    async def list(self, approval_status: Optional[str] = None) -> List[Row]:
+        query = supabase_admin.table("rules").select("*")
+        if approval_status:
+            query = query.eq("approval_status", approval_status)
+        response = await query.order("priority").order("id").execute()
+        return response.data
+
+    async def pending(self, include_votes: bool = False) -> List[Row]:
+        columns = '*, rule_votes(*, users(name))' if include_votes else '*'
+        response = await supabase_admin.table('rules').select(columns).eq('approval_status', 'PENDING').order('created_at', desc=True).execute()
+        return response.data
+
+    async def delete(self, rule_id: int) -> bool:
+        response = await supabase_admin.table("rules").delete().eq("id", rule_id).execute()
+        return bool(response.data)
+
+    async def test_commands(self) -> List[str]:
+        response = await supabase_admin.table("rule_test_commands").select("command_text").order("id").execute()
+        return [row["command_text"] for row in response.data]
+
+    async def add_test_commands(self, commands: List[str], created_by: Optional[int]) -> None:
+        await supabase_admin.table("rule_test_commands").upsert(
+            [{"command_text": command, "created_by": created_by} for command in commands],
+            on_conflict="command_text",
+            ignore_duplicates=True
+        ).execute()
+
+
+class SupabaseCommands(CommandRepository):
+    async def process(
+        self,
+        user_id: int,
+        command_text: str,
+        action: str,
+        result_message: str,
+        rule_id: Optional[int] = None,
+        rule_description: Optional[str] = None
+    ) -> Row:
+        response = await supabase_admin.rpc("process_command", {
+            "p_user_id": user_id,
+            "p_command_text": command_text,
+            "p_action": action,
+            "p_result_message": result_message,
+            "p_rule_id": rule_id,
+            "p_rule_description": rule_description,
+        }).execute()
+        return response.data
+
+    async def process_batch(self, user_id: int, items: List[Row]) -> List[Row]:
+        response = await supabase_admin.rpc("process_command_batch", {
+            "p_user_id": user_id,
+            "p_commands": items
+        }).execute()
+        return response.data
+
+    async def page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        user_id: Optional[int] = None,
+        status: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Page:
+        query = supabase_admin.table("commands").select("*")
+        if user_id is not None:
+            query = query.eq("user_id", user_id)
+        if status:
+            query = query.eq("status", status)
+        query = apply_time_range(query, "created_at", since, until)
+        response = await apply_keyset(query, "created_at", cursor, limit).execute()
+        return split_page(response.data, "created_at", limit)
+
+
+class SupabaseAudit(AuditRepository):
+    async def insert(self, record: Row) -> Row:
+        response = await supabase_admin.table("audit_logs").insert(record).execute()
+        if not response.data:
+            raise Exception("Failed to create audit log")
+        return response.data[0]
+
+    async def insert_many(self, records: List[Row]) -> None:
+        await supabase_admin.table("audit_logs").insert(records).execute()
+
+    async def page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        user_id: Optional[int] = None,
+        event: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Page:
+        query = supabase_admin.table("audit_logs").select("*, users(name)")
+        if user_id is not None:
+            query = query.eq("user_id", user_id)
+        if event:
+            query = query.eq("event", event)
+        query = apply_time_range(query, "timestamp", since, until)
+        response = await apply_keyset(query, "timestamp", cursor, limit).execute()
+        return split_page(response.data, "timestamp", limit)
+
+
+class SupabaseVotes(VoteRepository):
+    async def cast(self, rule_id: int, admin_id: int, vote: str, comment: Optional[str]) -> Row:
+        try:
+            response = await supabase_admin.rpc('cast_rule_vote', {
+                'p_rule_id': rule_id,
+                'p_admin_id': admin_id,
+                'p_vote': vote,
+                'p_comment': comment
+            }).execute()
+        except APIError as e:
+            # Rule not found / not pending / already voted
+            if e.code == RAISE_EXCEPTION:
+                raise ValueError(e.message)
+            raise
+        return response.data
+
+    async def for_rule(self, rule_id: int) -> List[Row]:
+        response = await supabase_admin.table('rule_votes').select('*, users(name)').eq('rule_id', rule_id).execute()
+        return response.data
+
+
+class SupabaseNotifications(NotificationRepository):
+    async def create_many(self, notifications: List[Row]) -> None:
+        await supabase_admin.table('rule_notifications').insert(notifications).execute()
+
+    async def page(
+        self,
+        admin_id: int,
+        limit: int,
+        cursor: Optional[str] = None,
+        unread_only: bool = False,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Page:
+        query = supabase_admin.table('rule_notifications').select('*, rules(pattern)').eq('admin_id', admin_id)
+        if unread_only:
+            query = query.eq('is_read', False)
+        query = apply_time_range(query, 'created_at', since, until)
+        response = await apply_keyset(query, 'created_at', cursor, limit).execute()
+        return split_page(response.data, 'created_at', limit)
+
+    async def latest_id(self) -> int:
+        response = await supabase_admin.table('rule_notifications').select('id').order('id', desc=True).limit(1).execute()
+        return response.data[0]['id'] if response.data else 0
+
+    async def after(self, last_id: int, admin_ids: List[int], limit: int) -> List[Row]:
+        response = await (
+            supabase_admin.table('rule_notifications')
+            .select('*, rules(pattern)')
+            .gt('id', last_id)
+            .in_('admin_id', admin_ids)
+            .order('id')
+            .limit(limit)
+            .execute()
+        )
+        return response.data
+
+    async def unread_counts(self, admin_ids: List[int]) -> Dict[int, int]:
+        response = await (
+            supabase_admin.table('rule_notification_counters')
+            .select('admin_id, unread_count')
+            .in_('admin_id', admin_ids)
+            .execute()
+        )
+        counts = {admin_id: 0 for admin_id in admin_ids}
+        counts.update({row['admin_id']: row['unread_count'] for row in response.data})
+        return counts
+
+    async def mark_read(self, admin_id: int, notification_ids: Optional[List[int]] = None) -> int:
+        query = supabase_admin.table('rule_notifications').update({
+            'is_read': True
+        }).eq('admin_id', admin_id).eq('is_read', False)
+        if notification_ids is not None:
+            query = query.in_('id', notification_ids)
+        response = await query.execute()
+        return len(response.data or [])
+
+
+class SupabaseHistory(HistoryRepository):
+    async def prepare(self, table: str, months_ahead: int) -> List[str]:
+        response = await supabase_admin.rpc('ensure_history_partitions', {
+            'p_table': table,
+            'p_months_ahead': months_ahead
+        }).execute()
+        return response.data or []
+
+    async def months(self, table: str) -> List[str]:
+        response = await supabase_admin.rpc('history_partitions', {'p_table': table}).execute()
+        return [row['month'] for row in response.data]
+
+    async def rows(self, table: str, month: str, after_id: int, limit: int) -> List[Row]:
+        response = await supabase_admin.rpc('read_history_partition', {
+            'p_table': table,
+            'p_month': month,
+            'p_after_id': after_id,
+            'p_limit': limit
+        }).execute()
+        return response.data or []
+
+    async def drop(self, table: str, month: str) -> None:
+        params = {'p_table': table, 'p_month': month}
+        await supabase_admin.rpc('detach_history_partition', params).execute()
+        await supabase_admin.rpc('drop_history_partition', params).execute()
+
+
+class SupabaseStorage(Storage):
+    """PostgREST tables and RPC functions from migrations/*.sql"""
+
+    name = "supabase"
+
+    def __init__(self):
+        self.users = SupabaseUsers()
+        self.rules = SupabaseRules()
+        self.commands = SupabaseCommands()
+        self.audit = SupabaseAudit()
+        self.votes = SupabaseVotes()
+        self.notifications = SupabaseNotifications()
+        self.history = SupabaseHistory()
+
+    async def close(self) -> None:
+        # Closes the connection pool shared by both clients
+        await supabase_admin.postgrest.aclose()
+        await supabase.postgrest.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, **transport.stats()}
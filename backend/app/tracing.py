@@ -0,0 +1,178 @@
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+slow_request_logger = logging.getLogger("gateway.slow_requests")
+
+
+class DbCall(NamedTuple):
+    table: str
+    operation: str
+    duration_ms: float
+    rows: Optional[int]
+
+
+def row_count(result: Any) -> Optional[int]:
+    """Rows returned (or changed) by a storage call, from its result shape"""
+    if result is None:
+        return 0
+    if isinstance(result, bool):
+        return int(result)
+    if isinstance(result, int):
+        return result
+    if isinstance(result, tuple) and len(result) == 2 and isinstance(result[0], list):
+        return len(result[0])  # (rows, next cursor)
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict):
+        return 1
+    return None
+
+
+class RequestTrace:
+    """DB calls made while handling one request (or inside DbTracer.trace())"""
+
+    def __init__(self, name: str = ""):
+        self.name = name
+        self.started = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.status: Optional[int] = None
+        # Long-lived responses (SSE) are exempt from the duration threshold
+        self.streaming = False
+        self.calls: List[DbCall] = []
+
+    def record(self, table: str, operation: str, duration_ms: float, rows: Optional[int]) -> None:
+        self.calls.append(DbCall(table, operation, duration_ms, rows))
+
+    def finish(self, status: Optional[int] = None) -> None:
+        self.duration_ms = (time.perf_counter() - self.started) * 1000
+        self.status = status
+
+    @property
+    def count(self) -> int:
+        return len(self.calls)
+
+    @property
+    def db_ms(self) -> float:
+        return sum(call.duration_ms for call in self.calls)
+
+    def operations(self) -> Counter:
+        """table.operation -> number of calls"""
+        return Counter(f"{call.table}.{call.operation}" for call in self.calls)
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: DB total, then time and call count per table.operation"""
+        entries = [f'db;dur={self.db_ms:.2f};desc="{self.count} calls"']
+        by_operation: Dict[str, List[float]] = {}
+        for call in self.calls:
+            by_operation.setdefault(f"{call.table}.{call.operation}", []).append(call.duration_ms)
+        for operation, durations in by_operation.items():
+            entries.append(f'db.{operation};dur={sum(durations):.2f};desc="x{len(durations)}"')
+        entries.append(f"app;dur={(time.perf_counter() - self.started) * 1000:.2f}")
+        return ", ".join(entries)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "request": self.name,
+            "status": self.status,
+            "duration_ms": round(self.duration_ms, 2) if self.duration_ms is not None else None,
+            "db_calls": self.count,
+            "db_ms": round(self.db_ms, 2),
+            "calls": [
+                {"table": call.table, "operation": call.operation, "ms": round(call.duration_ms, 2), "rows": call.rows}
+                for call in self.calls
+            ],
+        }
+
+    def assert_round_trips(self, expected: Optional[int] = None, max_calls: Optional[int] = None) -> None:
+        """
+        Pin the DB round trips of this request, e.g. in a test:
+
+            with DbTracer.capture() as traces:
+                client.post("/api/commands", ...)
+            traces[0].assert_round_trips(max_calls=2)
+        """
+        if expected is not None and self.count != expected:
+            raise AssertionError(f"{self.name}: expected {expected} DB calls, made {self.count}\n{self._listing()}")
+        if max_calls is not None and self.count > max_calls:
+            raise AssertionError(f"{self.name}: expected at most {max_calls} DB calls, made {self.count}\n{self._listing()}")
+
+    def _listing(self) -> str:
+        return "\n".join(
+            f"  {i + 1}. {call.table}.{call.operation} ({call.duration_ms:.2f} ms, rows={call.rows})"
+            for i, call in enumerate(self.calls)
+        )
+
+
+_current: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+
+class DbTracer:
+    """
+    Per-request DB call tracing.
+
+    TracingMiddleware starts a RequestTrace for each HTTP request; the
+    storage proxy (app.storage.instrumented) records every repository call
+    into the trace of the request it runs in. Finished traces go to the
+    slow-request log when over slow_request_threshold_ms or
+    slow_request_max_db_calls, and to any active capture() block. The
+    background tasks (NotificationHub, AuditSink, HistoryRetention) start
+    with an empty context, so they are never traced.
+    """
+
+    _captures: List[List[RequestTrace]] = []
+
+    @staticmethod
+    def current() -> Optional[RequestTrace]:
+        return _current.get()
+
+    @staticmethod
+    def record(table: str, operation: str, duration_ms: float, result: Any) -> None:
+        trace = _current.get()
+        # A task that copied the request's context can outlive the request
+        if trace is not None and trace.duration_ms is None:
+            trace.record(table, operation, duration_ms, row_count(result))
+
+    @staticmethod
+    def begin(name: str) -> Any:
+        """Start a trace in the current context; returns a token for end()"""
+        return _current.set(RequestTrace(name))
+
+    @classmethod
+    def end(cls, token: Any, status: Optional[int], threshold_ms: float, max_calls: int) -> RequestTrace:
+        trace = _current.get()
+        _current.reset(token)
+        trace.finish(status)
+        too_slow = trace.duration_ms >= threshold_ms and not trace.streaming
+        if too_slow or trace.count > max_calls:
+            slow_request_logger.warning(json.dumps({"event": "slow_request", **trace.to_dict()}))
+        for captured in cls._captures:
+            captured.append(trace)
+        return trace
+
+    @classmethod
+    @contextmanager
+    def capture(cls) -> Iterator[List[RequestTrace]]:
+        """Collect the traces of every request that finishes inside the block (test mode)"""
+        captured: List[RequestTrace] = []
+        cls._captures.append(captured)
+        try:
+            yield captured
+        finally:
+            cls._captures.remove(captured)
+
+    @staticmethod
+    @contextmanager
+    def trace(name: str = "block") -> Iterator[RequestTrace]:
+        """Trace the DB calls of code running outside a request, e.g. a service call in a test"""
+        trace = RequestTrace(name)
+        token = _current.set(trace)
+        try:
+            yield trace
+        finally:
+            _current.reset(token)
+            trace.finish()
@@ -0,0 +1,127 @@
+import asyncio
+import time
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+
+# Safe to send again after a transport error
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class PooledTransport(httpx.AsyncBaseTransport):
+    """
+    Connection pool shared by the Supabase clients.
+
+    Wraps httpx's transport with the pool limits, keep-alive expiry and
+    HTTP/2 setting from Settings, retries idempotent reads on transport
+    errors, and keeps pool statistics. Pool wait is the time a request
+    spends before it gets a connection (a kept-alive one, or a slot to
+    open a new one).
+    """
+
+    def __init__(
+        self,
+        max_connections: int,
+        max_keepalive_connections: int,
+        keepalive_expiry: float,
+        http2: bool,
+        read_retries: int,
+        retry_backoff: float
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.http2 = http2
+        self.read_retries = read_retries
+        self.retry_backoff = retry_backoff
+        self._transport = httpx.AsyncHTTPTransport(limits=self.limits, http2=http2)
+        self._in_flight = 0
+        self._waiting = 0
+        self._acquired = 0
+        self._stats: Dict[str, Any] = {
+            "requests": 0,
+            "retries": 0,
+            "errors": 0,
+            "connections_opened": 0,
+            "pool_wait_ms_total": 0.0,
+            "pool_wait_ms_max": 0.0,
+        }
+
+    def _tracer(self, outer: Optional[Callable]):
+        """trace extension callback that ends the pool wait on the first
+        connection event, then passes events on to the caller's own (outer)"""
+        started = time.perf_counter()
+        acquired = False
+
+        async def trace(event: str, info: Dict[str, Any]) -> None:
+            nonlocal acquired
+            if event == "connection.connect_tcp.started":
+                self._stats["connections_opened"] += 1
+            if not acquired and (event == "connection.connect_tcp.started" or event.endswith("send_request_headers.started")):
+                acquired = True
+                self._waiting -= 1
+                self._acquired += 1
+                wait_ms = (time.perf_counter() - started) * 1000
+                self._stats["pool_wait_ms_total"] += wait_ms
+                self._stats["pool_wait_ms_max"] = max(self._stats["pool_wait_ms_max"], wait_ms)
+            if outer is not None:
+                result = outer(event, info)
+                if asyncio.iscoroutine(result):
+                    await result
+
+        def done() -> None:
+            if not acquired:
+                self._waiting -= 1
+
+        return trace, done
+
+    async def _send(self, request: httpx.Request, outer: Optional[Callable]) -> httpx.Response:
+        # Replaces the previous attempt's callback rather than wrapping it
+        trace, done = self._tracer(outer)
+        request.extensions = {**request.extensions, "trace": trace}
+        self._waiting += 1
+        try:
+            return await self._transport.handle_async_request(request)
+        finally:
+            done()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        retries = self.read_retries if request.method in IDEMPOTENT_METHODS else 0
+        outer = request.extensions.get("trace")
+        self._stats["requests"] += 1
+        self._in_flight += 1
+        try:
+            for attempt in range(retries + 1):
+                try:
+                    return await self._send(request, outer)
+                except httpx.TransportError:
+                    if attempt == retries:
+                        self._stats["errors"] += 1
+                        raise
+                    self._stats["retries"] += 1
+                    await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+        finally:
+            self._in_flight -= 1
+
+    async def aclose(self) -> None:
+        # Both clients close the shared transport on shutdown; closing twice is harmless
+        await self._transport.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        connections = self._transport._pool.connections
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {
+            **self._stats,
+            "pool_wait_ms_avg": self._stats["pool_wait_ms_total"] / self._acquired if self._acquired else 0.0,
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "connections": len(connections),
+            "in_use": len(connections) - idle,
+            "idle": idle,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "keepalive_expiry_seconds": self.limits.keepalive_expiry,
+            "http2": self.http2,
+        }
@@ -0,0 +1,135 @@
+"""
+Concurrent request throughput of one worker: the previous blocking
+(sync PostgREST client inside async routes) service layer versus the
+async service layer.
+
+Both variants talk to a local stand-in PostgREST server that answers
+after a fixed delay, so the numbers reflect event-loop blocking rather
+than Supabase itself.
+
+Run from backend/:
+    python -m benchmarks.bench_async_throughput [--latency-ms 20] [--requests 200]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+API_KEY = "cgw_bench_key"
+SERVICE_KEY = "bench.service.key"
+
+USER_ROW = {"id": 1, "name": "Bench", "api_key": API_KEY, "role": "member", "credits": 10}
+COMMAND_ROWS = [
+    {
+        "id": i,
+        "user_id": 1,
+        "command_text": "ls -la",
+        "status": "executed",
+        "action": "AUTO_ACCEPT",
+        "result_message": "Mock execution for command: ls -la",
+        "created_at": "2025-01-01T00:00:00+00:00",
+    }
+    for i in range(20)
+]
+
+
+def stand_in_postgrest(latency: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/rest/v1/{table}")
+    async def select(table: str, request: Request):
+        await asyncio.sleep(latency)
+        rows = {"users": [USER_ROW], "commands": COMMAND_ROWS}.get(table, [])
+        return JSONResponse(rows)
+
+    return app
+
+
+def serve_in_thread(app: FastAPI) -> str:
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}"
+
+
+def blocking_app(url: str) -> FastAPI:
+    """The pre-async request path: sync client calls inside an async route"""
+    from supabase import create_client
+
+    client = create_client(url, SERVICE_KEY)
+    app = FastAPI()
+
+    @app.get("/api/commands/history")
+    async def history(request: Request):
+        key = request.headers["x-api-key"]
+        user = client.table("users").select("*").eq("api_key", key).execute().data[0]
+        rows = client.table("commands").select("*").eq("user_id", user["id"]).order("created_at", desc=True).execute()
+        return rows.data
+
+    return app
+
+
+async def drive(app, concurrency: int, total: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+        queue = asyncio.Queue()
+        for _ in range(total):
+            queue.put_nowait(None)
+
+        async def worker():
+            while not queue.empty():
+                queue.get_nowait()
+                response = await client.get("/api/commands/history", headers={"x-api-key": API_KEY})
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        return total / (time.perf_counter() - start)
+
+
+async def run(variants, total: int):
+    results = []
+    for concurrency in (1, 8, 32, 64):
+        row = {"concurrency": concurrency}
+        for name, app in variants.items():
+            row[name] = round(await drive(app, concurrency, total), 1)
+        results.append(row)
+        print(f"concurrency={concurrency:>3}  blocking={row['blocking']:>8} req/s  async={row['async']:>8} req/s")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    url = serve_in_thread(stand_in_postgrest(args.latency_ms / 1000))
+    os.environ["SUPABASE_URL"] = url
+    os.environ["SUPABASE_KEY"] = SERVICE_KEY
+    os.environ["SUPABASE_SERVICE_ROLE_KEY"] = SERVICE_KEY
+
+    import main as gateway
+
+    variants = {"blocking": blocking_app(url), "async": gateway.app}
+    results = asyncio.run(run(variants, args.requests))
+
+    print(json.dumps({"latency_ms": args.latency_ms, "results": results}))
+
+
+if __name__ == "__main__":
+    main()
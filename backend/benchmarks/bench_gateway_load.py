@@ -0,0 +1,298 @@
+"""
+End-to-end load test of the gateway: main:app in-process (lifespan
+included) on the embedded SQLite storage backend, driven by many
+concurrent API keys with a configurable route mix.
+
+Every storage repository call is counted against the route that issued
+it; --db-latency-ms adds a simulated network round trip to each call so
+requests interleave the way they do against a remote database. After the
+run the database is checked for:
+
+- no user with negative credits, and no response reporting one
+- every user's credit loss equals their executed commands (one debit each)
+- exactly one COMMAND_EXECUTED audit row per executed command
+- executed commands in the DB match the executed responses seen
+
+Results (config, per-route throughput and p50/p95/p99 latency, DB calls
+per request, invariants) are printed as JSON, so runs can be compared
+across commits.
+
+Run from backend/:
+    python -m benchmarks.bench_gateway_load [--requests 5000] [--concurrency 64] [--users 50]
+        [--mix submit=70,history=15,audit=5,notifications=10] [--db-latency-ms 0] [--rate-limit]
+        [--output run.json]
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+import httpx
+
+ADMIN_KEY = "cgw_admin_default_key_change_in_production"
+
+COMMANDS = [
+    "ls -la",
+    "git status",
+    "git diff HEAD~1",
+    "cat README.md",
+    "rm -rf /",
+    "docker run nginx",
+    "npm install",
+    "mkfs.ext4 /dev/sda",
+]
+
+# name -> (method, path, admin only)
+ROUTES = {
+    "submit": ("POST", "/api/commands", False),
+    "history": ("GET", "/api/commands/history?limit=20", False),
+    "audit": ("GET", "/api/audit?limit=50", True),
+    "notifications": ("GET", "/api/rules/notifications?unread_only=true&limit=20", True),
+}
+
+# Route of the request currently being handled (the ASGI app runs in the caller's task)
+current_route = contextvars.ContextVar("current_route", default="background")
+db_calls = defaultdict(Counter)
+
+
+class CountingRepository:
+    """Counts (and optionally delays) every async call of a storage repository"""
+
+    def __init__(self, name, repository, latency):
+        self._name = name
+        self._repository = repository
+        self._latency = latency
+
+    def __getattr__(self, attr):
+        method = getattr(self._repository, attr)
+        if not asyncio.iscoroutinefunction(method):
+            return method
+
+        async def call(*args, **kwargs):
+            db_calls[current_route.get()][f"{self._name}.{attr}"] += 1
+            if self._latency:
+                await asyncio.sleep(self._latency)
+            return await method(*args, **kwargs)
+
+        return call
+
+
+def parse_mix(mix: str):
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ROUTES:
+            raise SystemExit(f"unknown route {name!r}, expected one of {', '.join(ROUTES)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+async def seed(storage, users: int, admins: int, credits: int):
+    from app.services import UserService, VotingService
+    from app.models import UserCreate, UserRole
+
+    members = [await UserService.create_user(UserCreate(name=f"member-{i}", role=UserRole.MEMBER, credits=credits)) for i in range(users)]
+    admin_users = [await UserService.create_user(UserCreate(name=f"admin-{i}", role=UserRole.ADMIN, credits=credits)) for i in range(admins)]
+    creator = await storage.users.get_by_api_key(ADMIN_KEY)
+    # Pending rules give the admins unread notifications to poll
+    for i in range(5):
+        await VotingService.create_rule_with_approval(
+            {"pattern": f"^deploy{i}\\s", "action": "AUTO_ACCEPT", "priority": 50 + i, "approval_threshold": 2},
+            creator["id"]
+        )
+    return members, admin_users
+
+
+async def drive(app, plan, concurrency, stats, balances):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://gateway", timeout=None) as client:
+        queue = iter(plan)
+
+        async def worker():
+            for route, api_key, body in queue:
+                method, path, _ = ROUTES[route]
+                token = current_route.set(route)
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, path, headers={"x-api-key": api_key}, json=body)
+                finally:
+                    elapsed = time.perf_counter() - start
+                    current_route.reset(token)
+                entry = stats[route]
+                entry["latencies"].append(elapsed)
+                entry["status"][response.status_code] += 1
+                if route == "submit" and response.status_code == 200:
+                    result = response.json()
+                    balances.append(result["new_balance"])
+                    if result["status"] == "executed":
+                        entry["executed"][api_key] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        return time.perf_counter() - start
+
+
+async def check_invariants(storage, members, admins, credits, stats, balances):
+    db = storage.db
+    users = members + admins
+    ids = [user.id for user in users]
+    marks = ", ".join("?" * len(ids))
+    negative = db.execute(f"SELECT COUNT(*) AS n FROM users WHERE credits < 0 AND id IN ({marks})", ids).fetchone()["n"]
+    executed = {
+        row["user_id"]: row["n"]
+        for row in db.execute(
+            f"SELECT user_id, COUNT(*) AS n FROM commands WHERE status = 'executed' AND user_id IN ({marks}) GROUP BY user_id", ids
+        )
+    }
+    audited = {
+        row["user_id"]: row["n"]
+        for row in db.execute(
+            f"SELECT user_id, COUNT(*) AS n FROM audit_logs WHERE event = 'COMMAND_EXECUTED' AND user_id IN ({marks}) GROUP BY user_id", ids
+        )
+    }
+    final = {row["id"]: row["credits"] for row in db.execute(f"SELECT id, credits FROM users WHERE id IN ({marks})", ids)}
+    seen = stats["submit"]["executed"] if "submit" in stats else Counter()
+
+    debit_mismatch = [user.id for user in users if credits - final[user.id] != executed.get(user.id, 0)]
+    audit_mismatch = [user.id for user in users if audited.get(user.id, 0) != executed.get(user.id, 0)]
+    response_mismatch = [user.id for user in users if seen.get(user.api_key, 0) != executed.get(user.id, 0)]
+    invariants = {
+        "users_with_negative_credits": negative,
+        "negative_balances_returned": sum(1 for balance in balances if balance is not None and balance < 0),
+        "users_debit_mismatch": debit_mismatch,
+        "users_audit_mismatch": audit_mismatch,
+        "users_response_mismatch": response_mismatch,
+        "executed_commands": sum(executed.values()),
+    }
+    invariants["ok"] = not (
+        invariants["users_with_negative_credits"] or invariants["negative_balances_returned"]
+        or debit_mismatch or audit_mismatch or response_mismatch
+    )
+    return invariants
+
+
+async def run(args):
+    from app.services.audit_sink import AuditSink
+    from app.storage import get_storage
+    import main as gateway
+
+    storage = get_storage()
+    for name in ("users", "rules", "commands", "audit", "votes", "notifications"):
+        setattr(storage, name, CountingRepository(name, getattr(storage, name), args.db_latency_ms / 1000))
+
+    rng = random.Random(args.seed)
+    weights = parse_mix(args.mix)
+    stats = defaultdict(lambda: {"latencies": [], "status": Counter(), "executed": Counter()})
+    balances = []
+
+    async with gateway.lifespan(gateway.app):
+        members, admins = await seed(storage, args.users, args.admins, args.credits)
+        names, route_weights = list(weights), list(weights.values())
+        plan = []
+        for _ in range(args.requests):
+            route = rng.choices(names, route_weights)[0]
+            user = rng.choice(admins if ROUTES[route][2] else members + admins)
+            body = {"command_text": rng.choice(COMMANDS)} if route == "submit" else None
+            plan.append((route, user.api_key, body))
+
+        # Warm up caches outside the measurement
+        warmup = defaultdict(lambda: {"latencies": [], "status": Counter(), "executed": Counter()})
+        await drive(gateway.app, [(route, admins[0].api_key, None) for route in names if route != "submit"], 1, warmup, [])
+        db_calls.clear()
+
+        elapsed = await drive(gateway.app, plan, args.concurrency, stats, balances)
+        # Flush queued audit rows before checking them (stop is a no-op on exit)
+        await AuditSink.stop()
+        invariants = await check_invariants(storage, members, admins, args.credits, stats, balances)
+
+    routes = {}
+    for route, entry in sorted(stats.items()):
+        latencies = sorted(entry["latencies"])
+        count = len(latencies)
+        calls = db_calls.get(route, Counter())
+        routes[route] = {
+            "requests": count,
+            "throughput_rps": round(count / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+            "mean_ms": round(sum(latencies) / count * 1000, 3),
+            "status": {str(code): n for code, n in sorted(entry["status"].items())},
+            "db_calls_per_request": round(sum(calls.values()) / count, 3),
+            "db_calls": dict(sorted(calls.items())),
+        }
+
+    all_latencies = sorted(latency for entry in stats.values() for latency in entry["latencies"])
+    return {
+        "commit": git_commit(),
+        "config": vars(args),
+        "elapsed_s": round(elapsed, 3),
+        "total": {
+            "requests": len(all_latencies),
+            "throughput_rps": round(len(all_latencies) / elapsed, 1),
+            "p50_ms": round(percentile(all_latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(all_latencies, 95) * 1000, 3),
+            "p99_ms": round(percentile(all_latencies, 99) * 1000, 3),
+        },
+        "routes": routes,
+        "background_db_calls": dict(sorted(db_calls.get("background", Counter()).items())),
+        "invariants": invariants,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--users", type=int, default=50, help="member API keys")
+    parser.add_argument("--admins", type=int, default=5, help="admin API keys")
+    parser.add_argument("--credits", type=int, default=20, help="starting credits per key (low values exercise NO_CREDITS)")
+    parser.add_argument("--mix", default="submit=70,history=15,audit=5,notifications=10")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="simulated round trip per storage call")
+    parser.add_argument("--sqlite-path", default=":memory:")
+    parser.add_argument("--rate-limit", action="store_true", help="keep the per-key rate limiter on (429s are reported per route)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    args = parser.parse_args()
+
+    os.environ["STORAGE_BACKEND"] = "sqlite"
+    os.environ["SQLITE_PATH"] = args.sqlite_path
+    os.environ["RATE_LIMIT_ENABLED"] = "true" if args.rate_limit else "false"
+    # Keep the run self-contained (no replay of a real spill file)
+    os.environ["AUDIT_SPILL_PATH"] = os.path.join(tempfile.mkdtemp(prefix="gateway-load-"), "audit_spill.jsonl")
+
+    result = asyncio.run(run(args))
+    output = json.dumps(result, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    if not result["invariants"]["ok"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Insert and recent-read latency of the history tables as history grows,
+before and after the retention job moves old months to the archive, on the
+SQLite backend.
+
+For each history length the DB is seeded with that many months of
+audit_logs and commands rows, then commands are processed (one command row
+and one audit row each) and the newest page of /api/audit and of a user's
+/api/commands/history is read. The job then keeps two months hot and the
+same is measured again, plus a page from the middle of the archived range.
+
+Run from backend/:
+    python -m benchmarks.bench_history_retention [--months 3 12 36] [--rows-per-month 20000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+NOW = datetime(2026, 10, 18, tzinfo=timezone.utc)
+USERS = 50
+
+
+def configure(directory: str) -> None:
+    os.environ.update(
+        STORAGE_BACKEND="sqlite",
+        SQLITE_PATH=os.path.join(directory, "gateway.db"),
+        HISTORY_ARCHIVE_DIR=os.path.join(directory, "archive"),
+        HISTORY_RETENTION_MONTHS="2",
+        METRICS_ENABLED="false",
+        DB_TRACE_ENABLED="false",
+        AUDIT_SINK_ENABLED="false",
+    )
+    from app.config import get_settings
+    from app.storage import get_storage
+    get_settings.cache_clear()
+    get_storage.cache_clear()
+
+
+def seed(db, months: int, rows_per_month: int) -> None:
+    from app.storage.sqlite import _timestamp
+    db.executemany(
+        "INSERT INTO users (name, api_key, role, credits, created_at) VALUES (?, ?, 'member', 1000000, ?)",
+        [(f"user{i}", f"cgw_bench_{i}", _timestamp()) for i in range(USERS)]
+    )
+    rnd = random.Random(7)
+    start = NOW - timedelta(days=30 * months)
+    span = (NOW - start).total_seconds()
+    total = months * rows_per_month
+    for chunk in range(0, total, 50000):
+        count = min(50000, total - chunk)
+        times = sorted(_timestamp(start + timedelta(seconds=span * (chunk + i) / total)) for i in range(count))
+        audit, commands = [], []
+        for ts in times:
+            user_id = rnd.randint(2, USERS + 1)
+            audit.append((user_id, "COMMAND_EXECUTED", json.dumps({"command": "ls -la"}), ts))
+            commands.append((user_id, "ls -la", "executed", "AUTO_ACCEPT", "Mock execution for command: ls -la", ts))
+        db.execute("BEGIN")
+        db.executemany("INSERT INTO audit_logs (user_id, event, meta, timestamp) VALUES (?, ?, ?, ?)", audit)
+        db.executemany(
+            "INSERT INTO commands (user_id, command_text, status, action, result_message, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            commands
+        )
+        db.execute("COMMIT")
+
+
+async def timed(fn, repeat: int):
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        await fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.mean(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+async def measure(repeat: int):
+    from app.services import AuditService, CommandService
+    from app.storage import get_storage
+    storage = get_storage()
+
+    async def insert(i):
+        await storage.commands.process(2 + i % USERS, "ls -la", "AUTO_ACCEPT", "Mock execution for command: ls -la")
+
+    async def audit_page(i):
+        await AuditService.get_all_logs(limit=100)
+
+    async def history_page(i):
+        await CommandService.get_commands_page(limit=100, user_id=2 + i % USERS)
+
+    return [await timed(fn, repeat) for fn in (insert, audit_page, history_page)]
+
+
+async def run(months: int, rows_per_month: int, repeat: int) -> None:
+    from app.services import AuditService, HistoryRetention
+    from app.storage import get_storage
+    with tempfile.TemporaryDirectory() as directory:
+        configure(directory)
+        storage = get_storage()
+        seed(storage.db, months, rows_per_month)
+
+        rows = storage.db.execute("SELECT COUNT(*) AS n FROM audit_logs").fetchone()["n"]
+        before = await measure(repeat)
+        start = time.perf_counter()
+        assert await HistoryRetention.run_once(NOW)
+        retention_s = time.perf_counter() - start
+        hot = storage.db.execute("SELECT COUNT(*) AS n FROM audit_logs").fetchone()["n"]
+        after = await measure(repeat)
+
+        middle = NOW - timedelta(days=15 * months)
+        archived_page = await timed(
+            lambda i: AuditService.get_all_logs(limit=100, until=middle - timedelta(hours=i)), repeat
+        )
+        await storage.close()
+
+    print(f"{months} months, {rows:,} audit rows ({hot:,} hot after retention, job {retention_s:.1f}s)")
+    for label, results in (("all hot", before), ("retention", after)):
+        cells = " ".join(f"{mean:8.3f} {p99:8.3f}" for mean, p99 in results)
+        print(f"{label:>12} {cells}")
+    print(f"{'archive page':>12} {archived_page[0]:8.3f} {archived_page[1]:8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--months", type=int, nargs="+", default=[3, 12, 36])
+    parser.add_argument("--rows-per-month", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print("ms per call (mean p99): insert, newest audit page, newest user history page")
+    for months in args.months:
+        asyncio.run(run(months, args.rows_per_month, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
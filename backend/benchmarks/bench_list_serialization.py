@@ -0,0 +1,226 @@
+"""
+List endpoint serialization: the previous path (a pydantic object per row,
+then FastAPI's response_model validation and serialization, then
+JSONResponse) versus ListSerializer (rows straight to JSON bytes), for the
+row shapes of GET /api/audit, /api/users, /api/commands/history and
+/api/rules/pending.
+
+Both paths start from the rows the storage layer returns and end with the
+response body; their JSON is checked to be identical. Throughput and peak
+traced memory are measured in separate runs (tracemalloc slows the code
+it traces).
+
+Run from backend/:
+    python -m benchmarks.bench_list_serialization [--rows 5000] [--repeat 5]
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+
+from app.models import AuditLogResponse, Command, CommandResponse, RuleResponse, UserResponse
+from app.routes.audit import AUDIT_LOGS, router as audit_router
+from app.routes.commands import COMMAND_HISTORY, router as commands_router
+from app.routes.rules import PENDING_RULES, router as rules_router
+from app.routes.users import USERS, router as users_router
+from app.serialization import parse_timestamp
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def timestamp(i: int) -> str:
+    return (START + timedelta(seconds=i)).strftime("%Y-%m-%dT%H:%M:%S.%f+00:00")
+
+
+def audit_rows(count):
+    return [
+        {
+            "id": i, "user_id": i % 50, "user_name": f"user{i % 50}", "event": "COMMAND_EXECUTED",
+            "meta": {"command": f"ls -la /srv/{i}", "rule_id": 5, "balance": i % 20}, "timestamp": timestamp(i)
+        }
+        for i in range(count)
+    ]
+
+
+def user_rows(count):
+    return [
+        {
+            "id": i, "name": f"user{i}", "api_key": f"cgw_{i:040d}", "role": "member" if i % 10 else "admin",
+            "credits": i % 100, "created_at": timestamp(i)
+        }
+        for i in range(count)
+    ]
+
+
+def command_rows(count):
+    return [
+        {
+            "id": i, "user_id": 7, "command_text": f"git log --oneline -n {i}", "status": "executed",
+            "action": "AUTO_ACCEPT", "result_message": f"Mock execution for command: git log --oneline -n {i}",
+            "created_at": timestamp(i)
+        }
+        for i in range(count)
+    ]
+
+
+def rule_rows(count):
+    return [
+        {
+            "id": i, "pattern": rf"^tool{i}\s+(start|stop)", "action": "AUTO_ACCEPT", "priority": i,
+            "description": f"tool {i}", "approval_threshold": 3, "approval_status": "PENDING", "created_by": 1,
+            "created_at": timestamp(i), "approval_count": 1, "rejection_count": 0,
+            "rule_votes": [
+                {"id": i, "rule_id": i, "admin_id": 2, "users": {"name": "adm2"}, "vote": "APPROVE",
+                 "comment": None, "voted_at": timestamp(i)}
+            ]
+        }
+        for i in range(count)
+    ]
+
+
+def format_vote(vote):
+    return {
+        "id": vote["id"], "rule_id": vote["rule_id"], "admin_id": vote["admin_id"],
+        "admin_name": vote["users"]["name"], "vote": vote["vote"], "comment": vote["comment"]
+    }
+
+
+# Previous route bodies, from storage rows to the objects the routes returned
+
+def previous_audit(rows):
+    return [
+        AuditLogResponse(
+            id=log["id"], user_id=log["user_id"], user_name=log.get("user_name", "Unknown"),
+            event=log["event"], meta=log.get("meta", {}), timestamp=log["timestamp"]
+        )
+        for log in rows
+    ]
+
+
+def previous_users(rows):
+    return [
+        UserResponse(id=user["id"], name=user["name"], api_key=user["api_key"], role=user["role"], credits=user["credits"])
+        for user in rows
+    ]
+
+
+def previous_history(rows):
+    commands = [Command(**cmd) for cmd in rows]
+    return [
+        CommandResponse(
+            id=cmd.id, command_text=cmd.command_text, status=cmd.status.value, action=cmd.action,
+            result_message=cmd.result_message, new_balance=None,
+            created_at=cmd.created_at.isoformat() if cmd.created_at else ""
+        )
+        for cmd in commands
+    ]
+
+
+def previous_pending(rows):
+    return [
+        RuleResponse(**{
+            **{key: value for key, value in rule.items() if key != "rule_votes"},
+            "votes": [{**format_vote(vote), "voted_at": vote["voted_at"]} for vote in rule["rule_votes"]]
+        })
+        for rule in rows
+    ]
+
+
+# Fast path: the services' shaping plus the route's serializer
+
+def fast_audit(rows):
+    return AUDIT_LOGS.dumps(rows)
+
+
+def fast_users(rows):
+    return USERS.dumps(rows)
+
+
+def fast_history(rows):
+    shaped = [
+        {**cmd, "new_balance": None, "created_at": parse_timestamp(cmd["created_at"]).isoformat()}
+        for cmd in rows
+    ]
+    return COMMAND_HISTORY.dumps(shaped)
+
+
+def fast_pending(rows):
+    shaped = [
+        {
+            **{key: value for key, value in rule.items() if key != "rule_votes"},
+            "created_at": parse_timestamp(rule["created_at"]),
+            "votes": [{**format_vote(vote), "voted_at": parse_timestamp(vote["voted_at"])} for vote in rule["rule_votes"]]
+        }
+        for rule in rows
+    ]
+    return PENDING_RULES.dumps(shaped)
+
+
+def response_field(router, path):
+    route = next(route for route in router.routes if route.path == path and "GET" in route.methods)
+    return route.secure_cloned_response_field
+
+
+CASES = [
+    ("audit", audit_rows, previous_audit, fast_audit, response_field(audit_router, "/api/audit")),
+    ("users", user_rows, previous_users, fast_users, response_field(users_router, "/api/users")),
+    ("history", command_rows, previous_history, fast_history, response_field(commands_router, "/api/commands/history")),
+    ("pending", rule_rows, previous_pending, fast_pending, response_field(rules_router, "/api/rules/pending")),
+]
+
+
+def previous_body(build, field, rows):
+    """What FastAPI did with the route's return value: validate and
+    serialize it through response_model, then render JSONResponse"""
+    content = asyncio.run(serialize_response(field=field, response_content=build(rows)))
+    return JSONResponse(content).body
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{args.rows} rows per response, best of {args.repeat}")
+    print(f"{'endpoint':>10} {'path':>9} {'rows/s':>12} {'ms':>9} {'peak MiB':>9}")
+    for name, make_rows, previous, fast, field in CASES:
+        rows = make_rows(args.rows)
+        previous_run = lambda: previous_body(previous, field, rows)
+        fast_run = lambda: fast(rows)
+        assert json.loads(previous_run()) == json.loads(fast_run()), name
+
+        results = []
+        for label, run in (("previous", previous_run), ("fast", fast_run)):
+            seconds = best_of(run, args.repeat)
+            peak = peak_memory(run)
+            results.append(seconds)
+            print(f"{name:>10} {label:>9} {args.rows / seconds:12,.0f} {seconds * 1000:9.1f} {peak / 2**20:9.2f}")
+        print(f"{'':>10} {'speedup':>9} {results[0] / results[1]:11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Bulk pattern testing (POST /api/rules/test-pattern) over 10k commands and
+1k rules: the previous per-command path versus the chunked bulk engine,
+in-process and on a process pool.
+
+The per-command baseline only counts regex work: the previous path also
+re-read the rules table for every matching command.
+
+Run from backend/:
+    python -m benchmarks.bench_pattern_test [--commands 10000] [--rules 1000] [--workers N]
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.engine import RuleMatcher
+from app.engine.bulk import evaluate_commands
+
+SEED_PATTERNS = [
+    r":(){ :|:& };:",
+    r"rm\s+-rf\s+/",
+    r"mkfs.",
+    r"git\s+(status|log|diff)",
+    r"^(ls|cat|pwd|echo)",
+]
+
+COMMAND_SHAPES = [
+    "ls -la {n}",
+    "git status",
+    "git log --oneline -n {n}",
+    "npm install package-{n}",
+    "rm -rf /tmp/build-{n}",
+    "tool{n} start --id={n}",
+    "tool{n} restart --id={n}",
+    "docker run image-{n}",
+]
+
+CANDIDATE_PATTERN = r"^(git|tool\d+)\s"
+
+
+def build_rules(count: int):
+    patterns = list(SEED_PATTERNS)
+    i = 0
+    while len(patterns) < count:
+        patterns.append(rf"tool{i}\s+(start|stop)\s+--id=\d+")
+        i += 1
+    return patterns[:count]
+
+
+def build_commands(count: int, rule_count: int):
+    rng = random.Random(7)
+    return [rng.choice(COMMAND_SHAPES).format(n=rng.randrange(rule_count)) for _ in range(count)]
+
+
+def per_command(pattern, compiled, commands):
+    """The previous path: first-match scan for every command the pattern matches"""
+    regex = re.compile(pattern)
+    results = []
+    for command in commands:
+        matches = bool(regex.search(command))
+        current = None
+        if matches:
+            current = next((index for index, rule in enumerate(compiled) if rule.search(command)), None)
+        results.append((matches, current))
+    return results
+
+
+async def bulk(pattern, rules, commands, chunk_size, matcher=None, executor=None, workers=1):
+    results = []
+    async for chunk in evaluate_commands(
+        pattern, rules, commands, chunk_size,
+        key="bench", matcher=matcher, executor=executor, max_in_flight=workers * 2
+    ):
+        results.extend(chunk)
+    return results
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--commands", type=int, default=10000)
+    parser.add_argument("--rules", type=int, default=1000)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    rules = build_rules(args.rules)
+    commands = build_commands(args.commands, args.rules)
+    print(f"{args.commands} commands x {args.rules} rules, chunk {args.chunk_size}, {args.workers} workers")
+
+    # Both paths start from an already compiled ruleset snapshot
+    compiled = [re.compile(p) for p in rules]
+    matcher = RuleMatcher(compiled)
+
+    baseline, baseline_s = timed(lambda: per_command(CANDIDATE_PATTERN, compiled, commands))
+    print(f"{'per-command':>22}: {baseline_s * 1000:9.1f} ms")
+
+    in_process, in_process_s = timed(lambda: asyncio.run(bulk(CANDIDATE_PATTERN, rules, commands, args.chunk_size, matcher)))
+    # The bulk engine also resolves the current rule for non-matching commands
+    assert [r for r, (matches, _) in zip(in_process, baseline) if matches] == [b for b in baseline if b[0]]
+    print(f"{'bulk in-process':>22}: {in_process_s * 1000:9.1f} ms  ({baseline_s / in_process_s:.1f}x)")
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        # Warm the pool so worker start-up is not counted
+        asyncio.run(bulk(CANDIDATE_PATTERN, rules, commands[:args.workers], 1, None, executor, args.workers))
+        pooled, pooled_s = timed(
+            lambda: asyncio.run(bulk(CANDIDATE_PATTERN, rules, commands, args.chunk_size, None, executor, args.workers))
+        )
+    assert pooled == in_process
+    print(f"{'bulk process pool':>22}: {pooled_s * 1000:9.1f} ms  ({baseline_s / pooled_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Compare sequential regex matching with the literal-prefiltered RuleMatcher
+as the number of rules grows.
+
+Run from backend/:
+    python -m benchmarks.bench_rule_matcher
+"""
+import re
+import time
+from app.engine import RuleMatcher
+
+SEED_PATTERNS = [
+    r":(){ :|:& };:",
+    r"rm\s+-rf\s+/",
+    r"mkfs.",
+    r"git\s+(status|log|diff)",
+    r"^(ls|cat|pwd|echo)",
+]
+
+COMMANDS = [
+    "ls -la",
+    "git status",
+    "npm install",          # no rule: the worst case for sequential matching
+    "docker run nginx",
+    "rm -rf /",
+    "terraform apply -auto-approve",
+]
+
+
+def build_patterns(count: int):
+    patterns = list(SEED_PATTERNS)
+    i = 0
+    while len(patterns) < count:
+        patterns.append(rf"tool{i}\s+(start|stop)\s+--id=\d+")
+        i += 1
+    return [re.compile(p) for p in patterns[:count]]
+
+
+def sequential(regexes, text):
+    for index, regex in enumerate(regexes):
+        if regex.search(text):
+            return index
+    return None
+
+
+def bench(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for command in COMMANDS:
+            fn(command)
+    return (time.perf_counter() - start) / (repeat * len(COMMANDS)) * 1e6
+
+
+def main():
+    print(f"{'rules':>7} {'sequential us':>14} {'matcher us':>11} {'speedup':>8}")
+    for count in (10, 100, 1000, 5000):
+        regexes = build_patterns(count)
+        matcher = RuleMatcher(regexes)
+        for command in COMMANDS:
+            assert matcher.match(command) == sequential(regexes, command)
+        repeat = max(20, 20000 // count)
+        seq_us = bench(lambda c: sequential(regexes, c), repeat)
+        matcher_us = bench(matcher.match, repeat)
+        print(f"{count:>7} {seq_us:>14.2f} {matcher_us:>11.2f} {seq_us / matcher_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
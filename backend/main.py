@@ -1,11 +1,39 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from app.config import get_settings
+from app.metrics import CONTENT_TYPE, Metrics
+from app.middleware import MetricsMiddleware, TracingMiddleware, require_admin
 from app.routes import auth_router, users_router, rules_router, commands_router, audit_router
+from app.services import AuditSink, HistoryRetention, NotificationHub, PatternTestService
+from app.services.pagination import NEXT_CURSOR_HEADER
+from app.storage import get_storage
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await AuditSink.start()
+    await Metrics.start()
+    await HistoryRetention.start()
+    yield
+    await HistoryRetention.stop()
+    # Close notification streams
+    await NotificationHub.stop()
+    # Flush buffered audit events before the DB clients go away
+    await AuditSink.stop()
+    PatternTestService.shutdown()
+    # Close DB connections
+    await get_storage().close()
+    # Last snapshot for the other workers
+    await Metrics.stop()
+
 
 app = FastAPI(
     title="Command Gateway API",
     description="API for command gateway system with rule-based command validation",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -15,8 +43,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+if get_settings().db_trace_enabled:
+    app.add_middleware(TracingMiddleware)
+
+# Outermost, so latency includes the other middleware
+if get_settings().metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
 # Register routers
 app.include_router(auth_router)
 app.include_router(users_router)
@@ -39,6 +75,18 @@ async def health():
     return {"status": "healthy"}
 
 
+@app.get("/health/db-pool", dependencies=[Depends(require_admin)])
+async def db_pool_stats():
+    """Storage backend connection stats, e.g. Supabase HTTP pool usage and wait times (admin only)"""
+    return get_storage().stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint (summed over workers with metrics_multiproc_dir)"""
+    return Response(Metrics.render(), media_type=CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,102 @@
+-- Atomic command processing
+-- Run this in your Supabase SQL Editor after 002_voting_system.sql
+--
+-- process_command() records the outcome of one command submission in a single
+-- transaction: conditional credit debit, commands row and audit_logs row.
+-- The rule is matched by the API (which holds the compiled ruleset) and passed in.
+--
+-- p_action: 'AUTO_ACCEPT' | 'AUTO_REJECT' | 'NO_RULE'
+-- Returns: {id, status, action, result_message, new_balance, created_at}
+-- with action = 'NO_CREDITS' when the user has no credits left.
+
+CREATE OR REPLACE FUNCTION process_command(
+    p_user_id BIGINT,
+    p_command_text TEXT,
+    p_action VARCHAR,
+    p_result_message TEXT,
+    p_rule_id BIGINT DEFAULT NULL,
+    p_rule_description TEXT DEFAULT NULL
+) RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_balance INTEGER;
+    v_status VARCHAR(50);
+    v_action VARCHAR(50) := p_action;
+    v_message TEXT := p_result_message;
+    v_event VARCHAR(255);
+    v_meta JSONB;
+    v_command commands%ROWTYPE;
+BEGIN
+    IF p_action = 'AUTO_ACCEPT' THEN
+        -- Conditional debit: concurrent submissions serialize on the row lock
+        -- and can never drive the balance below zero.
+        UPDATE users SET credits = credits - 1
+        WHERE id = p_user_id AND credits > 0
+        RETURNING credits INTO v_balance;
+
+        IF NOT FOUND THEN
+            SELECT credits INTO v_balance FROM users WHERE id = p_user_id;
+            IF NOT FOUND THEN
+                RAISE EXCEPTION 'User not found';
+            END IF;
+            v_action := 'NO_CREDITS';
+        END IF;
+    ELSE
+        SELECT credits INTO v_balance FROM users WHERE id = p_user_id;
+        IF NOT FOUND THEN
+            RAISE EXCEPTION 'User not found';
+        END IF;
+        IF v_balance <= 0 THEN
+            v_action := 'NO_CREDITS';
+        END IF;
+    END IF;
+
+    IF v_action = 'NO_CREDITS' THEN
+        v_status := 'rejected';
+        v_message := 'Insufficient credits';
+        v_event := 'COMMAND_REJECTED';
+        v_meta := jsonb_build_object('command', p_command_text, 'reason', 'No credits');
+    ELSIF v_action = 'NO_RULE' THEN
+        v_status := 'rejected';
+        v_event := 'COMMAND_REJECTED';
+        v_meta := jsonb_build_object('command', p_command_text, 'reason', 'No matching rule');
+    ELSIF v_action = 'AUTO_REJECT' THEN
+        v_status := 'rejected';
+        v_event := 'COMMAND_REJECTED';
+        v_meta := jsonb_build_object(
+            'command', p_command_text,
+            'rule_id', p_rule_id,
+            'rule_description', p_rule_description
+        );
+    ELSE
+        v_status := 'executed';
+        v_event := 'COMMAND_EXECUTED';
+        v_meta := jsonb_build_object(
+            'command', p_command_text,
+            'rule_id', p_rule_id,
+            'rule_description', p_rule_description,
+            'credits_remaining', v_balance
+        );
+    END IF;
+
+    INSERT INTO commands (user_id, command_text, status, action, result_message)
+    VALUES (p_user_id, p_command_text, v_status, v_action, v_message)
+    RETURNING * INTO v_command;
+
+    INSERT INTO audit_logs (user_id, event, meta)
+    VALUES (p_user_id, v_event, v_meta);
+
+    RETURN jsonb_build_object(
+        'id', v_command.id,
+        'status', v_status,
+        'action', v_action,
+        'result_message', v_message,
+        'new_balance', v_balance,
+        'created_at', v_command.created_at
+    );
+END;
+$$;
+
+-- Let PostgREST pick up the new function
+NOTIFY pgrst, 'reload schema';
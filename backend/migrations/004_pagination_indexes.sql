@@ -0,0 +1,26 @@
+-- Composite indexes for keyset (cursor) pagination and list filters
+-- Run this in your Supabase SQL Editor after 003_process_command.sql
+--
+-- List endpoints order by (timestamp|created_at DESC, id DESC) and continue
+-- after the last (timestamp, id) seen, so each page is an index range scan.
+
+-- /api/commands/history: per-user, optional status filter
+CREATE INDEX IF NOT EXISTS idx_commands_user_created_id ON commands(user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_commands_user_status_created_id ON commands(user_id, status, created_at DESC, id DESC);
+
+-- /api/audit: unfiltered, by user, by event type
+CREATE INDEX IF NOT EXISTS idx_audit_logs_timestamp_id ON audit_logs(timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_audit_logs_user_timestamp_id ON audit_logs(user_id, timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_audit_logs_event_timestamp_id ON audit_logs(event, timestamp DESC, id DESC);
+
+-- /api/rules/notifications: per-admin, optional unread filter
+CREATE INDEX IF NOT EXISTS idx_rule_notifications_admin_created_id ON rule_notifications(admin_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_rule_notifications_admin_unread_created_id ON rule_notifications(admin_id, is_read, created_at DESC, id DESC);
+
+-- /api/users?role=
+CREATE INDEX IF NOT EXISTS idx_users_role_id ON users(role, id);
+
+-- Superseded by the composite indexes above
+DROP INDEX IF EXISTS idx_commands_user_id;
+DROP INDEX IF EXISTS idx_commands_created_at;
+DROP INDEX IF EXISTS idx_audit_logs_timestamp;
@@ -0,0 +1,127 @@
+-- Batch command processing
+-- Run this in your Supabase SQL Editor after 004_pagination_indexes.sql
+--
+-- process_command_batch() records a whole batch of already-matched commands
+-- in one transaction. Commands are handled in order: AUTO_ACCEPT spends one
+-- credit; once the balance reaches zero every remaining command is rejected
+-- with NO_CREDITS (the same rule process_command applies to a single command).
+-- The credit change is one UPDATE; commands and audit_logs rows are each one
+-- multi-row INSERT.
+--
+-- p_commands: [{command_text, action, result_message, rule_id, rule_description}, ...]
+--             action: 'AUTO_ACCEPT' | 'AUTO_REJECT' | 'NO_RULE'
+-- Returns: [{id, command_text, status, action, result_message, new_balance, created_at}, ...]
+--          in input order
+
+CREATE OR REPLACE FUNCTION process_command_batch(
+    p_user_id BIGINT,
+    p_commands JSONB
+) RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_balance INTEGER;
+    v_now TIMESTAMP WITH TIME ZONE := NOW();
+    v_item JSONB;
+    v_ord BIGINT;
+    v_id BIGINT;
+    v_status VARCHAR(50);
+    v_action VARCHAR(50);
+    v_message TEXT;
+    v_event VARCHAR(255);
+    v_meta JSONB;
+    v_rows JSONB := '[]'::jsonb;
+BEGIN
+    -- Lock the user row: concurrent batches and single commands serialize here
+    SELECT credits INTO v_balance FROM users WHERE id = p_user_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'User not found';
+    END IF;
+
+    FOR v_item, v_ord IN
+        SELECT value, ordinality FROM jsonb_array_elements(p_commands) WITH ORDINALITY ORDER BY ordinality
+    LOOP
+        v_action := v_item->>'action';
+        v_message := v_item->>'result_message';
+
+        IF v_balance <= 0 THEN
+            v_action := 'NO_CREDITS';
+            v_status := 'rejected';
+            v_message := 'Insufficient credits';
+            v_event := 'COMMAND_REJECTED';
+            v_meta := jsonb_build_object('command', v_item->>'command_text', 'reason', 'No credits');
+        ELSIF v_action = 'NO_RULE' THEN
+            v_status := 'rejected';
+            v_event := 'COMMAND_REJECTED';
+            v_meta := jsonb_build_object('command', v_item->>'command_text', 'reason', 'No matching rule');
+        ELSIF v_action = 'AUTO_REJECT' THEN
+            v_status := 'rejected';
+            v_event := 'COMMAND_REJECTED';
+            v_meta := jsonb_build_object(
+                'command', v_item->>'command_text',
+                'rule_id', v_item->'rule_id',
+                'rule_description', v_item->'rule_description'
+            );
+        ELSE
+            v_balance := v_balance - 1;
+            v_status := 'executed';
+            v_event := 'COMMAND_EXECUTED';
+            v_meta := jsonb_build_object(
+                'command', v_item->>'command_text',
+                'rule_id', v_item->'rule_id',
+                'rule_description', v_item->'rule_description',
+                'credits_remaining', v_balance
+            );
+        END IF;
+
+        -- Pre-allocate the id so results can be returned in input order
+        v_id := nextval(pg_get_serial_sequence('commands', 'id'));
+
+        v_rows := v_rows || jsonb_build_array(jsonb_build_object(
+            'ord', v_ord,
+            'id', v_id,
+            'command_text', v_item->>'command_text',
+            'status', v_status,
+            'action', v_action,
+            'result_message', v_message,
+            'new_balance', v_balance,
+            'event', v_event,
+            'meta', v_meta
+        ));
+    END LOOP;
+
+    UPDATE users SET credits = v_balance WHERE id = p_user_id;
+
+    INSERT INTO commands (id, user_id, command_text, status, action, result_message, created_at)
+    SELECT r.id, p_user_id, r.command_text, r.status, r.action, r.result_message, v_now
+    FROM jsonb_to_recordset(v_rows) AS r(
+        id BIGINT, command_text TEXT, status VARCHAR(50), action VARCHAR(50), result_message TEXT
+    );
+
+    INSERT INTO audit_logs (user_id, event, meta, timestamp)
+    SELECT p_user_id, r.event, r.meta, v_now
+    FROM jsonb_to_recordset(v_rows) AS r(ord BIGINT, event VARCHAR(255), meta JSONB)
+    ORDER BY r.ord;
+
+    RETURN COALESCE((
+        SELECT jsonb_agg(
+            jsonb_build_object(
+                'id', r.id,
+                'command_text', r.command_text,
+                'status', r.status,
+                'action', r.action,
+                'result_message', r.result_message,
+                'new_balance', r.new_balance,
+                'created_at', v_now
+            ) ORDER BY r.ord
+        )
+        FROM jsonb_to_recordset(v_rows) AS r(
+            ord BIGINT, id BIGINT, command_text TEXT, status VARCHAR(50), action VARCHAR(50),
+            result_message TEXT, new_balance INTEGER
+        )
+    ), '[]'::jsonb);
+END;
+$$;
+
+-- Let PostgREST pick up the new function
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,12 @@
+-- Registered test-command corpus for conflict detection
+-- Run this in your Supabase SQL Editor after 005_process_command_batch.sql
+--
+-- /api/rules/check-conflicts tests new patterns against the built-in test
+-- commands plus every command registered here (POST /api/rules/test-commands).
+
+CREATE TABLE IF NOT EXISTS rule_test_commands (
+    id BIGSERIAL PRIMARY KEY,
+    command_text TEXT UNIQUE NOT NULL,
+    created_by BIGINT REFERENCES users(id) ON DELETE SET NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
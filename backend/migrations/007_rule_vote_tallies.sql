@@ -0,0 +1,49 @@
+-- Maintained vote tallies on rules
+-- Run this in your Supabase SQL Editor after 006_rule_test_commands.sql
+--
+-- approval_count / rejection_count are kept in step with rule_votes by a
+-- trigger, so listing pending rules no longer counts votes per rule.
+
+ALTER TABLE rules ADD COLUMN IF NOT EXISTS approval_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE rules ADD COLUMN IF NOT EXISTS rejection_count INTEGER NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION rule_votes_tally() RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE rules SET
+            approval_count = approval_count - (OLD.vote = 'APPROVE')::int,
+            rejection_count = rejection_count - (OLD.vote = 'REJECT')::int
+        WHERE id = OLD.rule_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE rules SET
+            approval_count = approval_count + (NEW.vote = 'APPROVE')::int,
+            rejection_count = rejection_count + (NEW.vote = 'REJECT')::int
+        WHERE id = NEW.rule_id;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_rule_votes_tally ON rule_votes;
+CREATE TRIGGER trg_rule_votes_tally
+    AFTER INSERT OR DELETE OR UPDATE OF vote, rule_id ON rule_votes
+    FOR EACH ROW EXECUTE FUNCTION rule_votes_tally();
+
+-- Backfill tallies for votes cast before this migration
+UPDATE rules r SET
+    approval_count = t.approvals,
+    rejection_count = t.rejections
+FROM (
+    SELECT rule_id,
+           COUNT(*) FILTER (WHERE vote = 'APPROVE') AS approvals,
+           COUNT(*) FILTER (WHERE vote = 'REJECT') AS rejections
+    FROM rule_votes
+    GROUP BY rule_id
+) t
+WHERE r.id = t.rule_id;
+
+-- /api/rules/pending
+CREATE INDEX IF NOT EXISTS idx_rules_status_created ON rules(approval_status, created_at DESC);
@@ -0,0 +1,74 @@
+-- Maintained unread notification counters
+-- Run this in your Supabase SQL Editor after 007_rule_vote_tallies.sql
+--
+-- rule_notification_counters holds each admin's unread count, kept in step
+-- with rule_notifications by statement-level triggers, so the unread badge
+-- is a primary-key read and "mark all read" (one UPDATE) adjusts the
+-- counter once per statement rather than once per row.
+
+CREATE TABLE IF NOT EXISTS rule_notification_counters (
+    admin_id BIGINT PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    unread_count INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION rule_notifications_unread_tally() RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO rule_notification_counters (admin_id, unread_count)
+        SELECT admin_id, COUNT(*) FROM new_rows
+        WHERE NOT COALESCE(is_read, FALSE)
+        GROUP BY admin_id
+        ON CONFLICT (admin_id) DO UPDATE
+            SET unread_count = rule_notification_counters.unread_count + EXCLUDED.unread_count;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE rule_notification_counters c
+        SET unread_count = c.unread_count - d.n
+        FROM (
+            SELECT admin_id, COUNT(*) AS n FROM old_rows
+            WHERE NOT COALESCE(is_read, FALSE)
+            GROUP BY admin_id
+        ) d
+        WHERE c.admin_id = d.admin_id;
+    ELSE
+        INSERT INTO rule_notification_counters (admin_id, unread_count)
+        SELECT admin_id, SUM(delta) FROM (
+            SELECT admin_id, -1 AS delta FROM old_rows WHERE NOT COALESCE(is_read, FALSE)
+            UNION ALL
+            SELECT admin_id, 1 AS delta FROM new_rows WHERE NOT COALESCE(is_read, FALSE)
+        ) d
+        GROUP BY admin_id
+        HAVING SUM(delta) <> 0
+        ON CONFLICT (admin_id) DO UPDATE
+            SET unread_count = rule_notification_counters.unread_count + EXCLUDED.unread_count;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+-- Transition tables allow only one event per trigger
+DROP TRIGGER IF EXISTS trg_rule_notifications_unread_insert ON rule_notifications;
+CREATE TRIGGER trg_rule_notifications_unread_insert
+    AFTER INSERT ON rule_notifications
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rule_notifications_unread_tally();
+
+DROP TRIGGER IF EXISTS trg_rule_notifications_unread_update ON rule_notifications;
+CREATE TRIGGER trg_rule_notifications_unread_update
+    AFTER UPDATE ON rule_notifications
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rule_notifications_unread_tally();
+
+DROP TRIGGER IF EXISTS trg_rule_notifications_unread_delete ON rule_notifications;
+CREATE TRIGGER trg_rule_notifications_unread_delete
+    AFTER DELETE ON rule_notifications
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rule_notifications_unread_tally();
+
+-- Backfill counters for existing notifications
+INSERT INTO rule_notification_counters (admin_id, unread_count)
+SELECT admin_id, COUNT(*) FROM rule_notifications
+WHERE NOT COALESCE(is_read, FALSE)
+GROUP BY admin_id
+ON CONFLICT (admin_id) DO UPDATE SET unread_count = EXCLUDED.unread_count;
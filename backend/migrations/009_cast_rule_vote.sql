@@ -0,0 +1,87 @@
+-- Atomic vote casting
+-- Run this in your Supabase SQL Editor after 008_notification_counters.sql
+--
+-- cast_rule_vote() records one admin's vote in a single transaction: vote
+-- row, tallies (kept by the 007 trigger), the status change when the
+-- threshold is reached and the decision notifications. The rule row is
+-- locked first so concurrent voters on the same rule are serialized and
+-- exactly one of them reaches the decision. A repeated vote is rejected by
+-- UNIQUE(rule_id, admin_id) rather than a separate lookup.
+--
+-- Raises (SQLSTATE P0001): 'Rule not found', 'Rule is already <status>',
+-- 'You have already voted on this rule'.
+-- Returns: {rule_id, your_vote, approve_count, reject_count, threshold,
+--           new_status, decision_reached}
+
+CREATE OR REPLACE FUNCTION cast_rule_vote(
+    p_rule_id BIGINT,
+    p_admin_id BIGINT,
+    p_vote VARCHAR,
+    p_comment TEXT DEFAULT NULL
+) RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_rule rules%ROWTYPE;
+    v_approve INTEGER;
+    v_reject INTEGER;
+    v_status VARCHAR(20);
+    v_decision TEXT;
+    v_decision_count INTEGER;
+BEGIN
+    SELECT * INTO v_rule FROM rules WHERE id = p_rule_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Rule not found';
+    END IF;
+    IF v_rule.approval_status <> 'PENDING' THEN
+        RAISE EXCEPTION 'Rule is already %', v_rule.approval_status;
+    END IF;
+
+    BEGIN
+        INSERT INTO rule_votes (rule_id, admin_id, vote, comment)
+        VALUES (p_rule_id, p_admin_id, p_vote, p_comment);
+    EXCEPTION WHEN unique_violation THEN
+        RAISE EXCEPTION 'You have already voted on this rule';
+    END;
+
+    -- Tallies as updated by trg_rule_votes_tally
+    SELECT approval_count, rejection_count INTO v_approve, v_reject
+    FROM rules WHERE id = p_rule_id;
+
+    IF v_approve >= v_rule.approval_threshold THEN
+        v_status := 'ACTIVE';
+        v_decision := 'approved';
+        v_decision_count := v_approve;
+    ELSIF v_reject >= v_rule.approval_threshold THEN
+        v_status := 'REJECTED';
+        v_decision := 'rejected';
+        v_decision_count := v_reject;
+    END IF;
+
+    IF v_status IS NOT NULL THEN
+        UPDATE rules SET approval_status = v_status WHERE id = p_rule_id;
+
+        -- Everyone who voted, plus the creator
+        INSERT INTO rule_notifications (rule_id, admin_id, message)
+        SELECT p_rule_id, admin_id,
+               format('Rule ''%s'' has been %s with %s votes', v_rule.pattern, v_decision, v_decision_count)
+        FROM (
+            SELECT admin_id FROM rule_votes WHERE rule_id = p_rule_id
+            UNION
+            SELECT v_rule.created_by WHERE v_rule.created_by IS NOT NULL
+        ) recipients;
+    END IF;
+
+    RETURN jsonb_build_object(
+        'rule_id', p_rule_id,
+        'your_vote', p_vote,
+        'approve_count', v_approve,
+        'reject_count', v_reject,
+        'threshold', v_rule.approval_threshold,
+        'new_status', COALESCE(v_status, 'PENDING'),
+        'decision_reached', v_status IS NOT NULL
+    );
+END;
+$$;
+
+NOTIFY pgrst, 'reload schema';
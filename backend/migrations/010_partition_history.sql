@@ -0,0 +1,272 @@
+-- Monthly partitions for audit_logs and commands, with retention helpers
+-- Run this in your Supabase SQL Editor after 009_cast_rule_vote.sql
+--
+-- Both tables only ever grow. Range-partitioning them by month keeps each
+-- index to one month of rows: recent pages touch the newest partitions
+-- only, and old months are removed by detaching a partition instead of a
+-- DELETE that bloats the indexes.
+--
+-- The retention job (app/services/history_retention.py) calls:
+--   ensure_history_partitions(table, months_ahead) - create this month's
+--     and the next months' partitions before rows arrive
+--   history_partitions(table)     - partitions (attached or detached) by month
+--   read_history_partition(table, month, after_id, limit) - a month's rows
+--     in id order, shaped like the API reads them, to copy into the archive
+--   detach_history_partition(table, month)  - take an archived month out
+--   drop_history_partition(table, month)    - and drop it
+-- Rows outside every monthly partition land in the DEFAULT partition; they
+-- are never archived, so create partitions ahead of time. These functions
+-- can only be called by service_role, the key the API's admin client uses.
+--
+-- Existing rows are copied into the new tables. ids keep their sequences,
+-- so process_command() and process_command_batch() work unchanged. The
+-- primary keys include the partition column, as PostgreSQL requires.
+
+BEGIN;
+
+-- Writers wait until the copy is done
+LOCK TABLE audit_logs, commands IN ACCESS EXCLUSIVE MODE;
+
+ALTER TABLE audit_logs RENAME TO audit_logs_unpartitioned;
+ALTER TABLE commands RENAME TO commands_unpartitioned;
+ALTER INDEX IF EXISTS audit_logs_pkey RENAME TO audit_logs_unpartitioned_pkey;
+ALTER INDEX IF EXISTS commands_pkey RENAME TO commands_unpartitioned_pkey;
+DROP INDEX IF EXISTS idx_audit_logs_timestamp_id;
+DROP INDEX IF EXISTS idx_audit_logs_user_timestamp_id;
+DROP INDEX IF EXISTS idx_audit_logs_event_timestamp_id;
+DROP INDEX IF EXISTS idx_commands_user_created_id;
+DROP INDEX IF EXISTS idx_commands_user_status_created_id;
+
+CREATE TABLE audit_logs (
+    id BIGINT NOT NULL DEFAULT nextval('audit_logs_id_seq'),
+    user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    event VARCHAR(255) NOT NULL,
+    meta JSONB,
+    timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+CREATE TABLE commands (
+    id BIGINT NOT NULL DEFAULT nextval('commands_id_seq'),
+    user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    command_text TEXT NOT NULL,
+    status VARCHAR(50) NOT NULL CHECK (status IN ('executed', 'rejected')),
+    action VARCHAR(50),
+    result_message TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id;
+ALTER SEQUENCE commands_id_seq OWNED BY commands.id;
+
+CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT;
+CREATE TABLE commands_default PARTITION OF commands DEFAULT;
+
+-- Partitioned indexes (as in 004), created on every partition, plus
+-- (created_at, id) for the all-users command export, which pages by it
+CREATE INDEX idx_audit_logs_timestamp_id ON audit_logs(timestamp DESC, id DESC);
+CREATE INDEX idx_audit_logs_user_timestamp_id ON audit_logs(user_id, timestamp DESC, id DESC);
+CREATE INDEX idx_audit_logs_event_timestamp_id ON audit_logs(event, timestamp DESC, id DESC);
+CREATE INDEX idx_commands_created_id ON commands(created_at DESC, id DESC);
+CREATE INDEX idx_commands_user_created_id ON commands(user_id, created_at DESC, id DESC);
+CREATE INDEX idx_commands_user_status_created_id ON commands(user_id, status, created_at DESC, id DESC);
+
+-- The partition column of each history table
+CREATE OR REPLACE FUNCTION history_partition_column(p_table TEXT) RETURNS TEXT
+LANGUAGE sql IMMUTABLE
+AS $$
+    SELECT CASE p_table WHEN 'audit_logs' THEN 'timestamp' WHEN 'commands' THEN 'created_at' END
+$$;
+
+-- p_month: 'YYYY-MM'. Partition tables are named <table>_pYYYYMM.
+CREATE OR REPLACE FUNCTION history_partition_name(p_table TEXT, p_month TEXT) RETURNS TEXT
+LANGUAGE plpgsql IMMUTABLE
+AS $$
+BEGIN
+    IF history_partition_column(p_table) IS NULL THEN
+        RAISE EXCEPTION 'Unknown history table %', p_table;
+    END IF;
+    IF p_month !~ '^\d{4}-\d{2}$' THEN
+        RAISE EXCEPTION 'Invalid month %', p_month;
+    END IF;
+    RETURN p_table || '_p' || replace(p_month, '-', '');
+END;
+$$;
+
+-- Create the partitions from p_from's month through p_months_ahead months
+-- after the current one. Rows already in the DEFAULT partition for a new
+-- month are moved into it. Returns the months created ('YYYY-MM').
+CREATE OR REPLACE FUNCTION ensure_history_partitions(
+    p_table TEXT,
+    p_months_ahead INTEGER DEFAULT 2,
+    p_from TIMESTAMPTZ DEFAULT NULL
+) RETURNS TEXT[]
+LANGUAGE plpgsql
+SECURITY DEFINER SET search_path = public
+AS $$
+DECLARE
+    v_created TEXT[] := '{}';
+    v_column TEXT := history_partition_column(p_table);
+    v_month DATE := date_trunc('month', COALESCE(p_from, NOW()) AT TIME ZONE 'UTC')::DATE;
+    v_last DATE := (date_trunc('month', NOW() AT TIME ZONE 'UTC') + make_interval(months => p_months_ahead))::DATE;
+    v_name TEXT;
+    v_default TEXT := p_table || '_default';
+    v_start TIMESTAMPTZ;
+    v_end TIMESTAMPTZ;
+BEGIN
+    WHILE v_month <= v_last LOOP
+        v_name := history_partition_name(p_table, to_char(v_month, 'YYYY-MM'));
+        v_start := v_month::TIMESTAMP AT TIME ZONE 'UTC';
+        v_end := (v_month + INTERVAL '1 month')::TIMESTAMP AT TIME ZONE 'UTC';
+        IF to_regclass(v_name) IS NULL THEN
+            -- A new range may not overlap rows already in DEFAULT: move them
+            -- out, attach, and put them back through the parent
+            EXECUTE format('CREATE TEMP TABLE history_moved (LIKE %I) ON COMMIT DROP', p_table);
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM %I WHERE %I >= %L AND %I < %L RETURNING *) '
+                'INSERT INTO history_moved SELECT * FROM moved',
+                v_default, v_column, v_start, v_column, v_end
+            );
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                v_name, p_table, v_start, v_end
+            );
+            EXECUTE format('INSERT INTO %I SELECT * FROM history_moved', p_table);
+            DROP TABLE history_moved;
+            v_created := v_created || to_char(v_month, 'YYYY-MM');
+        END IF;
+        v_month := (v_month + INTERVAL '1 month')::DATE;
+    END LOOP;
+    RETURN v_created;
+END;
+$$;
+
+-- Monthly partitions of a history table, oldest first, attached or not
+CREATE OR REPLACE FUNCTION history_partitions(p_table TEXT)
+RETURNS TABLE (month TEXT, partition_name TEXT, attached BOOLEAN)
+LANGUAGE sql STABLE
+AS $$
+    SELECT
+        substr(c.relname, length(p_table) + 3, 4) || '-' || substr(c.relname, length(p_table) + 7, 2),
+        c.relname::TEXT,
+        EXISTS (SELECT 1 FROM pg_inherits i WHERE i.inhrelid = c.oid)
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace AND n.nspname = current_schema()
+    WHERE c.relkind = 'r' AND c.relname ~ ('^' || p_table || '_p\d{6}$')
+    ORDER BY c.relname
+$$;
+
+CREATE OR REPLACE FUNCTION detach_history_partition(p_table TEXT, p_month TEXT) RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER SET search_path = public
+AS $$
+DECLARE
+    v_name TEXT := history_partition_name(p_table, p_month);
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_inherits i
+        WHERE i.inhrelid = to_regclass(v_name) AND i.inhparent = to_regclass(p_table)
+    ) THEN
+        EXECUTE format('ALTER TABLE %I DETACH PARTITION %I', p_table, v_name);
+    END IF;
+END;
+$$;
+
+-- Rows of a month with id > p_after_id, in id order, as a JSON array shaped
+-- like the API reads them (audit rows embed users: {name}). Works on
+-- attached and detached partitions.
+CREATE OR REPLACE FUNCTION read_history_partition(
+    p_table TEXT,
+    p_month TEXT,
+    p_after_id BIGINT,
+    p_limit INTEGER
+) RETURNS JSONB
+LANGUAGE plpgsql STABLE
+SECURITY DEFINER SET search_path = public
+AS $$
+DECLARE
+    v_name TEXT := history_partition_name(p_table, p_month);
+    v_rows JSONB;
+BEGIN
+    IF to_regclass(v_name) IS NULL THEN
+        RETURN '[]'::JSONB;
+    END IF;
+    IF p_table = 'audit_logs' THEN
+        EXECUTE format(
+            'SELECT jsonb_agg(r ORDER BY (r->>''id'')::BIGINT) FROM ('
+            '  SELECT to_jsonb(t) || jsonb_build_object(''users'', CASE WHEN u.id IS NULL THEN NULL ELSE jsonb_build_object(''name'', u.name) END) AS r'
+            '  FROM %I t LEFT JOIN users u ON u.id = t.user_id WHERE t.id > $1 ORDER BY t.id LIMIT $2'
+            ') s',
+            v_name
+        ) INTO v_rows USING p_after_id, p_limit;
+    ELSE
+        EXECUTE format(
+            'SELECT jsonb_agg(r ORDER BY (r->>''id'')::BIGINT) FROM ('
+            '  SELECT to_jsonb(t) AS r FROM %I t WHERE t.id > $1 ORDER BY t.id LIMIT $2'
+            ') s',
+            v_name
+        ) INTO v_rows USING p_after_id, p_limit;
+    END IF;
+    RETURN COALESCE(v_rows, '[]'::JSONB);
+END;
+$$;
+
+-- Drops only detached partitions, so an archived month can't be dropped
+-- while queries still see it
+CREATE OR REPLACE FUNCTION drop_history_partition(p_table TEXT, p_month TEXT) RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER SET search_path = public
+AS $$
+DECLARE
+    v_name TEXT := history_partition_name(p_table, p_month);
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_inherits i WHERE i.inhrelid = to_regclass(v_name)) THEN
+        RAISE EXCEPTION 'Partition % is still attached', v_name;
+    END IF;
+    EXECUTE format('DROP TABLE IF EXISTS %I', v_name);
+END;
+$$;
+
+-- The DDL needs the tables' owner, so the functions above run as the
+-- migration's role (SECURITY DEFINER, with a fixed search_path). Only the
+-- API's service role may call them: PostgREST exposes functions to anon
+-- and authenticated otherwise, and read_history_partition returns rows
+-- the API only shows to admins.
+DO $$
+DECLARE
+    v_function TEXT;
+BEGIN
+    FOREACH v_function IN ARRAY ARRAY[
+        'ensure_history_partitions(TEXT, INTEGER, TIMESTAMPTZ)',
+        'history_partitions(TEXT)',
+        'read_history_partition(TEXT, TEXT, BIGINT, INTEGER)',
+        'detach_history_partition(TEXT, TEXT)',
+        'drop_history_partition(TEXT, TEXT)'
+    ] LOOP
+        EXECUTE format('REVOKE EXECUTE ON FUNCTION %s FROM PUBLIC', v_function);
+        -- Supabase roles; absent on a plain PostgreSQL
+        IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+            EXECUTE format('REVOKE EXECUTE ON FUNCTION %s FROM anon, authenticated', v_function);
+        END IF;
+        IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN
+            EXECUTE format('GRANT EXECUTE ON FUNCTION %s TO service_role', v_function);
+        END IF;
+    END LOOP;
+END;
+$$;
+
+-- Partitions for the months already in the tables, then the copy
+SELECT ensure_history_partitions('audit_logs', 2, (SELECT MIN(timestamp) FROM audit_logs_unpartitioned));
+SELECT ensure_history_partitions('commands', 2, (SELECT MIN(created_at) FROM commands_unpartitioned));
+
+INSERT INTO audit_logs (id, user_id, event, meta, timestamp)
+SELECT id, user_id, event, meta, COALESCE(timestamp, NOW()) FROM audit_logs_unpartitioned;
+
+INSERT INTO commands (id, user_id, command_text, status, action, result_message, created_at)
+SELECT id, user_id, command_text, status, action, result_message, COALESCE(created_at, NOW()) FROM commands_unpartitioned;
+
+DROP TABLE audit_logs_unpartitioned;
+DROP TABLE commands_unpartitioned;
+
+COMMIT;
@@ -0,0 +1,37 @@
+import os
+import sys
+import tempfile
+
+# Tests run on the embedded SQLite backend; set before app.config is read
+_scratch = tempfile.mkdtemp(prefix="gateway-tests-")
+os.environ.update(
+    STORAGE_BACKEND="sqlite",
+    SQLITE_PATH=":memory:",
+    AUDIT_SPILL_PATH=os.path.join(_scratch, "audit_spill.jsonl"),
+    HISTORY_ARCHIVE_DIR=os.path.join(_scratch, "history_archive"),
+    HISTORY_RETENTION_INTERVAL_SECONDS="0",
+    RATE_LIMIT_ENABLED="false",
+)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+ADMIN_KEY = "cgw_admin_default_key_change_in_production"
+
+
+@pytest.fixture(scope="module")
+def client():
+    """The app on a fresh in-memory database, as the seeded admin"""
+    from fastapi.testclient import TestClient
+    import main
+    from app.middleware import AuthCache
+    from app.services import DecisionCache, RulesetCache
+    from app.storage import get_storage
+
+    get_storage.cache_clear()
+    AuthCache.clear()
+    RulesetCache.invalidate()
+    DecisionCache.clear()
+    with TestClient(main.app) as client:
+        client.headers["x-api-key"] = ADMIN_KEY
+        yield client
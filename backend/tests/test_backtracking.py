@@ -0,0 +1,50 @@
+"""
+Rule patterns that backtrack badly must not be creatable: a running search
+can't be interrupted, so one long command would hold the worker.
+"""
+import time
+
+import pytest
+
+from app.config import get_settings
+
+SLOW_PATTERNS = [
+    # Polynomial: cubic in the command length
+    "\\s*\\s*\\s*x",
+    "a*a*a*b",
+    # Exponential
+    "(a+)+$",
+]
+
+
+@pytest.mark.parametrize("pattern", SLOW_PATTERNS)
+def test_slow_pattern_is_rejected_and_max_length_command_stays_fast(client, pattern):
+    response = client.post("/api/rules?force=true", json={
+        "pattern": pattern, "action": "AUTO_ACCEPT", "priority": 1, "approval_threshold": 1,
+    })
+    assert response.status_code == 400
+    assert "backtracking risk" in response.json()["detail"]
+    assert pattern not in [rule["pattern"] for rule in client.get("/api/rules").json()]
+
+    # Worst case input for the pattern, at the longest accepted length
+    filler = " " if pattern.startswith("\\s") else "a"
+    command = filler * get_settings().command_max_length
+    start = time.perf_counter()
+    response = client.post("/api/commands", json={"command_text": command})
+    assert response.status_code == 200
+    assert time.perf_counter() - start < 1.0
+
+
+def test_slow_pattern_is_rejected_by_the_pattern_tools(client):
+    response = client.post("/api/rules/test-pattern", json={"pattern": "a*a*a*b", "commands": ["a" * 300]})
+    assert response.status_code == 400
+
+    response = client.post("/api/rules/check-conflicts", json={"pattern": "a*a*a*b", "action": "AUTO_ACCEPT"})
+    assert "backtracking risk" in response.json()["error"]
+
+
+def test_safe_pattern_is_accepted(client):
+    response = client.post("/api/rules?force=true", json={
+        "pattern": "^rm\\s+-rf\\s+/tmp", "action": "AUTO_REJECT", "priority": 1, "approval_threshold": 1,
+    })
+    assert response.status_code == 200
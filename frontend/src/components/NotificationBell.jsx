@@ -15,12 +15,10 @@ const NotificationBell = () => {
       // Backend returns array directly
       const notificationsList = Array.isArray(data) ? data : [];
       setNotifications(notificationsList);
-      setUnreadCount(notificationsList.filter(n => !n.is_read).length);
     } catch (error) {
       console.error('Failed to fetch notifications:', error);
       // Set empty state on error to prevent UI issues
       setNotifications([]);
-      setUnreadCount(0);
     } finally {
       setLoading(false);
     }
@@ -28,15 +26,44 @@ const NotificationBell = () => {
 
   useEffect(() => {
     fetchNotifications();
-    // Poll for new notifications every 30 seconds
-    const interval = setInterval(fetchNotifications, 30000);
-    return () => clearInterval(interval);
+
+    // New notifications and the unread count are pushed by the server;
+    // reconnect with backoff if the stream drops
+    const controller = new AbortController();
+    let retryDelay = 1000;
+    let retryTimer;
+
+    const connect = async () => {
+      try {
+        await api.streamNotifications((event, data) => {
+          retryDelay = 1000;
+          if (event === 'unread') {
+            setUnreadCount(data.unread_count);
+          } else if (event === 'notification') {
+            setNotifications(prev => [data, ...prev.filter(n => n.id !== data.id)]);
+          }
+        }, controller.signal);
+      } catch (error) {
+        if (controller.signal.aborted) return;
+        console.error('Notification stream error:', error);
+      }
+      if (!controller.signal.aborted) {
+        retryTimer = setTimeout(connect, retryDelay);
+        retryDelay = Math.min(retryDelay * 2, 30000);
+      }
+    };
+    connect();
+
+    return () => {
+      controller.abort();
+      clearTimeout(retryTimer);
+    };
   }, []);
 
   const handleMarkAsRead = async (notificationId) => {
     try {
       await api.markNotificationRead(notificationId);
-      await fetchNotifications();
+      setNotifications(prev => prev.map(n => (n.id === notificationId ? { ...n, is_read: true } : n)));
     } catch (error) {
       console.error('Failed to mark notification as read:', error);
     }
@@ -44,11 +71,8 @@ const NotificationBell = () => {
 
   const handleMarkAllAsRead = async () => {
     try {
-      const unreadNotifications = notifications.filter(n => !n.is_read);
-      await Promise.all(
-        unreadNotifications.map(n => api.markNotificationRead(n.id))
-      );
-      await fetchNotifications();
+      await api.markAllNotificationsRead();
+      setNotifications(prev => prev.map(n => ({ ...n, is_read: true })));
     } catch (error) {
       console.error('Failed to mark all as read:', error);
     }
@@ -9,6 +9,7 @@ const AdminPanel = () => {
   const [rules, setRules] = useState([]);
   const [pendingRules, setPendingRules] = useState([]);
   const [auditLogs, setAuditLogs] = useState([]);
+  const [auditCursor, setAuditCursor] = useState(null);
   const [loading, setLoading] = useState(false);
   const [message, setMessage] = useState({ type: '', text: '' });
   const [currentUser, setCurrentUser] = useState(null);
@@ -66,17 +67,12 @@ const AdminPanel = () => {
 
   const loadPendingRules = async () => {
     try {
-      const data = await api.getPendingRules();
+      // Votes are embedded in the response, so this is a single request
+      const data = await api.getPendingRules(true);
       setPendingRules(data);
-      // Load votes for each pending rule
       const votesData = {};
       for (const rule of data) {
-        try {
-          const votes = await api.getRuleVotes(rule.id);
-          votesData[rule.id] = votes;
-        } catch (error) {
-          console.error(`Failed to load votes for rule ${rule.id}:`, error);
-        }
+        votesData[rule.id] = rule.votes || [];
       }
       setSelectedRuleVotes(votesData);
     } catch (error) {
@@ -84,10 +80,12 @@ const AdminPanel = () => {
     }
   };
 
-  const loadAuditLogs = async () => {
+  // Without a cursor, reload the newest page; with one, append the next page
+  const loadAuditLogs = async (cursor = null) => {
     try {
-      const data = await api.getAuditLogs();
-      setAuditLogs(data);
+      const { items, nextCursor } = await api.getAuditLogs(cursor);
+      setAuditLogs((previous) => (cursor ? [...previous, ...items] : items));
+      setAuditCursor(nextCursor);
     } catch (error) {
       showMessage('error', error.message);
     }
@@ -216,6 +214,16 @@ const AdminPanel = () => {
     borderBottom: isActive ? '3px solid #3498db' : 'none'
   });
 
+  const loadMoreStyle = {
+    backgroundColor: '#3498db',
+    color: 'white',
+    border: 'none',
+    padding: '0.5rem 1rem',
+    borderRadius: '4px',
+    cursor: 'pointer',
+    fontSize: '0.85rem'
+  };
+
   return (
     <Layout>
       <div style={{ maxWidth: '1400px', margin: '0 auto' }}>
@@ -928,6 +936,14 @@ const AdminPanel = () => {
                 </tbody>
               </table>
             </div>
+            {auditCursor && (
+              <div style={{ textAlign: 'center', marginTop: '1rem', color: '#7f8c8d', fontSize: '0.85rem' }}>
+                Showing the latest {auditLogs.length} entries.{' '}
+                <button onClick={() => loadAuditLogs(auditCursor)} style={loadMoreStyle}>
+                  Load more
+                </button>
+              </div>
+            )}
           </div>
         )}
       </div>
@@ -7,6 +7,7 @@ const Dashboard = () => {
   const { user, refreshUser } = useAuth();
   const [command, setCommand] = useState('');
   const [history, setHistory] = useState([]);
+  const [historyCursor, setHistoryCursor] = useState(null);
   const [loading, setLoading] = useState(false);
   const [message, setMessage] = useState({ type: '', text: '' });
 
@@ -14,10 +15,12 @@ const Dashboard = () => {
     loadHistory();
   }, []);
 
-  const loadHistory = async () => {
+  // Without a cursor, reload the newest page; with one, append the next page
+  const loadHistory = async (cursor = null) => {
     try {
-      const data = await api.getCommandHistory();
-      setHistory(data);
+      const { items, nextCursor } = await api.getCommandHistory(cursor);
+      setHistory((previous) => (cursor ? [...previous, ...items] : items));
+      setHistoryCursor(nextCursor);
     } catch (error) {
       console.error('Failed to load history:', error);
     }
@@ -63,6 +66,16 @@ const Dashboard = () => {
     return status === 'executed' ? '✓' : '✗';
   };
 
+  const loadMoreStyle = {
+    backgroundColor: '#3498db',
+    color: 'white',
+    border: 'none',
+    padding: '0.5rem 1rem',
+    borderRadius: '4px',
+    cursor: 'pointer',
+    fontSize: '0.85rem'
+  };
+
   return (
     <Layout>
       <div style={{ maxWidth: '1200px', margin: '0 auto' }}>
@@ -255,6 +268,14 @@ const Dashboard = () => {
                   ))}
                 </tbody>
               </table>
+              {historyCursor && (
+                <div style={{ textAlign: 'center', marginTop: '1rem', color: '#7f8c8d', fontSize: '0.85rem' }}>
+                  Showing the latest {history.length} commands.{' '}
+                  <button onClick={() => loadHistory(historyCursor)} style={loadMoreStyle}>
+                    Load more
+                  </button>
+                </div>
+              )}
             </div>
           )}
         </div>
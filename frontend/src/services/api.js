@@ -23,6 +23,22 @@ class ApiService {
   }
 
   async request(endpoint, options = {}) {
+    const { data } = await this.send(endpoint, options);
+    return data;
+  }
+
+  // One page of a paginated list: { items, nextCursor }. The server sends
+  // the next page's cursor in the X-Next-Cursor header; it is null on the
+  // last page.
+  async requestPage(endpoint, cursor = null, params = {}) {
+    const query = new URLSearchParams(params);
+    if (cursor) query.set('cursor', cursor);
+    const qs = query.toString();
+    const { data, response } = await this.send(qs ? `${endpoint}?${qs}` : endpoint);
+    return { items: data, nextCursor: response.headers.get('X-Next-Cursor') };
+  }
+
+  async send(endpoint, options = {}) {
     const url = `${API_URL}${endpoint}`;
     const config = {
       ...options,
@@ -40,7 +56,7 @@ class ApiService {
         throw new Error(data.detail || 'Request failed');
       }
 
-      return data;
+      return { data, response };
     } catch (error) {
       throw error;
     }
@@ -56,8 +72,17 @@ class ApiService {
     return this.request('/api/users/me');
   }
 
+  // Every user, following the cursor page by page (admins need the whole
+  // list to manage credits)
   async getAllUsers() {
-    return this.request('/api/users');
+    const users = [];
+    let cursor = null;
+    do {
+      const page = await this.requestPage('/api/users', cursor, { limit: 1000 });
+      users.push(...page.items);
+      cursor = page.nextCursor;
+    } while (cursor);
+    return users;
   }
 
   async createUser(userData) {
@@ -82,8 +107,9 @@ class ApiService {
     });
   }
 
-  async getCommandHistory() {
-    return this.request('/api/commands/history');
+  // Newest first, one page at a time: { items, nextCursor }
+  async getCommandHistory(cursor = null) {
+    return this.requestPage('/api/commands/history', cursor);
   }
 
   // Rules
@@ -134,8 +160,9 @@ class ApiService {
   }
 
   // Voting endpoints
-  async getPendingRules() {
-    return this.request('/api/rules/pending');
+  async getPendingRules(includeVotes = false) {
+    const url = includeVotes ? '/api/rules/pending?include_votes=true' : '/api/rules/pending';
+    return this.request(url);
   }
 
   async voteOnRule(ruleId, voteData) {
@@ -160,9 +187,61 @@ class ApiService {
     });
   }
 
+  async getUnreadNotificationCount() {
+    return this.request('/api/rules/notifications/unread-count');
+  }
+
+  async markAllNotificationsRead() {
+    return this.request('/api/rules/notifications/mark-all-read', {
+      method: 'PUT',
+    });
+  }
+
+  async markNotificationsRead(notificationIds) {
+    return this.request(`/api/rules/notifications/mark-read?ids=${notificationIds.join(',')}`, {
+      method: 'PUT',
+    });
+  }
+
+  // Server-Sent Events over fetch, so the API key can travel in a header.
+  // Calls onEvent(eventName, data) until the signal is aborted or the
+  // connection ends.
+  async streamNotifications(onEvent, signal) {
+    const response = await fetch(`${API_URL}/api/rules/notifications/stream`, {
+      headers: { 'x-api-key': this.apiKey, Accept: 'text/event-stream' },
+      signal,
+    });
+    if (!response.ok || !response.body) {
+      throw new Error('Notification stream unavailable');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const block = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        let event = 'message';
+        let data = '';
+        for (const line of block.split('\n')) {
+          if (line.startsWith('event: ')) event = line.slice(7);
+          else if (line.startsWith('data: ')) data += line.slice(6);
+        }
+        if (data) onEvent(event, JSON.parse(data));
+      }
+    }
+  }
+
   // Audit
-  async getAuditLogs() {
-    return this.request('/api/audit');
+  // Newest first, one page at a time: { items, nextCursor }
+  async getAuditLogs(cursor = null) {
+    return this.requestPage('/api/audit', cursor);
   }
 }
 